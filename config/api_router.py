@@ -1,6 +1,14 @@
 from django.conf import settings
 from rest_framework.routers import DefaultRouter, SimpleRouter
 
+from django_crypto_trading_bot.trading_bot.api.views import (
+    BotViewSet,
+    MarketViewSet,
+    OHLCVViewSet,
+    OrderViewSet,
+    SavingViewSet,
+    TradeViewSet,
+)
 from django_crypto_trading_bot.users.api.views import UserViewSet
 
 if settings.DEBUG:
@@ -9,6 +17,12 @@ else:
     router = SimpleRouter()
 
 router.register("users", UserViewSet)
+router.register("markets", MarketViewSet)
+router.register("ohlcv", OHLCVViewSet)
+router.register("orders", OrderViewSet)
+router.register("trades", TradeViewSet)
+router.register("savings", SavingViewSet)
+router.register("bots", BotViewSet)
 
 
 app_name = "api"
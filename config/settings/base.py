@@ -74,7 +74,7 @@ THIRD_PARTY_APPS = [
 
 LOCAL_APPS = [
     "django_crypto_trading_bot.users.apps.UsersConfig",
-    "django_crypto_trading_bot.trading_bot",
+    "django_crypto_trading_bot.trading_bot.apps.TradingBotConfig",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -278,3 +278,43 @@ REST_FRAMEWORK = {
 }
 # Your stuff...
 # ------------------------------------------------------------------------------
+# keep a copy of all candles with integer prices, to load candle ranges fast
+OHLCV_COMPACT_STORAGE = env.bool("DJANGO_OHLCV_COMPACT_STORAGE", default=False)
+# parallel worker lanes (one per account) & seconds until an order sync tick is saved
+ORDER_SYNC_WORKERS = env.int("DJANGO_ORDER_SYNC_WORKERS", default=8)
+ORDER_SYNC_DEADLINE = env.float("DJANGO_ORDER_SYNC_DEADLINE", default=25)
+# request weight per minute, shared by all clients of an exchange
+EXCHANGE_RATE_LIMITS = {
+    "binance": env.int("DJANGO_BINANCE_RATE_LIMIT", default=1200),
+}
+# record each fetched ticker snapshot in day files & keep them for some days
+TICKER_HISTORY_ENABLED = env.bool("DJANGO_TICKER_HISTORY_ENABLED", default=False)
+TICKER_HISTORY_DIR = env(
+    "DJANGO_TICKER_HISTORY_DIR", default=str(ROOT_DIR / "ticker_history")
+)
+TICKER_HISTORY_DAYS = env.int("DJANGO_TICKER_HISTORY_DAYS", default=30)
+# indicators updated with each saved candle, indicator & period like sma_20
+OHLCV_INDICATORS = env.list(
+    "DJANGO_OHLCV_INDICATORS",
+    default=["sma_20", "ema_20", "rsi_14", "atr_14", "bollinger_20", "vwap"],
+)
+# timeframes built from the downloaded 1m candles
+OHLCV_RESAMPLE_TIMEFRAMES = env.list(
+    "DJANGO_OHLCV_RESAMPLE_TIMEFRAMES", default=["5m", "15m", "1h", "4h", "1d"]
+)
+# days to keep the candles of a timeframe & the timeframe they are rolled up into
+# before they are removed by the ohlcv_retention command
+OHLCV_RETENTION = {
+    "1m": {
+        "days": env.int("DJANGO_OHLCV_1M_RETENTION_DAYS", default=30),
+        "rollup": "1h",
+    },
+}
+# months of OHLCV partitions created ahead on PostgreSQL
+OHLCV_PARTITIONS_AHEAD = env.int("DJANGO_OHLCV_PARTITIONS_AHEAD", default=2)
+# "rest" or "stream": the bots read the candles & tickers of the stream_market_data
+# command from the shared cache, missing data is still fetched with REST
+MARKET_DATA_SOURCE = env("DJANGO_MARKET_DATA_SOURCE", default="rest")
+MARKET_STREAM_URL = env(
+    "DJANGO_MARKET_STREAM_URL", default="wss://stream.binance.com:9443/stream"
+)
@@ -1,4 +1,12 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Type
+
+import pytz
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Count, IntegerField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
 
 from .models import (
     OHLCV,
@@ -6,21 +14,173 @@ from .models import (
     Bot,
     Currency,
     Market,
+    OHLCVCoverage,
     Order,
     OrderErrorLog,
     Saving,
     Trade,
 )
+from .ohlcv_coverage import estimate_candles
+
+# related objects of the __str__ of a bot
+BOT_RELATED: Tuple[str, ...] = ("account__user", "market__base", "market__quote")
+
+# query parameter with the last candle of the previous page
+CURSOR_VAR: str = "after"
+# candles which are counted at most, if the coverage can't estimate the count
+COUNT_LIMIT: int = 10000
+# coverage rows shown above the candles
+COVERAGE_LIMIT: int = 50
+
+
+def select_related_filter(*fields: str) -> Type[admin.RelatedFieldListFilter]:
+    """Get a related field filter which loads its choices with the related
+    objects of their __str__, instead of one query per choice
+
+    Returns:
+        Type[admin.RelatedFieldListFilter] -- list filter class
+    """
+
+    class SelectRelatedFieldListFilter(admin.RelatedFieldListFilter):
+        def field_choices(self, field, request, model_admin) -> List[Tuple[int, str]]:
+            return [
+                (obj.pk, str(obj))
+                for obj in field.related_model._default_manager.select_related(
+                    *fields
+                ).order_by("pk")
+            ]
+
+    return SelectRelatedFieldListFilter
+
+
+def get_cursor(candle: OHLCV) -> str:
+    """Get the keyset cursor of a candle like 12.1m.1577836800000
+
+    Arguments:
+        candle {OHLCV} -- last candle of a page
+
+    Returns:
+        str -- cursor of the next page
+    """
+    return "{}.{}.{}".format(
+        candle.market_id, candle.timeframe, int(candle.timestamp.timestamp() * 1000)
+    )
+
+
+def parse_cursor(cursor: str) -> Tuple[int, str, datetime]:
+    """Get the market, timeframe & timestamp of a keyset cursor
+
+    Arguments:
+        cursor {str} -- cursor like 12.1m.1577836800000
+
+    Raises:
+        IncorrectLookupParameters: invalid cursor
+
+    Returns:
+        Tuple[int, str, datetime] -- key of the last candle of the previous page
+    """
+    try:
+        market_id, timeframe, timestamp = cursor.split(".")
+        return (
+            int(market_id),
+            timeframe,
+            datetime.fromtimestamp(int(timestamp) / 1000, tz=pytz.UTC),
+        )
+    except (ValueError, OverflowError, OSError):
+        raise IncorrectLookupParameters("Invalid cursor {}".format(cursor))
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Change list which pages by the unique candle index with a cursor
+    instead of OFFSET & COUNT(*)
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_ordering(self, request, queryset) -> List[str]:
+        # the order of the unique candle index
+        return ["market", "timeframe", "timestamp"]
+
+    def get_queryset(self, request) -> QuerySet:
+        queryset: QuerySet = super().get_queryset(request)
+        # filtered candles of all pages, to count them
+        self.filtered_queryset: QuerySet = queryset
+        if CURSOR_VAR not in self.params:
+            return queryset
+
+        market_id, timeframe, timestamp = parse_cursor(self.params[CURSOR_VAR])
+        return queryset.filter(
+            Q(market_id__gt=market_id)
+            | Q(market_id=market_id, timeframe__gt=timeframe)
+            | Q(market_id=market_id, timeframe=timeframe, timestamp__gt=timestamp)
+        )
+
+    def get_result_count(self) -> int:
+        """Get the candles of the filters from the coverage,
+        other filters are counted up to COUNT_LIMIT
+
+        Returns:
+            int -- estimated amount of candles
+        """
+        filters: Dict[str, str] = self.get_filters_params()
+        market_id: Optional[str] = filters.pop("market__id__exact", None)
+        timeframe: Optional[str] = filters.pop("timeframe__exact", None)
+        if not filters:
+            try:
+                candles: Optional[int] = estimate_candles(
+                    market_id=int(market_id) if market_id else None,
+                    timeframe=timeframe,
+                )
+            except ValueError:
+                candles = None
+            if candles is not None:
+                return candles
+        return self.filtered_queryset.order_by()[:COUNT_LIMIT].count()
+
+    def get_results(self, request):
+        # one more candle shows if there is a next page
+        candles: List[OHLCV] = list(self.queryset[: self.list_per_page + 1])
+
+        self.result_list = candles[: self.list_per_page]
+        self.next_cursor: Optional[str] = (
+            get_cursor(candles[self.list_per_page - 1])
+            if len(candles) > self.list_per_page
+            else None
+        )
+        self.next_url: Optional[str] = (
+            self.get_query_string({CURSOR_VAR: self.next_cursor})
+            if self.next_cursor
+            else None
+        )
+        self.first_url: Optional[str] = (
+            self.get_query_string(remove=[CURSOR_VAR])
+            if CURSOR_VAR in self.params
+            else None
+        )
+
+        self.result_count = self.get_result_count()
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+        self.multi_page = bool(self.next_cursor or self.first_url)
+        self.paginator = None
 
 
 class BotInline(admin.TabularInline):
     model = Bot
     extra = 0
+    raw_id_fields = ("market", "quote")
 
 
 class OrderInline(admin.TabularInline):
     model = Order
     extra = 0
+    raw_id_fields = ("next_order", "market", "fee_currency")
 
 
 class TradeInline(admin.TabularInline):
@@ -36,6 +196,7 @@ class ErrorInline(admin.TabularInline):
 class SavingInline(admin.TabularInline):
     model = Saving
     extra = 0
+    raw_id_fields = ("order",)
 
 
 class AccountAdmin(admin.ModelAdmin):
@@ -56,8 +217,9 @@ class AccountAdmin(admin.ModelAdmin):
     ]
 
     list_display = ("user", "exchange")
+    list_select_related = ("user",)
     list_filter = ["user", "exchange"]
-    search_fields = ["user"]
+    search_fields = ["=user__username"]
 
     inlines = [BotInline]
 
@@ -70,6 +232,8 @@ class CurrencyAdmin(admin.ModelAdmin):
 
 
 class MarketAdmin(admin.ModelAdmin):
+    readonly_fields = ("metadata_hash", "limits_changed_at")
+
     fieldsets = [
         ("Base", {"fields": ["exchange", "active"]}),
         ("Currencies", {"fields": ["base", "quote"]}),
@@ -84,14 +248,17 @@ class MarketAdmin(admin.ModelAdmin):
                     "limits_amount_max",
                     "limits_price_min",
                     "limits_price_max",
+                    "limits_changed_at",
+                    "metadata_hash",
                 ],
             },
         ),
     ]
 
     list_display = ("symbol", "exchange", "active")
+    list_select_related = ("base", "quote")
     list_filter = ["exchange", "active"]
-    search_fields = ["base", "quote"]
+    search_fields = ["=base__short", "=quote__short"]
 
 
 class BotAdmin(admin.ModelAdmin):
@@ -103,6 +270,7 @@ class BotAdmin(admin.ModelAdmin):
         "roi",
         "estimate_roi",
         "orders_count",
+        "realized_pnl",
     )
 
     fieldsets = [
@@ -122,6 +290,7 @@ class BotAdmin(admin.ModelAdmin):
                     "roi",
                     "estimate_roi",
                     "orders_count",
+                    "realized_pnl",
                 ]
             },
         ),
@@ -137,8 +306,16 @@ class BotAdmin(admin.ModelAdmin):
         "estimate_roi",
         "orders_count",
     )
-    list_filter = ["account", "timeframe", "active"]
-    search_fields = ["account", "market", "created"]
+    # the stats are read from the performance ledger
+    list_select_related = BOT_RELATED + ("performance",)
+    list_filter = [
+        ("account", select_related_filter("user")),
+        "timeframe",
+        "active",
+    ]
+    search_fields = ["=account__user__username"]
+    raw_id_fields = ("market",)
+    show_full_result_count = False
 
     inlines = [OrderInline, SavingInline]
 
@@ -178,22 +355,48 @@ class OrderAdmin(admin.ModelAdmin):
         "price",
         "errors",
     )
-    list_filter = ["bot", "timestamp", "status", "side"]
-    search_fields = [
-        "bot",
-        "order_id",
+    list_select_related = ("next_order",) + tuple(
+        "bot__{}".format(field) for field in BOT_RELATED
+    )
+    list_filter = [
+        ("bot", select_related_filter(*BOT_RELATED)),
         "timestamp",
         "status",
-        "order_type",
         "side",
-        "price",
-        "amount",
-        "filled",
     ]
+    search_fields = ["=order_id"]
+    raw_id_fields = ("bot", "next_order", "market", "fee_currency")
+    show_full_result_count = False
 
     # inlines = [TradeInline]
     inlines = [ErrorInline]
 
+    def get_queryset(self, request) -> QuerySet:
+        # count the errors of all orders of a page in the same query
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                errors_count=Coalesce(
+                    Subquery(
+                        OrderErrorLog.objects.filter(order=OuterRef("pk"))
+                        .order_by()
+                        .values("order")
+                        .annotate(count=Count("pk"))
+                        .values("count"),
+                        output_field=IntegerField(),
+                    ),
+                    0,
+                )
+            )
+        )
+
+    def errors(self, order: Order) -> int:
+        errors_count: Optional[int] = getattr(order, "errors_count", None)
+        return order.errors if errors_count is None else errors_count
+
+    errors.admin_order_field = "errors_count"  # type: ignore
+
 
 class TradeAdmin(admin.ModelAdmin):
     fieldsets = [
@@ -222,20 +425,16 @@ class TradeAdmin(admin.ModelAdmin):
         "amount",
         "fee_rate",
     )
+    list_select_related = ("order",)
     list_filter = ["taker_or_maker", "timestamp"]
-    search_fields = [
-        "order",
-        "trade_id",
-        "timestamp",
-        "taker_or_maker",
-        "amount",
-        "fee_currency",
-        "fee_cost",
-        "fee_rate",
-    ]
+    search_fields = ["=trade_id", "=order__order_id"]
+    raw_id_fields = ("order", "fee_currency")
+    show_full_result_count = False
 
 
 class OHLCVAdmin(admin.ModelAdmin):
+    raw_id_fields = ("market",)
+
     fieldsets = [
         (
             None,
@@ -264,17 +463,73 @@ class OHLCVAdmin(admin.ModelAdmin):
         "closing_price",
         "volume",
     )
-    list_filter = ["market", "timeframe", "timestamp"]
-    search_fields = [
+    list_select_related = ("market__base", "market__quote")
+    # exact filters on the columns of the unique candle index, no free text search
+    list_filter = [
+        ("market", select_related_filter("base", "quote")),
+        "timeframe",
+    ]
+    ordering = ("market", "timeframe", "timestamp")
+    sortable_by: Tuple[str, ...] = ()
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs) -> Type[ChangeList]:
+        return KeysetChangeList
+
+    def get_coverage(self, request) -> QuerySet:
+        """Get the coverage of the filtered market & timeframe
+
+        Returns:
+            QuerySet -- coverage rows up to COVERAGE_LIMIT
+        """
+        coverage: QuerySet = OHLCVCoverage.objects.select_related(
+            "market__base", "market__quote"
+        ).order_by("market", "timeframe")
+        try:
+            if request.GET.get("market__id__exact"):
+                coverage = coverage.filter(
+                    market_id=int(request.GET["market__id__exact"])
+                )
+        except ValueError:
+            return coverage.none()
+        if request.GET.get("timeframe__exact"):
+            coverage = coverage.filter(timeframe=request.GET["timeframe__exact"])
+        return coverage[:COVERAGE_LIMIT]
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or dict()
+        extra_context["coverage"] = self.get_coverage(request)
+        return super().changelist_view(request, extra_context=extra_context)
+
+
+class OHLCVCoverageAdmin(admin.ModelAdmin):
+    readonly_fields = (
         "market",
         "timeframe",
-        "timestamp",
-        "open_price",
-        "highest_price",
-        "lowest_price",
-        "closing_price",
-        "volume",
+        "first_timestamp",
+        "last_timestamp",
+        "candles",
+        "updated",
+    )
+
+    list_display = (
+        "market",
+        "timeframe",
+        "first_timestamp",
+        "last_timestamp",
+        "candles",
+        "updated",
+    )
+    list_select_related = ("market__base", "market__quote")
+    list_filter = [
+        ("market", select_related_filter("base", "quote")),
+        "timeframe",
     ]
+    show_full_result_count = False
+
+    def has_add_permission(self, request) -> bool:
+        # the rows are kept up to date with the candles
+        return False
 
 
 admin.site.register(Account, AccountAdmin)
@@ -284,3 +539,4 @@ admin.site.register(Market, MarketAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(Trade, TradeAdmin)
 admin.site.register(OHLCV, OHLCVAdmin)
+admin.site.register(OHLCVCoverage, OHLCVCoverageAdmin)
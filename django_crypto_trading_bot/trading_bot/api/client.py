@@ -1,9 +1,140 @@
-from ccxt.base.exchange import Exchange
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
 import ccxt
+from ccxt.base.exchange import Exchange
+from requests.adapters import HTTPAdapter
 
+from .rate_limit import RateLimit, get_rate_limit
 
-def get_client(exchange_id: str, api_key: str = None, secret: str = None) -> Exchange:
+# seconds until the markets of an exchange are loaded again
+MARKETS_TTL: int = 3600
+
+# max open HTTP connections of a client
+POOL_SIZE: int = 32
+
+
+class LoadedMarkets(NamedTuple):
+    markets: dict
+    currencies: Optional[dict]
+    loaded: float
+
+
+_clients: Dict[Tuple[str, Optional[str]], Exchange] = dict()
+_clients_lock: threading.Lock = threading.Lock()
+
+_markets: Dict[str, LoadedMarkets] = dict()
+_markets_locks: Dict[str, threading.Lock] = dict()
+
+
+def create_client(
+    exchange_id: str, api_key: str = None, secret: str = None
+) -> Exchange:
+    """Create a new exchange client, which shares markets & rate limit with all
+    clients of the same exchange
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Keyword Arguments:
+        api_key {str} -- api key of the account (default: {None})
+        secret {str} -- secret of the account (default: {None})
+
+    Returns:
+        Exchange -- exchange client
+    """
     exchange_class = getattr(ccxt, exchange_id)
-    return exchange_class(
+    exchange: Exchange = exchange_class(
         {"apiKey": api_key, "secret": secret, "timeout": 30000, "enableRateLimit": True}
     )
+
+    rate_limit: RateLimit = get_rate_limit(exchange_id)
+
+    def throttle(cost: float = None):
+        rate_limit.consume(cost or 1)
+
+    def load_exchange_markets(reload: bool = False, params: dict = {}) -> dict:
+        return load_markets(exchange=exchange, reload=reload, params=params)
+
+    exchange.throttle = throttle
+    exchange.load_markets = load_exchange_markets
+
+    if getattr(exchange, "session", None):
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        exchange.session.mount("https://", adapter)
+        exchange.session.mount("http://", adapter)
+
+    return exchange
+
+
+def get_client(exchange_id: str, api_key: str = None, secret: str = None) -> Exchange:
+    """Get the shared exchange client of an account,
+    each account gets only one client per process
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Keyword Arguments:
+        api_key {str} -- api key of the account (default: {None})
+        secret {str} -- secret of the account (default: {None})
+
+    Returns:
+        Exchange -- exchange client
+    """
+    key: Tuple[str, Optional[str]] = (exchange_id, api_key)
+
+    with _clients_lock:
+        exchange: Optional[Exchange] = _clients.get(key)
+        if not exchange or exchange.secret != secret:
+            exchange = create_client(
+                exchange_id=exchange_id, api_key=api_key, secret=secret
+            )
+            _clients[key] = exchange
+        return exchange
+
+
+def load_markets(exchange: Exchange, reload: bool = False, params: dict = {}) -> dict:
+    """Load the markets of a client, the markets are requested only once per
+    MARKETS_TTL for all clients of an exchange
+
+    Arguments:
+        exchange {Exchange} -- exchange client
+
+    Keyword Arguments:
+        reload {bool} -- request the markets, even if they are loaded (default: {False})
+        params {dict} -- extra parameters for the exchange (default: {{}})
+
+    Returns:
+        dict -- markets of the exchange by symbol
+    """
+    with _clients_lock:
+        lock: threading.Lock = _markets_locks.setdefault(exchange.id, threading.Lock())
+
+    with lock:
+        loaded: Optional[LoadedMarkets] = _markets.get(exchange.id)
+
+        if reload or not loaded or time.monotonic() - loaded.loaded > MARKETS_TTL:
+            type(exchange).load_markets(exchange, reload=True, params=params)
+            _markets[exchange.id] = LoadedMarkets(
+                markets=exchange.markets,
+                currencies=exchange.currencies,
+                loaded=time.monotonic(),
+            )
+        elif exchange.markets is not loaded.markets:
+            exchange.set_markets(loaded.markets, loaded.currencies)
+            # share the same object to skip set_markets next time
+            exchange.markets = loaded.markets
+
+        return exchange.markets
+
+
+def clear_clients():
+    """
+    Remove all shared clients & loaded markets
+    """
+    with _clients_lock:
+        _clients.clear()
+        _markets.clear()
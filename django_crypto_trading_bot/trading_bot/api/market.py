@@ -1,13 +1,41 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 
 from ccxt.base.exchange import Exchange
+from django.db import transaction
+from django.utils import timezone
 
 from django_crypto_trading_bot.trading_bot.models import Currency, Market
 
 from .client import get_client
 
+logger = logging.getLogger(__name__)
+
+# market fields synchronized with the exchange
+SYNC_FIELDS: List[str] = [
+    "active",
+    "precision_amount",
+    "precision_price",
+    "limits_amount_min",
+    "limits_amount_max",
+    "limits_price_min",
+    "limits_price_max",
+]
+# fields which change the order amounts & prices
+LIMIT_FIELDS: List[str] = SYNC_FIELDS[1:]
+
+
+class MarketSyncResult(NamedTuple):
+    markets: List[Market]  # markets of the exchange payload
+    created: int
+    updated: int
+    deactivated: int  # markets which are no longer listed on the exchange
+
 
 def get_or_create_market(response: dict, exchange_id: str) -> Market:
     """
@@ -15,34 +43,21 @@ def get_or_create_market(response: dict, exchange_id: str) -> Market:
     """
     base, create = Currency.objects.get_or_create(short=response["base"].upper())
     quote, create = Currency.objects.get_or_create(short=response["quote"].upper())
+    values: dict = get_market_values(response)
 
     try:
         market: Market = Market.objects.get(
             base=base, quote=quote, exchange=exchange_id
         )
-        market.active = response["active"]
-        market.precision_amount = response["precision"]["amount"]
-        market.precision_price = response["precision"]["price"]
-        market.limits_amount_min = response["limits"]["amount"]["min"]
-        market.limits_amount_max = response["limits"]["amount"]["max"]
-        market.limits_price_min = response["limits"]["price"]["min"]
-        market.limits_price_max = response["limits"]["price"]["max"]
-        market.save()
+        if set_market_values(market, values, now=timezone.now()):
+            market.save()
         return market
 
     except Market.DoesNotExist:
-        return Market.objects.create(
-            base=base,
-            quote=quote,
-            exchange=exchange_id,
-            active=response["active"],
-            precision_amount=response["precision"]["amount"],
-            precision_price=response["precision"]["price"],
-            limits_amount_min=response["limits"]["amount"]["min"],
-            limits_amount_max=response["limits"]["amount"]["max"],
-            limits_price_min=response["limits"]["price"]["min"],
-            limits_price_max=response["limits"]["price"]["max"],
-        )
+        market = Market(base=base, quote=quote, exchange=exchange_id)
+        set_market_values(market, values, now=timezone.now())
+        market.save()
+        return market
 
 
 def update_market(market: Market, exchange: Exchange = None) -> Market:
@@ -57,6 +72,7 @@ def update_market(market: Market, exchange: Exchange = None) -> Market:
     """
     if not exchange:
         exchange = get_client(exchange_id=market.exchange)
+        exchange.load_markets()
 
     market_exchange: dict = exchange.market(market.symbol)
     return get_or_create_market(response=market_exchange, exchange_id=market.exchange)
@@ -70,23 +86,200 @@ def update_all_markets(exchange: Exchange):
         update_market(market, exchange)
 
 
-def get_all_markets_from_exchange(exchange_id: str) -> List[Market]:
+def get_market_values(response: dict) -> dict:
+    """Get the synchronized fields of a market from the api json,
+    decimals are rounded like they are stored in the database
+
+    Arguments:
+        response {dict} -- market structure
+
+    Returns:
+        dict -- values by field name
     """
-    Load all markets from an exchange into the database
+    values: dict = {
+        "active": bool(response["active"]),
+        "precision_amount": response["precision"]["amount"],
+        "precision_price": response["precision"]["price"],
+        "limits_amount_min": response["limits"]["amount"]["min"],
+        "limits_amount_max": response["limits"]["amount"]["max"],
+        "limits_price_min": response["limits"]["price"]["min"],
+        "limits_price_max": response["limits"]["price"]["max"],
+    }
+    for name, value in values.items():
+        field = Market._meta.get_field(name)
+        if field.get_internal_type() == "DecimalField":
+            values[name] = Decimal(str(value)).quantize(
+                Decimal(1).scaleb(-field.decimal_places)
+            )
+    return values
+
+
+def get_metadata_hash(values: dict) -> str:
+    """Get the fingerprint of the synchronized fields of a market
+
+    Arguments:
+        values {dict} -- values by field name from get_market_values
+
+    Returns:
+        str -- SHA-256 hex digest
+    """
+    return hashlib.sha256(
+        "|".join(str(values[name]) for name in SYNC_FIELDS).encode()
+    ).hexdigest()
+
+
+def set_market_values(market: Market, values: dict, now: datetime) -> bool:
+    """Set the synchronized fields of a market if its fingerprint changed,
+    limits_changed_at is set when the precision or limits changed
+
+    Arguments:
+        market {Market} -- new or stored market
+        values {dict} -- values by field name from get_market_values
+        now {datetime} -- time of the change
+
+    Returns:
+        bool -- True if the market needs to be saved
+    """
+    metadata_hash: str = get_metadata_hash(values)
+    if market.metadata_hash == metadata_hash:
+        return False
+
+    if market.pk is None or any(
+        getattr(market, name) != values[name] for name in LIMIT_FIELDS
+    ):
+        market.limits_changed_at = now
+    for name, value in values.items():
+        setattr(market, name, value)
+    market.metadata_hash = metadata_hash
+    return True
+
+
+def sync_markets(responses: List[dict], exchange_id: str) -> MarketSyncResult:
+    """Synchronize the markets of an exchange with a few queries,
+    the existing currencies & markets are loaded once & only markets
+    with a changed metadata hash are saved
 
     Arguments:
+        responses {List[dict]} -- all market structures of the exchange
         exchange_id {str} -- exchange name like "binance"
 
     Returns:
-        List[Market] -- All Markets from the exchange as model
+        MarketSyncResult -- synchronized markets & amount of changes
     """
+    payload: Dict[Tuple[str, str], dict] = {
+        (response["base"].upper(), response["quote"].upper()): get_market_values(
+            response
+        )
+        for response in responses
+    }
+
+    with transaction.atomic():
+        currencies: Dict[str, Currency] = {
+            currency.short: currency for currency in Currency.objects.all()
+        }
+        missing: Set[str] = {
+            short for key in payload for short in key if short not in currencies
+        }
+        if missing:
+            Currency.objects.bulk_create(
+                [Currency(short=short) for short in sorted(missing)]
+            )
+            # bulk_create sets no primary keys on every database
+            currencies.update(
+                {
+                    currency.short: currency
+                    for currency in Currency.objects.filter(short__in=missing)
+                }
+            )
+
+        existing: Dict[Tuple[str, str], Market] = {
+            (market.base.short, market.quote.short): market
+            for market in Market.objects.filter(exchange=exchange_id).select_related(
+                "base", "quote"
+            )
+        }
+
+        created: List[Market] = list()
+        updated: List[Market] = list()
+        deactivated: int = 0
+
+        now: datetime = timezone.now()
+        for (base, quote), values in payload.items():
+            market: Optional[Market] = existing.get((base, quote))
+            if not market:
+                market = Market(
+                    base=currencies[base], quote=currencies[quote], exchange=exchange_id
+                )
+                set_market_values(market, values, now=now)
+                created.append(market)
+            elif set_market_values(market, values, now=now):
+                updated.append(market)
+
+        for key, market in existing.items():
+            if key not in payload and market.active:
+                values = {name: getattr(market, name) for name in SYNC_FIELDS}
+                values["active"] = False
+                set_market_values(market, values, now=now)
+                updated.append(market)
+                deactivated += 1
+
+        Market.objects.bulk_create(created)
+        Market.objects.bulk_update(
+            updated, SYNC_FIELDS + ["metadata_hash", "limits_changed_at"]
+        )
+
+    markets: Dict[Tuple[str, str], Market] = existing
+    if created:
+        markets = {
+            (market.base.short, market.quote.short): market
+            for market in Market.objects.filter(exchange=exchange_id).select_related(
+                "base", "quote"
+            )
+        }
+
+    return MarketSyncResult(
+        markets=[markets[key] for key in payload],
+        created=len(created),
+        updated=len(updated) - deactivated,
+        deactivated=deactivated,
+    )
+
+
+def sync_exchange_markets(exchange_id: str) -> MarketSyncResult:
+    """Load all markets from an exchange into the database
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
 
+    Returns:
+        MarketSyncResult -- synchronized markets & amount of changes
+    """
     exchange = get_client(exchange_id=exchange_id)
-    exchange.load_markets()
+    exchange.load_markets(reload=True)
 
-    markets: List[Market] = []
+    result: MarketSyncResult = sync_markets(
+        responses=list(exchange.markets.values()), exchange_id=exchange_id
+    )
+    logger.info(
+        "Sync {} markets of {}: {} created, {} updated, {} deactivated.".format(
+            len(result.markets),
+            exchange_id,
+            result.created,
+            result.updated,
+            result.deactivated,
+        )
+    )
+    return result
 
-    for market in exchange.markets.values():
-        markets.append(get_or_create_market(response=market, exchange_id=exchange_id))
 
-    return markets
+def get_all_markets_from_exchange(exchange_id: str) -> List[Market]:
+    """
+    Load all markets from an exchange into the database
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Returns:
+        List[Market] -- All Markets from the exchange as model
+    """
+    return sync_exchange_markets(exchange_id=exchange_id).markets
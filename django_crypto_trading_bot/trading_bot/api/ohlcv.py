@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+from time import sleep
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ccxt.base.errors import (
+    BaseError,
+    DDoSProtection,
+    ExchangeNotAvailable,
+    RequestTimeout,
+)
+from ccxt.base.exchange import Exchange
+from django.db import DatabaseError
+from django.utils import timezone
+
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Market,
+    OHLCVCoverage,
+    Timeframes,
+)
+
+from .client import get_client
+from .rate_limit import get_rate_limit
+
+logger = logging.getLogger(__name__)
+
+# max seconds to wait before retry a failed request
+MAX_RETRY_DELAY: int = 120
+# max seconds a stored unfinished candle is used, two ticks of the trade cron
+LATEST_CANDLE_MAX_AGE: int = 120
+
+
+def timeframe_to_milliseconds(timeframe: str) -> int:
+    """Get the duration of a single candle
+
+    Arguments:
+        timeframe {str} -- timeframe like 1m, 1h, 1d
+
+    Returns:
+        int -- duration in milliseconds
+    """
+    return Exchange.parse_timeframe(timeframe) * 1000
+
+
+def split_range(
+    since: int, until: int, timeframe: str, window_size: int
+) -> List[Tuple[int, int]]:
+    """Split a time range into windows of window_size candles
+
+    Arguments:
+        since {int} -- first timestamp in milliseconds
+        until {int} -- end timestamp in milliseconds (excluded)
+        timeframe {str} -- timeframe of the candles
+        window_size {int} -- candles per window
+
+    Returns:
+        List[Tuple[int, int]] -- list of (since, until) windows
+    """
+    step: int = timeframe_to_milliseconds(timeframe) * window_size
+    return [(start, min(start + step, until)) for start in range(since, until, step)]
+
+
+def fetch_candles(
+    exchange: Exchange,
+    symbol: str,
+    timeframe: str,
+    since: Optional[int],
+    limit: Optional[int] = None,
+) -> List[List[float]]:
+    """Fetch a single page of candles, retry with a growing delay on connection errors
+
+    Arguments:
+        exchange {Exchange} -- exchange client
+        symbol {str} -- market symbol like TRX/BNB
+        timeframe {str} -- timeframe of the candles
+        since {Optional[int]} -- first timestamp in milliseconds, None for the latest
+
+    Keyword Arguments:
+        limit {Optional[int]} -- max candles of the page (default: {None})
+
+    Returns:
+        List[List[float]] -- candles
+    """
+    delay: int = 1
+    while True:
+        try:
+            return exchange.fetch_ohlcv(
+                symbol=symbol, timeframe=timeframe, since=since, limit=limit
+            )
+        except (RequestTimeout, ExchangeNotAvailable, DDoSProtection):
+            logger.warning(
+                "Connetion error from {} ... wait {}s for next try".format(
+                    exchange.id, delay
+                )
+            )
+            sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+
+def fetch_window(
+    exchange: Exchange,
+    symbol: str,
+    timeframe: str,
+    since: int,
+    until: int,
+    limit: Optional[int] = None,
+) -> List[List[float]]:
+    """Fetch all candles of a time window page by page
+
+    Arguments:
+        exchange {Exchange} -- exchange client
+        symbol {str} -- market symbol like TRX/BNB
+        timeframe {str} -- timeframe of the candles
+        since {int} -- first timestamp in milliseconds
+        until {int} -- end timestamp in milliseconds (excluded)
+
+    Keyword Arguments:
+        limit {Optional[int]} -- max candles per request (default: {None})
+
+    Returns:
+        List[List[float]] -- candles of the window ordered by time
+    """
+    candles: List[List[float]] = list()
+    timeframe_ms: int = timeframe_to_milliseconds(timeframe)
+
+    while since < until:
+        fetched: List[List[float]] = fetch_candles(
+            exchange=exchange,
+            symbol=symbol,
+            timeframe=timeframe,
+            since=since,
+            limit=limit,
+        )
+        page: List[List[float]] = [
+            candle for candle in fetched if since <= candle[0] < until
+        ]
+
+        # no more candles in this window
+        if not page:
+            break
+
+        candles.extend(page)
+        since = int(page[-1][0]) + 1
+
+        # a short page or the last candle of the window ends the window
+        # without another request
+        if (limit and len(fetched) < limit) or (
+            int(fetched[-1][0]) + timeframe_ms >= until
+        ):
+            break
+
+    return candles
+
+
+def get_latest_candle(
+    market: Market, timeframe: str, exchange: Optional[Exchange] = None
+) -> Optional[OHLCV]:
+    """Get the current candle of a market, from the local candles if they
+    contain the current candle & it was saved in the last LATEST_CANDLE_MAX_AGE
+    seconds, or else from the public client
+
+    Arguments:
+        market {Market} -- market of the candle
+        timeframe {str} -- timeframe of the candle
+
+    Keyword Arguments:
+        exchange {Optional[Exchange]} -- exchange client,
+                                         default is the shared public client (default: {None})
+
+    Returns:
+        Optional[OHLCV] -- current candle, unsaved if it's fetched,
+                           None if the exchange has no candle
+    """
+    if not exchange:
+        exchange = get_client(exchange_id=market.exchange)
+
+    candle: Optional[OHLCV] = OHLCV.last_candle(timeframe=timeframe, market=market)
+    if (
+        candle
+        and int(candle.timestamp.timestamp() * 1000)
+        + timeframe_to_milliseconds(timeframe)
+        > exchange.milliseconds()
+        # the unfinished candle changes until its end, the coverage tells
+        # when the candles were saved the last time
+        and OHLCVCoverage.objects.filter(
+            market=market,
+            timeframe=timeframe,
+            updated__gte=timezone.now() - timedelta(seconds=LATEST_CANDLE_MAX_AGE),
+        ).exists()
+    ):
+        return candle
+
+    candles: List[List[float]] = fetch_candles(
+        exchange=exchange,
+        symbol=market.symbol,
+        timeframe=timeframe,
+        since=None,
+        limit=1,
+    )
+    if not candles:
+        return None
+    return OHLCV.get_OHLCV(candle=candles[-1], timeframe=timeframe, market=market)
+
+
+def get_latest_candles(
+    pairs: Iterable[Tuple[Market, str]], exchange: Optional[Exchange] = None
+) -> Dict[Tuple[int, str], OHLCV]:
+    """Get the current candle of each distinct market & timeframe only once,
+    markets without a candle are left out
+
+    Arguments:
+        pairs {Iterable[Tuple[Market, str]]} -- markets & timeframes, may repeat
+
+    Keyword Arguments:
+        exchange {Optional[Exchange]} -- exchange client,
+                                         default is the shared public client (default: {None})
+
+    Returns:
+        Dict[Tuple[int, str], OHLCV] -- current candles by market id & timeframe
+    """
+    candles: Dict[Tuple[int, str], OHLCV] = dict()
+    fetched: Set[Tuple[int, str]] = set()
+
+    market: Market
+    timeframe: str
+    for market, timeframe in pairs:
+        if (market.pk, timeframe) in fetched:
+            continue
+        fetched.add((market.pk, timeframe))
+
+        candle: Optional[OHLCV] = get_latest_candle(
+            market=market, timeframe=timeframe, exchange=exchange
+        )
+        if candle:
+            candles[(market.pk, timeframe)] = candle
+
+    return candles
+
+
+def get_missing_range(
+    exchange: Exchange,
+    market: Market,
+    timeframe: Timeframes,
+    since: Optional[int] = None,
+) -> Optional[Tuple[int, int]]:
+    """Get the time range of candles which are not in the database
+
+    Arguments:
+        exchange {Exchange} -- exchange client
+        market {Market} -- market from candle
+        timeframe {Timeframes} -- timeframe from candle
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds of a market
+                                 without candles, by default its first candle (default: {None})
+
+    Returns:
+        Optional[Tuple[int, int]] -- (since, until) in milliseconds or None if up to date
+    """
+    until: int = exchange.milliseconds()
+
+    last_candle: Optional[OHLCV] = OHLCV.last_candle(timeframe=timeframe, market=market)
+    if last_candle:
+        # fetch the last candle again, it could be unfinished at the last update
+        since = int(last_candle.timestamp.timestamp()) * 1000
+    else:
+        # start with the first candle of the market
+        first_candles: List[List[float]] = fetch_candles(
+            exchange=exchange,
+            symbol=market.symbol,
+            timeframe=timeframe,
+            since=since or 0,
+            limit=1,
+        )
+        if not first_candles:
+            return None
+        since = int(first_candles[0][0])
+
+    if since >= until:
+        return None
+
+    return since, until
+
+
+class MarketBackfill:
+    """
+    Collect the fetched windows of a market & write them ordered by time,
+    so the last candle in the database never skips a missing window
+    """
+
+    def __init__(
+        self, market: Market, timeframe: Timeframes, windows: List[Tuple[int, int]]
+    ):
+        self.market: Market = market
+        self.timeframe: Timeframes = timeframe
+        self.windows: List[Tuple[int, int]] = windows
+        self.candles: int = 0
+        self.failed: bool = False
+        self.pending: int = len(windows)
+        self._next: int = 0
+        self._pages: Dict[int, List[List[float]]] = dict()
+
+    def add(self, index: int, candles: List[List[float]]):
+        """Add the candles of a window & write all windows which are in order
+
+        Arguments:
+            index {int} -- index of the window
+            candles {List[List[float]]} -- candles of the window
+        """
+        if self.failed:
+            return
+
+        self._pages[index] = candles
+        while self._next in self._pages:
+            self.write(self._pages.pop(self._next))
+            self._next += 1
+
+    def fail(self):
+        """
+        Stop writing candles of this market, to avoid gaps in the database
+        """
+        self.failed = True
+        self._pages.clear()
+
+    def write(self, candles: List[List[float]]):
+        """Save candles into the database & build the higher timeframes
+        of 1m candles
+
+        Arguments:
+            candles {List[List[float]]} -- candles ordered by time
+        """
+        self.candles += save_candles(
+            candles=candles, timeframe=self.timeframe, market=self.market
+        )
+
+        # the higher timeframes are built from the 1m candles
+        if self.timeframe == Timeframes.MINUTE_1 and candles:
+            from django_crypto_trading_bot.trading_bot.resample import resample_market
+
+            resample_market(
+                market=self.market,
+                since=int(candles[0][0]),
+                until=int(candles[-1][0]) + timeframe_to_milliseconds(self.timeframe),
+            )
+
+
+def backfill_markets(
+    markets: List[Market],
+    timeframe: Timeframes,
+    concurrency: int = 8,
+    window_size: int = 500,
+    weight: Optional[int] = None,
+    exchange: Optional[Exchange] = None,
+    since: Optional[int] = None,
+) -> int:
+    """Download all missing candles of markets
+
+    The missing range of each market gets split into windows of window_size candles,
+    the windows of all markets are fetched concurrently under one rate limit per exchange
+    & written ordered by time.
+
+    Arguments:
+        markets {List[Market]} -- markets to update
+        timeframe {Timeframes} -- timeframe from candle
+
+    Keyword Arguments:
+        concurrency {int} -- parallel requests (default: {8})
+        window_size {int} -- candles per window & request (default: {500})
+        weight {Optional[int]} -- request weight per minute of each exchange (default: {None})
+        exchange {Optional[Exchange]} -- exchange client for all markets (default: {None})
+        since {Optional[int]} -- first timestamp in milliseconds of markets
+                                 without candles, by default their first candle (default: {None})
+
+    Returns:
+        int -- amount of saved candles
+    """
+
+    def windows() -> Iterator[Tuple[MarketBackfill, int, Exchange]]:
+        for market in markets:
+            # shared client, all requests go through the rate limit of the exchange
+            market_exchange: Exchange = exchange or get_client(
+                exchange_id=market.exchange
+            )
+            if weight:
+                get_rate_limit(market.exchange, weight=weight)
+
+            missing: Optional[Tuple[int, int]] = get_missing_range(
+                exchange=market_exchange,
+                market=market,
+                timeframe=timeframe,
+                since=since,
+            )
+            if not missing:
+                continue
+
+            backfill: MarketBackfill = MarketBackfill(
+                market=market,
+                timeframe=timeframe,
+                windows=split_range(
+                    since=missing[0],
+                    until=missing[1],
+                    timeframe=timeframe,
+                    window_size=window_size,
+                ),
+            )
+            for index in range(len(backfill.windows)):
+                yield backfill, index, market_exchange
+
+    candles: int = 0
+    pending: Dict[Future, Tuple[MarketBackfill, int]] = dict()
+
+    def collect(max_pending: int):
+        nonlocal candles
+
+        while len(pending) > max_pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                backfill, index = pending.pop(future)
+                backfill.pending -= 1
+                try:
+                    backfill.add(index, future.result())
+                except (BaseError, DatabaseError) as e:
+                    # only the failed market stops, the other markets go on
+                    logger.error(
+                        "Update market {} for timeframe {} failed with {}".format(
+                            backfill.market.symbol, timeframe, e
+                        )
+                    )
+                    backfill.fail()
+
+                if not backfill.pending:
+                    candles += backfill.candles
+                    logger.info(
+                        "Update market {} for timeframe {}.".format(
+                            backfill.market.symbol, timeframe
+                        )
+                    )
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        for backfill, index, market_exchange in windows():
+            window_since, window_until = backfill.windows[index]
+            future: Future = pool.submit(
+                fetch_window,
+                exchange=market_exchange,
+                symbol=backfill.market.symbol,
+                timeframe=timeframe,
+                since=window_since,
+                until=window_until,
+                limit=window_size,
+            )
+            pending[future] = (backfill, index)
+
+            # keep the fetched but unwritten windows in memory small
+            collect(max_pending=concurrency * 2)
+
+        collect(max_pending=0)
+
+    return candles
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
 
 import pytz
 from ccxt import Exchange
-from django.utils import timezone
+from ccxt.base.errors import BaseError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from django_crypto_trading_bot.trading_bot.models import (
+    Account,
     Bot,
     Currency,
     Market,
@@ -16,6 +23,20 @@ from django_crypto_trading_bot.trading_bot.models import (
 )
 
 from ..exceptions import NoMarket
+from ..performance import record_orders
+from .paper import PAPER_ORDER_PREFIX, PaperExchange, fill_paper_orders
+
+logger = logging.getLogger(__name__)
+
+# accounts with a running order sync lane
+_running_lanes: Set[int] = set()
+_running_lanes_lock: threading.Lock = threading.Lock()
+
+
+class OrderSyncResult(NamedTuple):
+    orders: List[Order]  # updated orders, unsaved
+    trades: List[Trade]  # new trades, unsaved
+    cursors: Dict[str, int]  # since of the next trade fetch by cache key
 
 
 def create_order(
@@ -35,44 +56,30 @@ def create_order(
     :param isTestOrder: is this a test order?
     :return: Order object
     """
-    exchange: Exchange = bot.account.get_account_client()
-
     params = {"test": isTestOrder}  # test if it's valid, but don't actually place it
 
     order_type: str = "LIMIT"
     if not price:
         order_type = "MARKET"
 
+    exchange: Exchange
     if isTestOrder:
+        # simulate the order without a request & database lookup
+        exchange = PaperExchange(exchange_id=bot.account.exchange)
+    else:
+        exchange = bot.account.get_account_client()
 
-        if not price:
-            price = Decimal(1)
-
-        return Order.objects.create(
-            bot=bot,
-            status=Order.Status.OPEN,
-            order_id=len(Order.objects.all()) + 1,
-            order_type=order_type,
-            side=side,
-            timestamp=timezone.now(),
-            price=price,
-            amount=amount,
-            filled=Decimal(0),
+    cctx_order: dict
+    if not price:
+        cctx_order = exchange.create_order(
+            market.symbol, order_type, side, amount, params=params
         )
     else:
-        cctx_order: dict
-        if not price:
-            cctx_order = exchange.create_order(
-                market.symbol, order_type, side, amount, params
-            )
-
-            return create_order_from_api_response(cctx_order, bot)
-        else:
-            cctx_order = exchange.create_order(
-                market.symbol, order_type, side, amount, price, params
-            )
+        cctx_order = exchange.create_order(
+            market.symbol, order_type, side, amount, price, params
+        )
 
-            return create_order_from_api_response(cctx_order, bot)
+    return create_order_from_api_response(cctx_order, bot)
 
 
 def create_order_from_api_response(cctx_order: dict, bot: Bot) -> Order:
@@ -163,9 +170,366 @@ def get_order_from_exchange(order: Order):
     return update_order_from_api_response(cctx_order=cctx_order, order=order)
 
 
-def update_all_open_orders():
+def get_order_symbol(order: Order) -> str:
+    """
+    get the market symbol of an order
+    """
+    if order.market:
+        return order.market.symbol
+    if order.bot.market:
+        return order.bot.market.symbol
+    # todo test exception
+    raise NoMarket("Bot & order has no market!")
+
+
+def get_currency(short: str, currencies: Dict[str, Currency]) -> Currency:
+    """
+    get a currency from the preloaded currencies or create it
+    """
+    currency: Optional[Currency] = currencies.get(short)
+    if not currency:
+        currency, created = Currency.objects.get_or_create(short=short)
+        currencies[short] = currency
+    return currency
+
+
+def apply_order_response(
+    cctx_order: dict, order: Order, currencies: Dict[str, Currency]
+) -> Order:
+    """
+    Set the values of an API response on an order without saving it
+    """
+    order.status = cctx_order["status"]
+    order.filled = Decimal(cctx_order["filled"])
+
+    fee: Optional[dict] = cctx_order.get("fee")
+    if fee and fee.get("currency"):
+        order.fee_currency = get_currency(fee["currency"], currencies)
+        order.fee_cost = Decimal(fee["cost"])
+        if fee.get("rate") is not None:
+            order.fee_rate = Decimal(fee["rate"])
+
+    return order
+
+
+def get_trade_from_api_response(
+    order_trade: dict, order: Order, currencies: Dict[str, Currency]
+) -> Optional[Trade]:
+    """
+    Parse a trade of an API response into an unsaved trade
+    """
+    fee: Optional[dict] = order_trade.get("fee")
+    if not fee or not fee.get("currency"):
+        return None
+
+    return Trade(
+        order=order,
+        trade_id=order_trade["id"],
+        timestamp=datetime.fromtimestamp(
+            order_trade["timestamp"] / 1000, tz=pytz.timezone("UTC")
+        ),
+        taker_or_maker=order_trade["takerOrMaker"],
+        amount=Decimal(order_trade["amount"]),
+        fee_currency=get_currency(fee["currency"], currencies),
+        fee_cost=Decimal(fee["cost"]),
+        fee_rate=Decimal(fee["rate"]) if fee.get("rate") is not None else None,
+    )
+
+
+def fetch_order_responses(
+    exchange: Exchange, symbol: str, orders: List[Order]
+) -> Dict[str, dict]:
+    """
+    Fetch the API responses of open orders of a single market,
+    with bulk requests & single requests only for orders which are missing
+
+    return -> API responses by order id
+    """
+    responses: Dict[str, dict] = dict()
+    order_ids: Set[str] = {order.order_id for order in orders}
+
+    if len(orders) > 1:
+        if exchange.has.get("fetchOpenOrders"):
+            for cctx_order in exchange.fetch_open_orders(symbol=symbol):
+                if cctx_order["id"] in order_ids:
+                    responses[cctx_order["id"]] = cctx_order
+
+        missing: List[Order] = [
+            order for order in orders if order.order_id not in responses
+        ]
+        if missing:
+            since: int = int(
+                min(order.timestamp for order in missing).timestamp() * 1000
+            )
+
+            cctx_orders: List[dict] = list()
+            if exchange.has.get("fetchOrders"):
+                cctx_orders = exchange.fetch_orders(symbol=symbol, since=since)
+            elif exchange.has.get("fetchClosedOrders"):
+                cctx_orders = exchange.fetch_closed_orders(symbol=symbol, since=since)
+
+            for cctx_order in cctx_orders:
+                if cctx_order["id"] in order_ids:
+                    responses[cctx_order["id"]] = cctx_order
+
+    # fall back to single requests
+    for order in orders:
+        if order.order_id not in responses:
+            responses[order.order_id] = exchange.fetch_order(
+                id=order.order_id, symbol=symbol
+            )
+
+    return responses
+
+
+def order_sync_key(account: Account, symbol: str) -> str:
+    return "order-sync-{}-{}".format(account.pk, symbol)
+
+
+def fetch_order_trades(
+    exchange: Exchange, account: Account, symbol: str, orders: List[Order]
+) -> Tuple[Dict[str, List[dict]], int]:
     """
-    update all open orders
+    Fetch the trades of a market since the last sync,
+    the new cursor is stored only after the trades are saved
+
+    return -> API trades by order id & the since of the next fetch
     """
-    for order in Order.objects.filter(status=Order.Status.OPEN):
-        get_order_from_exchange(order=order)
+    since: int = cache.get(order_sync_key(account, symbol)) or int(
+        min(order.timestamp for order in orders).timestamp() * 1000
+    )
+    now: int = exchange.milliseconds()
+
+    trades: Dict[str, List[dict]] = dict()
+    for order_trade in exchange.fetch_my_trades(symbol=symbol, since=since):
+        trades.setdefault(order_trade["order"], list()).append(order_trade)
+
+    return trades, now
+
+
+def sync_account_orders(
+    account: Account, orders: List[Order], currencies: Dict[str, Currency]
+) -> OrderSyncResult:
+    """
+    Fetch the updates of all open orders of an account, grouped by market
+
+    return -> updated orders & new trades, both unsaved, with the trade cursors
+    """
+    exchange: Exchange = account.get_account_client()
+
+    symbols: Dict[str, List[Order]] = dict()
+    for order in orders:
+        symbols.setdefault(get_order_symbol(order), list()).append(order)
+
+    updated_orders: List[Order] = list()
+    trades: List[Trade] = list()
+    cursors: Dict[str, int] = dict()
+
+    for symbol, symbol_orders in symbols.items():
+        responses: Dict[str, dict] = fetch_order_responses(
+            exchange=exchange, symbol=symbol, orders=symbol_orders
+        )
+
+        for order in symbol_orders:
+            updated_orders.append(
+                apply_order_response(
+                    cctx_order=responses[order.order_id],
+                    order=order,
+                    currencies=currencies,
+                )
+            )
+
+        filled_orders: List[Order] = [order for order in symbol_orders if order.filled]
+        if not filled_orders:
+            continue
+
+        order_trades: Dict[str, List[dict]] = dict()
+        if exchange.has.get("fetchMyTrades"):
+            order_trades, cursor = fetch_order_trades(
+                exchange=exchange, account=account, symbol=symbol, orders=filled_orders
+            )
+            cursors[order_sync_key(account, symbol)] = cursor
+
+        for order in filled_orders:
+            for order_trade in (
+                order_trades.get(order.order_id)
+                or responses[order.order_id].get("trades")
+                or list()
+            ):
+                trade: Optional[Trade] = get_trade_from_api_response(
+                    order_trade=order_trade, order=order, currencies=currencies
+                )
+                if trade:
+                    trades.append(trade)
+
+    return OrderSyncResult(orders=updated_orders, trades=trades, cursors=cursors)
+
+
+def save_order_updates(
+    orders: List[Order], trades: List[Trade], cursors: Optional[Dict[str, int]] = None
+):
+    """
+    Save updated orders & new trades in a single transaction,
+    the trade cursors move only after the transaction is saved
+    """
+    with transaction.atomic():
+        Order.objects.bulk_update(
+            orders, ["status", "filled", "fee_currency", "fee_cost", "fee_rate"]
+        )
+        Trade.objects.bulk_create(trades, ignore_conflicts=True)
+        # bulk_update sends no post_save signals
+        record_orders(orders)
+
+    if cursors:
+        cache.set_many(cursors, None)
+
+
+def sync_account_lane(
+    account: Account, orders: List[Order], currencies: Dict[str, Currency]
+) -> OrderSyncResult:
+    """
+    Worker lane of an account, runs sync_account_orders in a worker thread
+    """
+    with _running_lanes_lock:
+        _running_lanes.add(account.pk)
+
+    try:
+        return sync_account_orders(
+            account=account, orders=orders, currencies=currencies
+        )
+    except BaseError as e:
+        logger.error("Update orders of account {} failed with {}".format(account, e))
+        return OrderSyncResult(orders=list(), trades=list(), cursors=dict())
+    finally:
+        with _running_lanes_lock:
+            _running_lanes.discard(account.pk)
+        # worker threads open their own database connection
+        connection.close()
+
+
+def update_all_open_orders(
+    workers: Optional[int] = None, deadline: Optional[float] = None
+):
+    """Update all open orders, each account in its own worker lane.
+    Lanes which miss the deadline are skipped & synced again in the next tick.
+    Simulated orders are filled by the candles of their market.
+
+    Keyword Arguments:
+        workers {Optional[int]} -- max parallel accounts,
+                                   default settings.ORDER_SYNC_WORKERS (default: {None})
+        deadline {Optional[float]} -- seconds until the updates get saved,
+                                      default settings.ORDER_SYNC_DEADLINE (default: {None})
+    """
+    if workers is None:
+        workers = settings.ORDER_SYNC_WORKERS
+    if deadline is None:
+        deadline = settings.ORDER_SYNC_DEADLINE
+
+    accounts: Dict[int, Account] = dict()
+    account_orders: Dict[int, List[Order]] = dict()
+
+    order: Order
+    for order in (
+        Order.objects.filter(status=Order.Status.OPEN)
+        # simulated orders are unknown to the exchange
+        .exclude(order_id__startswith=PAPER_ORDER_PREFIX).select_related(
+            "bot__account",
+            "bot__market__base",
+            "bot__market__quote",
+            "market__base",
+            "market__quote",
+        )
+    ):
+        accounts[order.bot.account.pk] = order.bot.account
+        account_orders.setdefault(order.bot.account.pk, list()).append(order)
+
+    with _running_lanes_lock:
+        for account_pk in _running_lanes.intersection(account_orders):
+            # lane of the last tick is still running
+            logger.warning(
+                "Skip orders of account {}, last sync is still running".format(
+                    accounts[account_pk]
+                )
+            )
+            del account_orders[account_pk]
+
+    # simulated orders are unknown to the exchange & filled by its candles
+    updated_orders: List[Order] = fill_paper_orders(
+        list(
+            Order.objects.filter(
+                status=Order.Status.OPEN, order_id__startswith=PAPER_ORDER_PREFIX
+            ).select_related("bot__market", "market")
+        )
+    )
+
+    if not account_orders:
+        save_order_updates(orders=updated_orders, trades=list())
+        return
+
+    currencies: Dict[str, Currency] = {
+        currency.short: currency for currency in Currency.objects.all()
+    }
+
+    trades: List[Trade] = list()
+    cursors: Dict[str, int] = dict()
+
+    if workers <= 1:
+        for account_pk, orders in account_orders.items():
+            try:
+                result: OrderSyncResult = sync_account_orders(
+                    account=accounts[account_pk], orders=orders, currencies=currencies
+                )
+            except Exception as e:
+                # a failed account doesn't stop the updates of the other accounts
+                logger.error(
+                    "Update orders of account {} failed with {}".format(
+                        accounts[account_pk], e
+                    )
+                )
+                continue
+
+            updated_orders.extend(result.orders)
+            trades.extend(result.trades)
+            cursors.update(result.cursors)
+    else:
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=min(workers, len(account_orders))
+        )
+        lanes: Dict[Future, Account] = {
+            executor.submit(
+                sync_account_lane,
+                account=accounts[account_pk],
+                orders=orders,
+                currencies=currencies,
+            ): accounts[account_pk]
+            for account_pk, orders in account_orders.items()
+        }
+        # don't block the tick for lanes which miss the deadline
+        executor.shutdown(wait=False)
+
+        done, not_done = wait(lanes, timeout=deadline)
+
+        for lane in done:
+            try:
+                result = lane.result()
+            except Exception as e:
+                # a failed lane doesn't stop the updates of the other accounts
+                logger.error(
+                    "Update orders of account {} failed with {}".format(lanes[lane], e)
+                )
+                continue
+
+            updated_orders.extend(result.orders)
+            trades.extend(result.trades)
+            cursors.update(result.cursors)
+
+        for lane in not_done:
+            lane.cancel()
+            logger.warning(
+                "Update orders of account {} missed the deadline of {}s".format(
+                    lanes[lane], deadline
+                )
+            )
+
+    # the cursors of skipped & failed lanes stay, their trades are fetched again
+    save_order_updates(orders=updated_orders, trades=trades, cursors=cursors)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from ccxt.base.errors import BaseError, InvalidOrder
+from ccxt.base.exchange import Exchange
+
+from django_crypto_trading_bot.trading_bot.models import Market, Order, Timeframes
+
+from .client import get_client
+from .ohlcv import fetch_candles
+from .ticker import Ticker, TickerSnapshot, get_ticker_snapshot
+
+logger = logging.getLogger(__name__)
+
+# order ids of simulated orders start with this prefix
+PAPER_ORDER_PREFIX: str = "paper-"
+# latest 1m candles which can fill an open simulated order, one per minute
+# covers the ticks missed by the trade cron in the last hour
+PAPER_FILL_CANDLES: int = 60
+MINUTE: int = 60 * 1000
+
+
+def paper_order_id() -> str:
+    """Get a new unique id for a simulated order, without any database query
+
+    Returns:
+        str -- order id
+    """
+    return "{}{}".format(PAPER_ORDER_PREFIX, uuid.uuid4().hex)
+
+
+class PaperExchange:
+    """
+    Exchange which simulates orders & answers like a ccxt client,
+    limit orders stay open until fill_paper_orders closes them
+    & market orders are filled at once at the current ticker price
+    """
+
+    has: dict = {"createOrder": True}
+
+    def __init__(self, exchange_id: str):
+        self.id: str = exchange_id
+
+    def milliseconds(self) -> int:
+        return int(time.time() * 1000)
+
+    def get_market_price(self, symbol: str, side: str) -> Decimal:
+        """Get the price of a market order from the shared ticker snapshot,
+        buy orders pay the ask & sell orders get the bid
+
+        Arguments:
+            symbol {str} -- market symbol like TRX/BNB
+            side {str} -- "buy" or "sell"
+
+        Raises:
+            InvalidOrder: the market has no price
+
+        Returns:
+            Decimal -- price of the order
+        """
+        snapshot: TickerSnapshot = get_ticker_snapshot(self.id)
+        if symbol not in snapshot:
+            raise InvalidOrder("No ticker of {} to fill the order".format(symbol))
+
+        ticker: Ticker = snapshot[symbol]
+        price: Optional[float] = ticker.ask if side == "buy" else ticker.bid
+        if not price:
+            price = ticker.last
+        if not price:
+            raise InvalidOrder("No price of {} to fill the order".format(symbol))
+        return Decimal(str(price))
+
+    def create_order(
+        self,
+        symbol: str,
+        type: str,
+        side: str,
+        amount: Decimal,
+        price: Optional[Decimal] = None,
+        params: dict = {},
+    ) -> dict:
+        """Simulate an order
+
+        Arguments:
+            symbol {str} -- market symbol like TRX/BNB
+            type {str} -- "limit" or "market"
+            side {str} -- "buy" or "sell"
+            amount {Decimal} -- amount of base currency
+
+        Keyword Arguments:
+            price {Optional[Decimal]} -- limit price, market orders are filled
+                                         at the ticker price without a price (default: {None})
+            params {dict} -- extra parameters, unused (default: {{}})
+
+        Returns:
+            dict -- order like https://github.com/ccxt/ccxt/wiki/Manual#order-structure
+        """
+        order_type: str = type.lower()
+        amount = Decimal(amount)
+        price = self.get_market_price(symbol, side) if price is None else Decimal(price)
+
+        filled: Decimal = amount if order_type == "market" else Decimal(0)
+        timestamp: int = self.milliseconds()
+
+        return {
+            "id": paper_order_id(),
+            "timestamp": timestamp,
+            "datetime": None,
+            "lastTradeTimestamp": timestamp if filled else None,
+            "status": "closed" if filled else "open",
+            "symbol": symbol,
+            "type": order_type,
+            "side": side,
+            "price": price,
+            "amount": amount,
+            "filled": filled,
+            "remaining": amount - filled,
+            "cost": filled * price,
+            "trades": [],
+            "fee": None,
+        }
+
+
+def fill_paper_orders(
+    orders: List[Order], exchange: Optional[Exchange] = None
+) -> List[Order]:
+    """Fill open simulated limit orders like the exchange, an order is closed
+    if a 1m candle after its creation crosses its price
+
+    Arguments:
+        orders {List[Order]} -- open simulated orders
+
+    Keyword Arguments:
+        exchange {Optional[Exchange]} -- exchange client,
+                                         default is the shared public client (default: {None})
+
+    Returns:
+        List[Order] -- filled orders, unsaved
+    """
+    by_symbol: Dict[Tuple[str, str], List[Order]] = dict()
+    for order in orders:
+        market: Optional[Market] = order.market or order.bot.market
+        if market:
+            by_symbol.setdefault((market.exchange, market.symbol), list()).append(order)
+
+    filled: List[Order] = list()
+    for (exchange_id, symbol), symbol_orders in by_symbol.items():
+        try:
+            candles: List[List[float]] = fetch_candles(
+                exchange=exchange or get_client(exchange_id=exchange_id),
+                symbol=symbol,
+                timeframe=Timeframes.MINUTE_1,
+                since=None,
+                limit=PAPER_FILL_CANDLES,
+            )
+        except BaseError as e:
+            logger.error("Fill paper orders of {} failed with {}".format(symbol, e))
+            continue
+
+        for order in symbol_orders:
+            created: float = order.timestamp.timestamp() * 1000
+            # candles which end after the order was created
+            prices: List[List[float]] = [
+                candle for candle in candles if candle[0] + MINUTE > created
+            ]
+            if order.side == Order.Side.SIDE_BUY:
+                crossed: bool = any(candle[3] <= order.price for candle in prices)
+            else:
+                crossed = any(candle[2] >= order.price for candle in prices)
+
+            if crossed:
+                order.status = Order.Status.CLOSED
+                order.filled = order.amount
+                filled.append(order)
+
+    return filled
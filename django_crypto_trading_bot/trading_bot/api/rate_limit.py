@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+# default request weight per minute for exchanges without settings.EXCHANGE_RATE_LIMITS
+DEFAULT_WEIGHT: int = 1200
+
+
+class RateLimit:
+    """
+    Token bucket shared by all threads which send requests to the same exchange
+    """
+
+    def __init__(self, weight: int = DEFAULT_WEIGHT):
+        self._lock: threading.Lock = threading.Lock()
+        self.weight: int = weight
+        self._tokens: float = float(weight)
+        self._updated: float = time.monotonic()
+
+    def configure(self, weight: int):
+        """Change the request weight per minute of the bucket
+
+        Arguments:
+            weight {int} -- request weight per minute
+        """
+        with self._lock:
+            self.weight = weight
+            self._tokens = min(self._tokens, float(weight))
+
+    def _refill(self):
+        now: float = time.monotonic()
+        self._tokens = min(
+            float(self.weight), self._tokens + (now - self._updated) * self.weight / 60
+        )
+        self._updated = now
+
+    def consume(self, cost: float = 1):
+        """Block until the bucket has enough tokens for a request
+
+        Keyword Arguments:
+            cost {float} -- request weight (default: {1})
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                delay: float = (cost - self._tokens) * 60 / self.weight
+
+            time.sleep(delay)
+
+
+_rate_limits: Dict[str, RateLimit] = dict()
+_rate_limits_lock: threading.Lock = threading.Lock()
+
+
+def get_rate_limit(exchange_id: str, weight: Optional[int] = None) -> RateLimit:
+    """Get the process wide rate limit of an exchange
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Keyword Arguments:
+        weight {Optional[int]} -- change the request weight per minute,
+                                  default from settings.EXCHANGE_RATE_LIMITS (default: {None})
+
+    Returns:
+        RateLimit -- shared token bucket of the exchange
+    """
+    with _rate_limits_lock:
+        rate_limit: Optional[RateLimit] = _rate_limits.get(exchange_id)
+        if not rate_limit:
+            rate_limit = RateLimit(
+                weight=weight
+                or settings.EXCHANGE_RATE_LIMITS.get(exchange_id, DEFAULT_WEIGHT)
+            )
+            _rate_limits[exchange_id] = rate_limit
+            return rate_limit
+
+    if weight:
+        rate_limit.configure(weight)
+    return rate_limit
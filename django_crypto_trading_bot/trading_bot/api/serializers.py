@@ -0,0 +1,163 @@
+from typing import Set
+
+from rest_framework import serializers
+
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Bot,
+    Market,
+    Order,
+    Saving,
+    Trade,
+)
+
+# query parameter with the comma separated fields of a response
+FIELDS_PARAM: str = "fields"
+
+
+class SparseFieldsMixin:
+    """
+    Serialize only the fields of ?fields=a,b, unknown fields are ignored
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get("request")
+        if not request or not request.query_params.get(FIELDS_PARAM):
+            return
+
+        selected: Set[str] = set(request.query_params[FIELDS_PARAM].split(","))
+        for name in set(self.fields) - selected:
+            self.fields.pop(name)
+
+
+class MarketSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    symbol = serializers.CharField(read_only=True)
+    base = serializers.SlugRelatedField(slug_field="short", read_only=True)
+    quote = serializers.SlugRelatedField(slug_field="short", read_only=True)
+
+    class Meta:
+        model = Market
+        fields = [
+            "id",
+            "exchange",
+            "symbol",
+            "base",
+            "quote",
+            "active",
+            "precision_amount",
+            "precision_price",
+            "limits_amount_min",
+            "limits_amount_max",
+            "limits_price_min",
+            "limits_price_max",
+            "limits_changed_at",
+        ]
+
+
+class OHLCVSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OHLCV
+        fields = [
+            "id",
+            "market",
+            "timeframe",
+            "timestamp",
+            "open_price",
+            "highest_price",
+            "lowest_price",
+            "closing_price",
+            "volume",
+        ]
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    fee_currency = serializers.SlugRelatedField(slug_field="short", read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "bot",
+            "next_order",
+            "order_id",
+            "timestamp",
+            "status",
+            "order_type",
+            "side",
+            "price",
+            "amount",
+            "filled",
+            "fee_currency",
+            "fee_cost",
+            "fee_rate",
+            "market",
+        ]
+
+
+class TradeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    fee_currency = serializers.SlugRelatedField(slug_field="short", read_only=True)
+
+    class Meta:
+        model = Trade
+        fields = [
+            "id",
+            "order",
+            "trade_id",
+            "timestamp",
+            "taker_or_maker",
+            "amount",
+            "fee_currency",
+            "fee_cost",
+            "fee_rate",
+        ]
+
+
+class SavingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    currency = serializers.SlugRelatedField(slug_field="short", read_only=True)
+
+    class Meta:
+        model = Saving
+        fields = ["id", "bot", "order", "amount", "currency"]
+
+
+class BotSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # stats of the performance ledger
+    start_amount = serializers.DecimalField(
+        max_digits=30, decimal_places=8, read_only=True
+    )
+    current_amount = serializers.DecimalField(
+        max_digits=30, decimal_places=8, read_only=True
+    )
+    estimate_current_amount = serializers.DecimalField(
+        max_digits=30, decimal_places=8, read_only=True
+    )
+    roi = serializers.DecimalField(max_digits=30, decimal_places=2, read_only=True)
+    estimate_roi = serializers.DecimalField(
+        max_digits=30, decimal_places=2, read_only=True
+    )
+    orders_count = serializers.IntegerField(read_only=True)
+    realized_pnl = serializers.DecimalField(
+        max_digits=30, decimal_places=8, read_only=True
+    )
+
+    class Meta:
+        model = Bot
+        fields = [
+            "id",
+            "account",
+            "trade_mode",
+            "created",
+            "active",
+            "market",
+            "timeframe",
+            "quote",
+            "start_amount",
+            "current_amount",
+            "estimate_current_amount",
+            "roi",
+            "estimate_roi",
+            "orders_count",
+            "realized_pnl",
+        ]
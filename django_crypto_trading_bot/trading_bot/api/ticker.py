@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from ccxt.base.exchange import Exchange
+from django.conf import settings
+from django.core.cache import cache
+
+from .client import get_client
+
+logger = logging.getLogger(__name__)
+
+# seconds until the tickers of an exchange are fetched again
+TICKER_SNAPSHOT_TTL: int = 50
+
+
+class Ticker(NamedTuple):
+    """
+    Compact ticker with the fields needed by the bots
+    """
+
+    symbol: str
+    percentage: Optional[float]
+    last: Optional[float]
+    bid: Optional[float]
+    ask: Optional[float]
+
+    @staticmethod
+    def from_ccxt(ticker: dict) -> Ticker:
+        return Ticker(
+            symbol=ticker["symbol"],
+            percentage=ticker.get("percentage"),
+            last=ticker.get("last"),
+            bid=ticker.get("bid"),
+            ask=ticker.get("ask"),
+        )
+
+
+class TickerSnapshot:
+    """
+    Read only snapshot of all tickers of an exchange,
+    ordered by percentage with the highest rise first
+    """
+
+    def __init__(self, tickers: Iterable[Ticker], timestamp: int):
+        self.timestamp: int = timestamp
+        self.tickers: Tuple[Ticker, ...] = tuple(
+            sorted(
+                tickers,
+                reverse=True,
+                # tickers without percentage are the lowest
+                key=lambda ticker: (
+                    ticker.percentage is not None,
+                    ticker.percentage or 0,
+                ),
+            )
+        )
+        self.by_symbol: Dict[str, Ticker] = {
+            ticker.symbol: ticker for ticker in self.tickers
+        }
+
+    @staticmethod
+    def from_ccxt(tickers: Dict[str, dict], timestamp: int) -> TickerSnapshot:
+        """Create a snapshot from a fetch_tickers response
+
+        Arguments:
+            tickers {Dict[str, dict]} -- ccxt tickers by symbol
+            timestamp {int} -- fetch time in milliseconds
+
+        Returns:
+            TickerSnapshot -- ordered snapshot
+        """
+        return TickerSnapshot(
+            tickers=(Ticker.from_ccxt(ticker) for ticker in tickers.values()),
+            timestamp=timestamp,
+        )
+
+    def __reduce__(self):
+        # store only the ordered tickers in the cache, by_symbol is rebuilt on load
+        return (TickerSnapshot, (self.tickers, self.timestamp))
+
+    def __getitem__(self, symbol: str) -> Ticker:
+        return self.by_symbol[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.by_symbol
+
+    def __iter__(self):
+        return iter(self.tickers)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+
+_fetch_locks: Dict[str, threading.Lock] = dict()
+_fetch_locks_lock: threading.Lock = threading.Lock()
+
+
+def ticker_snapshot_key(exchange_id: str) -> str:
+    return "ticker-snapshot-{}".format(exchange_id)
+
+
+def fetch_ticker_snapshot(exchange_id: str) -> TickerSnapshot:
+    """Fetch all tickers of an exchange, the snapshot is appended to the
+    ticker history if TICKER_HISTORY_ENABLED is set
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Returns:
+        TickerSnapshot -- ordered snapshot
+    """
+    exchange: Exchange = get_client(exchange_id=exchange_id)
+    snapshot: TickerSnapshot = TickerSnapshot.from_ccxt(
+        tickers=exchange.fetch_tickers(), timestamp=exchange.milliseconds()
+    )
+
+    if settings.TICKER_HISTORY_ENABLED:
+        from ..ticker_history import record_snapshot
+
+        try:
+            record_snapshot(exchange_id=exchange_id, snapshot=snapshot)
+        except OSError as e:
+            logger.error("Can't record tickers of {}: {}".format(exchange_id, e))
+
+    return snapshot
+
+
+def get_ticker_snapshot(exchange_id: str) -> TickerSnapshot:
+    """Get the shared ticker snapshot of an exchange,
+    the tickers are fetched only once per TICKER_SNAPSHOT_TTL
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Returns:
+        TickerSnapshot -- ordered snapshot
+    """
+    key: str = ticker_snapshot_key(exchange_id)
+
+    snapshot: Optional[TickerSnapshot] = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    with _fetch_locks_lock:
+        lock: threading.Lock = _fetch_locks.setdefault(exchange_id, threading.Lock())
+
+    # only one thread fetches the tickers, the others wait for the snapshot
+    with lock:
+        return cache.get_or_set(
+            key, lambda: fetch_ticker_snapshot(exchange_id), TICKER_SNAPSHOT_TTL
+        )
+
+
+def set_ticker_snapshot(exchange_id: str, snapshot: TickerSnapshot):
+    """Share a ticker snapshot with all bots of an exchange
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+        snapshot {TickerSnapshot} -- ordered snapshot
+    """
+    cache.set(ticker_snapshot_key(exchange_id), snapshot, TICKER_SNAPSHOT_TTL)
@@ -0,0 +1,333 @@
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pytz
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.viewsets import ReadOnlyModelViewSet
+
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Bot,
+    Market,
+    Order,
+    Saving,
+    Timeframes,
+    Trade,
+)
+from django_crypto_trading_bot.trading_bot.ohlcv_io import (
+    PRICE_COLUMNS,
+    read_candle_batches,
+)
+
+from .serializers import (
+    BotSerializer,
+    MarketSerializer,
+    OHLCVSerializer,
+    OrderSerializer,
+    SavingSerializer,
+    TradeSerializer,
+)
+
+# candles per chunk of a streamed response
+STREAM_CHUNK_SIZE: int = 10000
+JSON: str = "json"
+CSV: str = "csv"
+# columns of a streamed candle, like the candles of ccxt
+STREAM_COLUMNS: List[str] = ["timestamp"] + PRICE_COLUMNS
+
+
+class TimestampCursorPagination(CursorPagination):
+    ordering = "-timestamp"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class IdCursorPagination(TimestampCursorPagination):
+    ordering = "-id"
+
+
+def get_int_param(request: Request, name: str) -> Optional[int]:
+    """Get an optional integer query parameter
+
+    Arguments:
+        request {Request} -- API request
+        name {str} -- name of the parameter
+
+    Raises:
+        ValidationError: the parameter isn't an integer
+
+    Returns:
+        Optional[int] -- value of the parameter
+    """
+    value: Optional[str] = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "A valid integer is required."})
+
+
+def get_candle_validators(
+    request: Request, last_candle: Optional[OHLCV]
+) -> Tuple[str, Optional[int]]:
+    """Get the ETag & Last-Modified of a candle response from its latest candle,
+    the ETag changes also with the prices of an unfinished latest candle
+
+    Arguments:
+        request {Request} -- API request
+        last_candle {Optional[OHLCV]} -- latest candle of the response
+
+    Returns:
+        Tuple[str, Optional[int]] -- quoted ETag & UTC timestamp in seconds
+    """
+    key: List[str] = [request.get_full_path()]
+    if last_candle:
+        key += [
+            last_candle.timestamp.isoformat(),
+            str(last_candle.closing_price),
+            str(last_candle.volume),
+        ]
+    return (
+        quote_etag(hashlib.sha1("|".join(key).encode()).hexdigest()),
+        int(last_candle.timestamp.timestamp()) if last_candle else None,
+    )
+
+
+def to_rows(batch: pa.RecordBatch) -> list:
+    """Get the candles of a record batch as lists of STREAM_COLUMNS"""
+    columns: list = [
+        batch.column(batch.schema.get_field_index("timestamp"))
+        .cast(pa.int64())
+        .to_pylist()
+    ] + [
+        batch.column(batch.schema.get_field_index(name)).to_pylist()
+        for name in PRICE_COLUMNS
+    ]
+    return [list(row) for row in zip(*columns)]
+
+
+def stream_json(batches: Iterator[pa.RecordBatch]) -> Iterator[str]:
+    """Stream candles as one JSON array of [timestamp, open, high, low, close, volume]"""
+    yield "["
+    separator: str = ""
+    for batch in batches:
+        rows: list = to_rows(batch)
+        if rows:
+            yield separator + json.dumps(rows)[1:-1]
+            separator = ","
+    yield "]"
+
+
+def stream_csv(batches: Iterator[pa.RecordBatch]) -> Iterator[str]:
+    """Stream candles as CSV with a header line"""
+    buffer: io.StringIO = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(STREAM_COLUMNS)
+    for batch in batches:
+        writer.writerows(to_rows(batch))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class MarketViewSet(ReadOnlyModelViewSet):
+    serializer_class = MarketSerializer
+    queryset = Market.objects.select_related("base", "quote")
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        markets: QuerySet = self.queryset
+        if self.request.query_params.get("exchange"):
+            markets = markets.filter(exchange=self.request.query_params["exchange"])
+        if self.request.query_params.get("active"):
+            markets = markets.filter(
+                active=self.request.query_params["active"].lower() in ("1", "true")
+            )
+        return markets
+
+
+class OHLCVViewSet(ReadOnlyModelViewSet):
+    """
+    Candles of a market & timeframe, ?since= & ?until= in milliseconds
+    """
+
+    serializer_class = OHLCVSerializer
+    queryset = OHLCV.objects.all()
+    pagination_class = TimestampCursorPagination
+
+    def get_candle_filters(self) -> Tuple[Market, str, Optional[int], Optional[int]]:
+        """Get the required market & timeframe and the optional time range
+
+        Raises:
+            ValidationError: missing or invalid parameters
+
+        Returns:
+            Tuple[Market, str, Optional[int], Optional[int]] -- market, timeframe,
+                                                               since & until
+        """
+        market_id: Optional[int] = get_int_param(self.request, "market")
+        timeframe: Optional[str] = self.request.query_params.get("timeframe")
+        if market_id is None:
+            raise ValidationError({"market": "This parameter is required."})
+        if timeframe not in Timeframes.values:
+            raise ValidationError({"timeframe": "A valid timeframe is required."})
+        try:
+            market: Market = Market.objects.get(pk=market_id)
+        except Market.DoesNotExist:
+            raise ValidationError({"market": "Unknown market."})
+
+        return (
+            market,
+            timeframe,
+            get_int_param(self.request, "since"),
+            get_int_param(self.request, "until"),
+        )
+
+    def get_queryset(self) -> QuerySet:
+        if self.action == "retrieve":
+            return self.queryset
+
+        market, timeframe, since, until = self.get_candle_filters()
+        candles: QuerySet = self.queryset.filter(market=market, timeframe=timeframe)
+        if since is not None:
+            candles = candles.filter(
+                timestamp__gte=datetime.fromtimestamp(since / 1000, tz=pytz.UTC)
+            )
+        if until is not None:
+            candles = candles.filter(
+                timestamp__lt=datetime.fromtimestamp(until / 1000, tz=pytz.UTC)
+            )
+        return candles
+
+    def conditional_response(
+        self, request: Request, respond: Callable[[], HttpResponse]
+    ) -> HttpResponse:
+        """Answer with 304 if the latest candle is unchanged,
+        otherwise with the response of respond
+
+        Arguments:
+            request {Request} -- API request
+            respond {Callable[[], HttpResponse]} -- build the full response
+
+        Returns:
+            HttpResponse -- response with ETag & Last-Modified
+        """
+        last_candle: Optional[OHLCV] = (
+            self.get_queryset()
+            .only("timestamp", "closing_price", "volume")
+            .order_by("-timestamp")
+            .first()
+        )
+        etag, last_modified = get_candle_validators(request, last_candle)
+
+        response: Optional[HttpResponse] = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = respond()
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(OHLCVViewSet, self).list(request, *args, **kwargs)
+        )
+
+    @action(detail=False, methods=["GET"])
+    def stream(self, request):
+        """Stream all candles of the range as chunked JSON or CSV by ?output="""
+        output: str = request.query_params.get("output", JSON)
+        if output not in (JSON, CSV):
+            raise ValidationError({"output": "Choose json or csv."})
+        market, timeframe, since, until = self.get_candle_filters()
+
+        def respond() -> StreamingHttpResponse:
+            batches: Iterator[pa.RecordBatch] = read_candle_batches(
+                market=market,
+                timeframe=timeframe,
+                since=since,
+                until=until,
+                chunk_size=STREAM_CHUNK_SIZE,
+            )
+            if output == CSV:
+                return StreamingHttpResponse(
+                    stream_csv(batches), content_type="text/csv"
+                )
+            return StreamingHttpResponse(
+                stream_json(batches), content_type="application/json"
+            )
+
+        return self.conditional_response(request, respond)
+
+
+class OrderViewSet(ReadOnlyModelViewSet):
+    serializer_class = OrderSerializer
+    queryset = Order.objects.select_related("fee_currency")
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        orders: QuerySet = self.queryset.filter(bot__account__user=self.request.user)
+        bot_id: Optional[int] = get_int_param(self.request, "bot")
+        if bot_id is not None:
+            orders = orders.filter(bot_id=bot_id)
+        if self.request.query_params.get("status"):
+            orders = orders.filter(status=self.request.query_params["status"])
+        return orders
+
+
+class TradeViewSet(ReadOnlyModelViewSet):
+    serializer_class = TradeSerializer
+    queryset = Trade.objects.select_related("fee_currency")
+    pagination_class = TimestampCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        trades: QuerySet = self.queryset.filter(
+            order__bot__account__user=self.request.user
+        )
+        order_id: Optional[int] = get_int_param(self.request, "order")
+        if order_id is not None:
+            trades = trades.filter(order_id=order_id)
+        return trades
+
+
+class SavingViewSet(ReadOnlyModelViewSet):
+    serializer_class = SavingSerializer
+    queryset = Saving.objects.select_related("currency")
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        savings: QuerySet = self.queryset.filter(bot__account__user=self.request.user)
+        bot_id: Optional[int] = get_int_param(self.request, "bot")
+        if bot_id is not None:
+            savings = savings.filter(bot_id=bot_id)
+        return savings
+
+
+class BotViewSet(ReadOnlyModelViewSet):
+    """
+    Bots of the user with the stats of their performance ledger
+    """
+
+    serializer_class = BotSerializer
+    queryset = Bot.objects.select_related("performance")
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self) -> QuerySet:
+        return self.queryset.filter(account__user=self.request.user)
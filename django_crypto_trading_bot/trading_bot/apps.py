@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class TradingBotConfig(AppConfig):
-    name = "trading_bot"
+    name = "django_crypto_trading_bot.trading_bot"
+    verbose_name = "Trading Bot"
+
+    def ready(self):
+        import django_crypto_trading_bot.trading_bot.signals  # noqa F401
@@ -0,0 +1,691 @@
+from __future__ import annotations
+
+import logging
+from decimal import ROUND_DOWN, Decimal, localcontext
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .candles import Candles
+from .exceptions import PriceToHigh, PriceToLow
+from .models import Market, Order
+from .resample import DAY, get_periods
+from .trade import get_buy_amount
+
+logger = logging.getLogger(__name__)
+
+# candles of the first search for the next event, doubled for each further search
+SEARCH_SIZE: int = 4096
+
+# timestamps of the closing prices of all markets aligned at once
+ALIGN_WINDOW: int = 10000
+
+
+class BacktestTrade(NamedTuple):
+    timestamp: int  # UTC timestamp in milliseconds
+    symbol: str
+    side: str
+    price: Decimal
+    amount: Decimal
+
+
+class BacktestSaving(NamedTuple):
+    timestamp: int  # UTC timestamp in milliseconds
+    symbol: str
+    currency: str
+    amount: Decimal
+
+
+class BacktestResult(NamedTuple):
+    """
+    Trades, savings & equity in quote currency of a backtest
+    """
+
+    trades: List[BacktestTrade]
+    savings: List[BacktestSaving]
+    timestamp: np.ndarray
+    equity: np.ndarray
+
+    @property
+    def roi(self) -> float:
+        """
+        Return on investment in percent
+        """
+        if not self.equity.size or not self.equity[0]:
+            return 0.0
+        return float((self.equity[-1] - self.equity[0]) / self.equity[0] * 100)
+
+    @property
+    def drawdown(self) -> float:
+        """
+        Max drawdown of the equity in percent
+        """
+        return max_drawdown(self.equity)
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Get the max drawdown of an equity curve
+
+    Arguments:
+        equity {np.ndarray} -- equity over time
+
+    Returns:
+        float -- max drawdown in percent
+    """
+    if not equity.size:
+        return 0.0
+    peak: np.ndarray = np.maximum.accumulate(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown: np.ndarray = np.where(peak > 0, (peak - equity) / peak, 0)
+    return float(drawdown.max() * 100)
+
+
+def to_decimal(value: float) -> Decimal:
+    """
+    Convert a candle price like a stored OHLCV price
+    """
+    return Decimal(value).quantize(Decimal("0.00000001"))
+
+
+def find_first(
+    condition: Callable[[int, int], np.ndarray], start: int, end: int
+) -> Optional[int]:
+    """Find the first index of a condition, the condition is evaluated
+    on slices of growing size to skip long ranges without events fast
+
+    Arguments:
+        condition {Callable[[int, int], np.ndarray]} -- bool array for a slice
+        start {int} -- first index
+        end {int} -- end index (excluded)
+
+    Returns:
+        Optional[int] -- first index or None
+    """
+    size: int = SEARCH_SIZE
+    while start < end:
+        stop: int = min(start + size, end)
+        hits: np.ndarray = np.flatnonzero(condition(start, stop))
+        if hits.size:
+            return start + int(hits[0])
+        start = stop
+        size *= 2
+    return None
+
+
+class Ledger:
+    """
+    In memory balances of a backtest
+    """
+
+    def __init__(
+        self, quote: Decimal = Decimal(0), base: Optional[Dict[int, Decimal]] = None
+    ):
+        self.quote: Decimal = quote
+        self.base: Dict[int, Decimal] = base or dict()  # balance by market index
+        self.trades: List[BacktestTrade] = list()
+        self.savings: List[BacktestSaving] = list()
+        # balances after each event, (candle index, quote, base by market index)
+        self.events: List[Tuple[int, float, Dict[int, float]]] = list()
+        self.add_event(0)
+
+    def add_event(self, index: int):
+        self.events.append(
+            (
+                index,
+                float(self.quote),
+                {key: float(value) for key, value in self.base.items() if value},
+            )
+        )
+
+    def fill(
+        self,
+        index: int,
+        timestamp: int,
+        market_index: int,
+        market: Market,
+        side: str,
+        amount: Decimal,
+        price: Decimal,
+        fee_rate: Decimal,
+    ):
+        """Fill an order, the fee is paid in the received currency
+
+        Arguments:
+            index {int} -- candle index
+            timestamp {int} -- UTC timestamp in milliseconds
+            market_index {int} -- index of the market
+            market {Market} -- market of the order
+            side {str} -- buy or sell
+            amount {Decimal} -- amount of base currency
+            price {Decimal} -- fill price
+            fee_rate {Decimal} -- fee in percent
+        """
+        base: Decimal = self.base.get(market_index, Decimal(0))
+        fee: Decimal = Decimal(1) - fee_rate / Decimal(100)
+
+        if side == Order.Side.SIDE_BUY:
+            self.quote -= amount * price
+            base += amount * fee
+        else:
+            base -= amount
+            self.quote += amount * price * fee
+
+        self.base[market_index] = base
+        self.trades.append(
+            BacktestTrade(
+                timestamp=timestamp,
+                symbol=market.symbol,
+                side=side,
+                price=price,
+                amount=amount,
+            )
+        )
+        self.add_event(index)
+
+    def save(self, timestamp: int, market: Market, currency: str, amount: Decimal):
+        self.savings.append(
+            BacktestSaving(
+                timestamp=timestamp,
+                symbol=market.symbol,
+                currency=currency,
+                amount=amount,
+            )
+        )
+
+    def result(
+        self, timestamp: np.ndarray, close: Union[np.ndarray, AlignedCloses]
+    ) -> BacktestResult:
+        """Get the result with the equity at each candle
+
+        Arguments:
+            timestamp {np.ndarray} -- UTC timestamps in milliseconds
+            close {Union[np.ndarray, AlignedCloses]} -- closing prices,
+                                                        shape (markets, candles)
+
+        Returns:
+            BacktestResult -- trades, savings & equity
+        """
+        equity: np.ndarray = np.zeros(timestamp.size, dtype=np.float64)
+
+        for event, (index, quote, base) in enumerate(self.events):
+            end: int = (
+                self.events[event + 1][0]
+                if event + 1 < len(self.events)
+                else timestamp.size
+            )
+            if end <= index:
+                continue
+
+            equity[index:end] = quote
+            for market_index, amount in base.items():
+                equity[index:end] += amount * np.nan_to_num(
+                    close[market_index, index:end]
+                )
+
+        return BacktestResult(
+            trades=self.trades,
+            savings=self.savings,
+            timestamp=timestamp,
+            equity=equity,
+        )
+
+
+def backtest_wave_rider(
+    market: Market,
+    candles: Candles,
+    timeframe: str,
+    amount: Decimal,
+    fee_rate: Decimal,
+    side: str = Order.Side.SIDE_BUY,
+) -> BacktestResult:
+    """Replay candles through the wave rider, starting with an order like init_trade.
+    Orders are filled when a later candle reaches the order price,
+    the next order gets the high or low of the current bot timeframe candle.
+
+    Arguments:
+        market {Market} -- market of the bot
+        candles {Candles} -- candles to detect filled orders, like 1m candles
+        timeframe {str} -- timeframe of the bot
+        amount {Decimal} -- amount of base currency of the first order
+        fee_rate {Decimal} -- fee in percent
+
+    Keyword Arguments:
+        side {str} -- side of the first order (default: {Order.Side.SIDE_BUY})
+
+    Returns:
+        BacktestResult -- trades, savings & equity in quote currency
+    """
+    close: np.ndarray = candles.close.reshape(1, -1)
+
+    if not candles.size:
+        return Ledger().result(timestamp=candles.timestamp, close=close)
+
+    periods: np.ndarray = get_periods(candles.timestamp, timeframe)
+
+    # the first order is placed at the first candle
+    price: Decimal
+    ledger: Ledger
+    if side == Order.Side.SIDE_BUY:
+        price = to_decimal(candles.low[0])
+        ledger = Ledger(quote=amount * price)
+    else:
+        price = to_decimal(candles.high[0])
+        ledger = Ledger(base={0: amount})
+
+    index: int = 0
+    while True:
+        # wait until the open order is filled
+        limit: float = float(price)
+        fill: Optional[int]
+        if side == Order.Side.SIDE_BUY:
+            fill = find_first(
+                lambda start, stop: candles.low[start:stop] <= limit,
+                index + 1,
+                candles.size,
+            )
+        else:
+            fill = find_first(
+                lambda start, stop: candles.high[start:stop] >= limit,
+                index + 1,
+                candles.size,
+            )
+        if fill is None:
+            break
+
+        timestamp: int = int(candles.timestamp[fill])
+        ledger.fill(
+            index=fill,
+            timestamp=timestamp,
+            market_index=0,
+            market=market,
+            side=side,
+            amount=amount,
+            price=price,
+            fee_rate=fee_rate,
+        )
+
+        # current candle of the bot timeframe until the fill
+        period_start: int = int(np.searchsorted(periods, periods[fill]))
+        retrade_price: Decimal
+        if side == Order.Side.SIDE_BUY:
+            retrade_price = to_decimal(candles.high[period_start : fill + 1].max())
+        else:
+            retrade_price = to_decimal(candles.low[period_start : fill + 1].min())
+
+        with localcontext() as context:
+            context.prec = 8
+            context.rounding = ROUND_DOWN
+
+            try:
+                retrade_amount: Decimal = market.get_retrade_amount(
+                    amount=amount,
+                    side=side,
+                    order_price=price,
+                    price=retrade_price,
+                    fee_rate=fee_rate,
+                )
+            except (PriceToLow, PriceToHigh) as e:
+                logger.info("Stop backtest of {} with {}".format(market, e))
+                break
+
+            if retrade_amount < market.limits_amount_min:
+                # the bot is deactivated
+                if side == Order.Side.SIDE_BUY:
+                    ledger.save(timestamp, market, market.quote.short, amount * price)
+                else:
+                    ledger.save(timestamp, market, market.base.short, amount)
+                break
+
+            if side == Order.Side.SIDE_BUY:
+                saving: Decimal = (amount - retrade_amount) * price
+                if saving:
+                    ledger.save(timestamp, market, market.quote.short, saving)
+            else:
+                saving = amount - retrade_amount
+                if saving:
+                    ledger.save(timestamp, market, market.base.short, saving)
+
+        side = (
+            Order.Side.SIDE_SELL if side == Order.Side.SIDE_BUY else Order.Side.SIDE_BUY
+        )
+        amount = retrade_amount
+        price = retrade_price
+        index = fill
+
+    return ledger.result(timestamp=candles.timestamp, close=close)
+
+
+class AlignedCloses:
+    """
+    Closing prices of many markets aligned to the same timestamps, missing prices
+    are taken from the previous candle. The prices are looked up in the candles
+    of each market on access instead of a dense (markets, timestamps) matrix.
+    """
+
+    def __init__(self, timestamp: np.ndarray, candles: List[Candles]):
+        self.timestamp: np.ndarray = timestamp
+        self.candles: List[Candles] = candles
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.candles), self.timestamp.size
+
+    def prices_at(self, market_index: int, timestamp: np.ndarray) -> np.ndarray:
+        """Get the closing prices of a market at any timestamps
+
+        Arguments:
+            market_index {int} -- index of the market
+            timestamp {np.ndarray} -- UTC timestamps in milliseconds
+
+        Returns:
+            np.ndarray -- closing prices, NaN before the first candle
+        """
+        candles: Candles = self.candles[market_index]
+        if not candles.size:
+            return np.full(timestamp.size, np.nan)
+
+        # index of the last candle at or before each timestamp
+        positions: np.ndarray = (
+            np.searchsorted(candles.timestamp, timestamp, side="right") - 1
+        )
+        return np.where(positions >= 0, candles.close[np.maximum(positions, 0)], np.nan)
+
+    def window_at(self, timestamp: np.ndarray) -> np.ndarray:
+        """Get the closing prices of all markets at any timestamps
+
+        Arguments:
+            timestamp {np.ndarray} -- UTC timestamps in milliseconds
+
+        Returns:
+            np.ndarray -- closing prices, shape (markets, timestamps)
+        """
+        close: np.ndarray = np.full((len(self.candles), timestamp.size), np.nan)
+        for market_index in range(len(self.candles)):
+            close[market_index] = self.prices_at(market_index, timestamp)
+        return close
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        """Get the closing prices of all markets in a time window
+
+        Arguments:
+            start {int} -- index of the first timestamp
+            stop {int} -- index after the last timestamp
+
+        Returns:
+            np.ndarray -- closing prices, shape (markets, stop - start)
+        """
+        return self.window_at(self.timestamp[start:stop])
+
+    def __getitem__(
+        self, key: Tuple[int, Union[int, slice]]
+    ) -> Union[float, np.ndarray]:
+        market_index, index = key
+        if isinstance(index, slice):
+            return self.prices_at(market_index, self.timestamp[index])
+        return float(
+            self.prices_at(market_index, np.atleast_1d(self.timestamp[index]))[0]
+        )
+
+
+def align_candles(markets: List[Market], candles: Dict[int, Candles]) -> AlignedCloses:
+    """Align the closing prices of many markets to the union of their timestamps
+
+    Arguments:
+        markets {List[Market]} -- markets
+        candles {Dict[int, Candles]} -- candles by market id
+
+    Returns:
+        AlignedCloses -- closing prices with shape (markets, timestamps)
+    """
+    timestamp: np.ndarray = np.empty(0, dtype=np.int64)
+    for market in markets:
+        timestamp = np.union1d(timestamp, candles[market.pk].timestamp)
+
+    return AlignedCloses(
+        timestamp=timestamp, candles=[candles[market.pk] for market in markets]
+    )
+
+
+def get_best_tickers(percentages: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the ticker with the highest 24h change at each timestamp,
+    the sorted tickers are scanned until the first ticker is below min rise,
+    only the ticker with the highest rise can be bought
+
+    Arguments:
+        percentages {np.ndarray} -- 24h change, shape (markets, timestamps)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- market index & change in percent,
+                                         -inf without any change
+    """
+    percentages = np.nan_to_num(percentages, nan=-np.inf)
+    return percentages.argmax(axis=0), percentages.max(axis=0)
+
+
+def get_best_rise(
+    close: AlignedCloses, window: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the ticker with the highest 24h price change at each timestamp,
+    the closing prices are aligned in time windows
+
+    Arguments:
+        close {AlignedCloses} -- closing prices
+
+    Keyword Arguments:
+        window {Optional[int]} -- timestamps per window,
+                                  ALIGN_WINDOW for None (default: {None})
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- market index & change in percent,
+                                         -inf without a price 24h ago
+    """
+    size: int = window or ALIGN_WINDOW
+    timestamp: np.ndarray = close.timestamp
+    best_market: np.ndarray = np.zeros(timestamp.size, dtype=np.int64)
+    best_percentage: np.ndarray = np.full(timestamp.size, -np.inf)
+
+    for start in range(0, timestamp.size, size):
+        stop: int = min(start + size, timestamp.size)
+        prices: np.ndarray = close.window(start, stop)
+        prices_day_ago: np.ndarray = close.window_at(timestamp[start:stop] - DAY)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentages: np.ndarray = (prices - prices_day_ago) / prices_day_ago * 100
+        best_market[start:stop], best_percentage[start:stop] = get_best_tickers(
+            percentages
+        )
+
+    return best_market, best_percentage
+
+
+def backtest_rising_chart(
+    markets: List[Market],
+    candles: Dict[int, Candles],
+    quote_amount: Decimal,
+    min_rise: Decimal,
+    stop_loss: Decimal,
+    lock_time: int,
+    fee_rate: Decimal,
+    max_amount: Optional[Decimal] = None,
+) -> BacktestResult:
+    """Replay candles through the rising chart, the tickers are created from the
+    closing prices & the 24h change of each candle, orders are filled at once
+
+    Arguments:
+        markets {List[Market]} -- markets with the quote currency of the bot
+        candles {Dict[int, Candles]} -- candles by market id
+        quote_amount {Decimal} -- start balance of the quote currency
+        min_rise {Decimal} -- min 24h rise in percent to buy
+        stop_loss {Decimal} -- stop loss in percent
+        lock_time {int} -- hours without buy after a sell
+        fee_rate {Decimal} -- fee in percent
+
+    Keyword Arguments:
+        max_amount {Optional[Decimal]} -- max quote amount per order (default: {None})
+
+    Returns:
+        BacktestResult -- trades, savings & equity in quote currency
+    """
+    close: AlignedCloses = align_candles(markets=markets, candles=candles)
+    best_market, best_percentage = get_best_rise(close)
+    return replay_rising_chart(
+        markets=markets,
+        timestamp=close.timestamp,
+        last=close,
+        best_market=best_market,
+        best_percentage=best_percentage,
+        quote_amount=quote_amount,
+        min_rise=min_rise,
+        stop_loss=stop_loss,
+        lock_time=lock_time,
+        fee_rate=fee_rate,
+        max_amount=max_amount,
+    )
+
+
+def replay_rising_chart(
+    markets: List[Market],
+    timestamp: np.ndarray,
+    last: Union[np.ndarray, AlignedCloses],
+    best_market: np.ndarray,
+    best_percentage: np.ndarray,
+    quote_amount: Decimal,
+    min_rise: Decimal,
+    stop_loss: Decimal,
+    lock_time: int,
+    fee_rate: Decimal,
+    max_amount: Optional[Decimal] = None,
+    bid: Optional[np.ndarray] = None,
+    ask: Optional[np.ndarray] = None,
+) -> BacktestResult:
+    """Replay tickers through the rising chart, orders are filled at once
+
+    Arguments:
+        markets {List[Market]} -- markets with the quote currency of the bot
+        timestamp {np.ndarray} -- UTC timestamps in milliseconds
+        last {Union[np.ndarray, AlignedCloses]} -- last prices,
+                                                   shape (markets, timestamps)
+        best_market {np.ndarray} -- index of the market with the highest rise
+        best_percentage {np.ndarray} -- highest 24h change in percent
+        quote_amount {Decimal} -- start balance of the quote currency
+        min_rise {Decimal} -- min 24h rise in percent to buy
+        stop_loss {Decimal} -- stop loss in percent
+        lock_time {int} -- hours without buy after a sell
+        fee_rate {Decimal} -- fee in percent
+
+    Keyword Arguments:
+        max_amount {Optional[Decimal]} -- max quote amount per order (default: {None})
+        bid {Optional[np.ndarray]} -- buy prices, last price for None (default: {None})
+        ask {Optional[np.ndarray]} -- sell prices, last price for None (default: {None})
+
+    Returns:
+        BacktestResult -- trades, savings & equity in quote currency
+    """
+    close: Union[np.ndarray, AlignedCloses] = last
+    # tickers without bid or ask are traded at the last price
+    bids: Union[np.ndarray, AlignedCloses] = (
+        close if bid is None else np.where(np.isnan(bid), close, bid)
+    )
+    asks: Union[np.ndarray, AlignedCloses] = (
+        close if ask is None else np.where(np.isnan(ask), close, ask)
+    )
+    ledger: Ledger = Ledger(quote=quote_amount)
+
+    if not timestamp.size:
+        return ledger.result(timestamp=timestamp, close=close)
+
+    rise: float = float(min_rise)
+    loss: float = float(stop_loss)
+    lock: int = lock_time * 60 * 60 * 1000
+
+    index: int = 0
+    while index < timestamp.size:
+        # buy the ticker with the highest rise
+        buy: Optional[int] = find_first(
+            lambda start, stop: best_percentage[start:stop] >= rise,
+            index,
+            timestamp.size,
+        )
+        if buy is None:
+            break
+
+        market_index: int = int(best_market[buy])
+        market: Market = markets[market_index]
+        buy_price: Decimal = to_decimal(bids[market_index, buy])
+
+        amount: Decimal = get_buy_amount(
+            market=market,
+            quote_amount=ledger.quote,
+            bid=buy_price,
+            max_amount=max_amount,
+        )
+        if amount < market.limits_amount_min:
+            index = buy + 1
+            continue
+
+        ledger.fill(
+            index=buy,
+            timestamp=int(timestamp[buy]),
+            market_index=market_index,
+            market=market,
+            side=Order.Side.SIDE_BUY,
+            amount=amount,
+            price=buy_price,
+            fee_rate=fee_rate,
+        )
+
+        # sell at the first price below the stop loss from the highest price
+        last_price_tick: float = float(buy_price)
+        sell: Optional[int] = None
+        start: int = buy + 1
+        size: int = SEARCH_SIZE
+        while start < timestamp.size:
+            stop: int = min(start + size, timestamp.size)
+            prices: np.ndarray = close[market_index, start:stop]
+            highest: np.ndarray = np.maximum.accumulate(
+                np.concatenate(([last_price_tick], prices[:-1]))
+            )
+            hits: np.ndarray = np.flatnonzero(
+                (prices - highest) / highest * 100 <= loss
+            )
+            if hits.size:
+                sell = start + int(hits[0])
+                break
+            last_price_tick = max(last_price_tick, float(prices.max()))
+            start = stop
+            size *= 2
+
+        if sell is None:
+            break
+
+        sell_price: Decimal = to_decimal(asks[market_index, sell])
+        try:
+            with localcontext():
+                sell_amount: Decimal = market.get_retrade_amount(
+                    amount=amount,
+                    side=Order.Side.SIDE_BUY,
+                    order_price=buy_price,
+                    price=sell_price,
+                    fee_rate=fee_rate,
+                )
+        except (PriceToLow, PriceToHigh) as e:
+            logger.info("Stop backtest of {} with {}".format(market, e))
+            break
+
+        ledger.fill(
+            index=sell,
+            timestamp=int(timestamp[sell]),
+            market_index=market_index,
+            market=market,
+            side=Order.Side.SIDE_SELL,
+            amount=sell_amount,
+            price=sell_price,
+            fee_rate=fee_rate,
+        )
+
+        # no buy until the lock time is over
+        index = max(
+            sell + 1,
+            int(np.searchsorted(timestamp, timestamp[sell] + lock, side="right")),
+        )
+
+    return ledger.result(timestamp=timestamp, close=close)
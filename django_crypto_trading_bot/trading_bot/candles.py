@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pytz
+from django.conf import settings
+from django.db import connections, router
+
+from .indicators import update_indicators
+from .models import OHLCV, CompactOHLCV, Market, Timeframes
+from .ohlcv_coverage import count_candles, update_coverage
+
+# rows per database fetch while loading candles
+FETCH_SIZE: int = 10000
+
+
+class Candles(NamedTuple):
+    """
+    Candles of a market & timeframe as NumPy columns
+    """
+
+    timestamp: np.ndarray  # UTC timestamp in milliseconds, int64
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.timestamp)
+
+
+def save_candles(candles: List[List[float]], timeframe: str, market: Market) -> int:
+    """Save candles from a OHLCV request into every enabled storage,
+    update their coverage & add the closed candles to the indicators
+
+    Arguments:
+        candles {List[List[float]]} -- candles ordered by time
+        timeframe {str} -- timeframe from candle
+        market {Market} -- market from candle
+
+    Returns:
+        int -- amount of inserted or updated candles
+    """
+    ohlcvs: List[OHLCV] = [
+        OHLCV.get_OHLCV(candle=candle, timeframe=timeframe, market=market)
+        for candle in candles
+    ]
+    if not ohlcvs:
+        return 0
+
+    first: datetime = min(ohlcv.timestamp for ohlcv in ohlcvs)
+    last: datetime = max(ohlcv.timestamp for ohlcv in ohlcvs)
+    stored: int = count_candles(market, timeframe, first, last)
+    rows: int = OHLCV.upsert(ohlcvs)
+    update_coverage(
+        market=market,
+        timeframe=timeframe,
+        first=first,
+        last=last,
+        inserted=count_candles(market, timeframe, first, last) - stored,
+    )
+
+    if settings.OHLCV_COMPACT_STORAGE:
+        CompactOHLCV.upsert(
+            [
+                CompactOHLCV.get_compact_OHLCV(
+                    candle=candle, timeframe=timeframe, market=market
+                )
+                for candle in candles
+            ]
+        )
+
+    update_indicators(market=market, timeframe=timeframe, candles=candles)
+
+    return rows
+
+
+def epoch_milliseconds(connection, column: str) -> str:
+    """Get the SQL expression of a datetime column as UTC timestamp in milliseconds
+
+    Arguments:
+        connection {BaseDatabaseWrapper} -- database connection
+        column {str} -- quoted column name
+
+    Returns:
+        str -- SQL expression
+    """
+    if connection.vendor == "postgresql":
+        return "CAST(EXTRACT(EPOCH FROM {}) * 1000 AS BIGINT)".format(column)
+    return "CAST(ROUND((julianday({}) - 2440587.5) * 86400000) AS INTEGER)".format(
+        column
+    )
+
+
+def load_candles(
+    market: Market,
+    timeframe: Timeframes,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    compact: Optional[bool] = None,
+) -> Candles:
+    """Load candles as NumPy columns without creating model instances
+
+    Arguments:
+        market {Market} -- market from candle
+        timeframe {Timeframes} -- timeframe from candle
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+        compact {Optional[bool]} -- load from the compact storage,
+                                    by default if it's enabled (default: {None})
+
+    Returns:
+        Candles -- candles ordered by time
+    """
+    if compact is None:
+        compact = settings.OHLCV_COMPACT_STORAGE
+
+    connection = connections[router.db_for_read(OHLCV)]
+    quote_name = connection.ops.quote_name
+    price_columns: List[str] = [
+        "open_price",
+        "highest_price",
+        "lowest_price",
+        "closing_price",
+        "volume",
+    ]
+
+    table: str
+    timestamp: str
+    columns: List[str]
+    params: list = [market.pk, timeframe]
+    where: List[str] = [
+        "{} = %s".format(quote_name("market_id")),
+        "{} = %s".format(quote_name("timeframe")),
+    ]
+
+    if compact:
+        table = CompactOHLCV._meta.db_table
+        timestamp = quote_name("timestamp")
+        columns = [timestamp] + [quote_name(column) for column in price_columns]
+        if since is not None:
+            where.append("{} >= %s".format(timestamp))
+            params.append(since)
+        if until is not None:
+            where.append("{} < %s".format(timestamp))
+            params.append(until)
+    else:
+        table = OHLCV._meta.db_table
+        timestamp = quote_name("timestamp")
+
+        columns = [epoch_milliseconds(connection, timestamp)] + [
+            "CAST({} AS DOUBLE PRECISION)".format(quote_name(column))
+            for column in price_columns
+        ]
+
+        field = OHLCV._meta.get_field("timestamp")
+        if since is not None:
+            where.append("{} >= %s".format(timestamp))
+            params.append(
+                field.get_db_prep_value(
+                    datetime.fromtimestamp(since / 1000, tz=pytz.UTC), connection
+                )
+            )
+        if until is not None:
+            where.append("{} < %s".format(timestamp))
+            params.append(
+                field.get_db_prep_value(
+                    datetime.fromtimestamp(until / 1000, tz=pytz.UTC), connection
+                )
+            )
+
+    chunks: List[np.ndarray] = list()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT {} FROM {} WHERE {} ORDER BY {}".format(
+                ", ".join(columns), quote_name(table), " AND ".join(where), timestamp
+            ),
+            params,
+        )
+        while True:
+            rows: list = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.float64))
+
+    data: np.ndarray = (
+        np.concatenate(chunks) if chunks else np.empty((0, 6), dtype=np.float64)
+    )
+
+    prices: np.ndarray = data[:, 1:5]
+    if compact:
+        prices = prices / CompactOHLCV.PRICE_SCALE
+
+    return Candles(
+        timestamp=data[:, 0].astype(np.int64),
+        open=prices[:, 0],
+        high=prices[:, 1],
+        low=prices[:, 2],
+        close=prices[:, 3],
+        volume=data[:, 5],
+    )
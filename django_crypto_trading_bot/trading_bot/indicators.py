@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Type, Union
+
+import numpy as np
+from ccxt.base.exchange import Exchange
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import IndicatorState, Market, Timeframes
+
+logger = logging.getLogger(__name__)
+
+# standard deviations of the upper & lower bollinger band
+BOLLINGER_DEVIATIONS: float = 2
+# milliseconds of a VWAP session, the VWAP starts again each UTC day
+VWAP_SESSION: int = 24 * 60 * 60 * 1000
+
+
+class Bands(NamedTuple):
+    middle: float
+    upper: float
+    lower: float
+
+
+Value = Union[float, Bands]
+
+
+class IndicatorValue(NamedTuple):
+    timestamp: int  # last candle added to the indicator
+    value: Optional[Value]  # None until enough candles are added
+
+
+class Indicator:
+    """
+    Indicator which is updated candle by candle in constant time,
+    the state can be saved as JSON to continue after a restart
+    """
+
+    def __init__(self, period: int):
+        self.period: int = period
+
+    def add(self, candle: List[float]):
+        """Add the next closed candle
+
+        Arguments:
+            candle {List[float]} -- [timestamp, open, high, low, close, volume]
+        """
+        raise NotImplementedError
+
+    @property
+    def value(self) -> Optional[Value]:
+        raise NotImplementedError
+
+    def get_state(self) -> dict:
+        return {
+            key: list(value) if isinstance(value, deque) else value
+            for key, value in vars(self).items()
+            if key != "period"
+        }
+
+    def set_state(self, state: dict):
+        for key, value in state.items():
+            current = getattr(self, key)
+            if isinstance(current, deque):
+                current.extend(value)
+            else:
+                setattr(self, key, value)
+
+
+class RollingWindow(Indicator):
+    """
+    Window of the last closing prices with a running sum
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.window: Deque[float] = deque(maxlen=period)
+        self.total: float = 0
+        self.squares: float = 0
+        self.count: int = 0
+
+    def add(self, candle: List[float]):
+        price: float = candle[4]
+        if len(self.window) == self.period:
+            removed: float = self.window[0]
+            self.total -= removed
+            self.squares -= removed * removed
+        self.window.append(price)
+        self.total += price
+        self.squares += price * price
+
+        # sum the window again from time to time against rounding drift
+        self.count += 1
+        if self.count % self.period == 0:
+            self.total = math.fsum(self.window)
+            self.squares = math.fsum(price * price for price in self.window)
+
+
+class SMA(RollingWindow):
+    """
+    Simple moving average of the closing prices
+    """
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self.window) < self.period:
+            return None
+        return self.total / self.period
+
+
+class Bollinger(RollingWindow):
+    """
+    Bollinger bands, SMA +- BOLLINGER_DEVIATIONS standard deviations
+    """
+
+    @property
+    def value(self) -> Optional[Bands]:
+        if len(self.window) < self.period:
+            return None
+        middle: float = self.total / self.period
+        deviation: float = math.sqrt(
+            max(self.squares / self.period - middle * middle, 0)
+        )
+        return Bands(
+            middle=middle,
+            upper=middle + BOLLINGER_DEVIATIONS * deviation,
+            lower=middle - BOLLINGER_DEVIATIONS * deviation,
+        )
+
+
+class EMA(Indicator):
+    """
+    Exponential moving average of the closing prices, starts with the SMA
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.average: Optional[float] = None
+        self.count: int = 0
+
+    def add(self, candle: List[float]):
+        price: float = candle[4]
+        self.count += 1
+        if self.count <= self.period:
+            # SMA of the first candles
+            self.average = ((self.average or 0) * (self.count - 1) + price) / self.count
+        else:
+            alpha: float = 2 / (self.period + 1)
+            self.average = price * alpha + self.average * (1 - alpha)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.average if self.count >= self.period else None
+
+
+class WilderAverage(Indicator):
+    """
+    Wilder's smoothing, starts with the SMA of the first period values
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.count: int = 0
+
+    def smooth(self, average: float, value: float) -> float:
+        if self.count <= self.period:
+            return average + value / self.period
+        return (average * (self.period - 1) + value) / self.period
+
+
+class RSI(WilderAverage):
+    """
+    Relative strength index of the closing prices
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.close: Optional[float] = None
+        self.gain: float = 0
+        self.loss: float = 0
+
+    def add(self, candle: List[float]):
+        price: float = candle[4]
+        if self.close is not None:
+            change: float = price - self.close
+            self.count += 1
+            self.gain = self.smooth(self.gain, max(change, 0))
+            self.loss = self.smooth(self.loss, max(-change, 0))
+        self.close = price
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if not self.loss:
+            return 100.0
+        return 100 - 100 / (1 + self.gain / self.loss)
+
+
+class ATR(WilderAverage):
+    """
+    Average true range
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.close: Optional[float] = None
+        self.average: float = 0
+
+    def add(self, candle: List[float]):
+        high: float = candle[2]
+        low: float = candle[3]
+        true_range: float = high - low
+        if self.close is not None:
+            true_range = max(true_range, abs(high - self.close), abs(low - self.close))
+        self.count += 1
+        self.average = self.smooth(self.average, true_range)
+        self.close = candle[4]
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.average if self.count >= self.period else None
+
+
+class VWAP(Indicator):
+    """
+    Volume weighted average of the typical price since the start of the UTC day
+    """
+
+    def __init__(self, period: int = 0):
+        super().__init__(period)
+        self.session: Optional[int] = None
+        self.price_volume: float = 0
+        self.volume: float = 0
+
+    def add(self, candle: List[float]):
+        session: int = int(candle[0]) // VWAP_SESSION
+        if session != self.session:
+            self.session = session
+            self.price_volume = 0
+            self.volume = 0
+        typical: float = (candle[2] + candle[3] + candle[4]) / 3
+        self.price_volume += typical * candle[5]
+        self.volume += candle[5]
+
+    @property
+    def value(self) -> Optional[float]:
+        if not self.volume:
+            return None
+        return self.price_volume / self.volume
+
+
+# indicator classes by name
+INDICATORS: Dict[str, Type[Indicator]] = {
+    "sma": SMA,
+    "ema": EMA,
+    "rsi": RSI,
+    "atr": ATR,
+    "bollinger": Bollinger,
+    "vwap": VWAP,
+}
+
+
+def create_indicator(name: str, state: Optional[dict] = None) -> Indicator:
+    """Create an indicator from a name like "sma_20" or "vwap"
+
+    Arguments:
+        name {str} -- indicator & period
+
+    Keyword Arguments:
+        state {Optional[dict]} -- saved state (default: {None})
+
+    Raises:
+        ValueError: unknown indicator
+
+    Returns:
+        Indicator -- indicator
+    """
+    kind, _, period = name.partition("_")
+    if kind not in INDICATORS:
+        raise ValueError("Unknown indicator {}".format(name))
+
+    indicator: Indicator = (
+        INDICATORS[kind](int(period)) if period else INDICATORS[kind]()
+    )
+    if state:
+        indicator.set_state(state)
+    return indicator
+
+
+def indicator_key(market_id: int, timeframe: str, name: str) -> str:
+    return "indicator-{}-{}-{}".format(market_id, timeframe, name)
+
+
+def to_value(
+    indicator: Indicator, timestamp: Optional[int]
+) -> Optional[IndicatorValue]:
+    if timestamp is None:
+        return None
+    return IndicatorValue(timestamp=timestamp, value=indicator.value)
+
+
+def update_indicators(
+    market: Market,
+    timeframe: Timeframes,
+    candles: List[List[float]],
+    now: Optional[int] = None,
+) -> int:
+    """Add new closed candles to the indicators of settings.OHLCV_INDICATORS,
+    candles older than the last added candle are skipped.
+    Stored candles between the saved state & the new candles are loaded once.
+
+    Arguments:
+        market {Market} -- market from candle
+        timeframe {Timeframes} -- timeframe from candle
+        candles {List[List[float]]} -- new candles ordered by time
+
+    Keyword Arguments:
+        now {Optional[int]} -- current time in milliseconds (default: {None})
+
+    Returns:
+        int -- amount of updated indicators
+    """
+    from .candles import Candles, load_candles
+
+    names: List[str] = settings.OHLCV_INDICATORS
+    if not names:
+        return 0
+
+    now = int(time.time() * 1000) if now is None else now
+    duration: int = Exchange.parse_timeframe(timeframe) * 1000
+    closed: List[List[float]] = [
+        candle for candle in candles if candle[0] + duration <= now
+    ]
+    if not closed:
+        return 0
+
+    states: Dict[str, IndicatorState] = {
+        state.name: state
+        for state in IndicatorState.objects.filter(
+            market=market, timeframe=timeframe, name__in=names
+        )
+    }
+    indicators: Dict[str, Indicator] = dict()
+    for name in names:
+        if name not in states:
+            states[name] = IndicatorState(market=market, timeframe=timeframe, name=name)
+        indicators[name] = create_indicator(name, json.loads(states[name].state))
+
+    # catch up with the stored candles if an indicator is new or missed candles
+    first: int = int(closed[0][0])
+    behind: List[Optional[int]] = [
+        state.timestamp
+        for state in states.values()
+        if state.timestamp is None or state.timestamp + duration < first
+    ]
+    if behind:
+        since: Optional[int] = (
+            None if None in behind else min(behind) + 1  # type: ignore
+        )
+        history: Candles = load_candles(
+            market=market, timeframe=timeframe, since=since, until=first
+        )
+        closed = np.column_stack(history).tolist() + closed
+
+    updated: List[IndicatorState] = list()
+    values: Dict[str, IndicatorValue] = dict()
+    for name, state in states.items():
+        indicator: Indicator = indicators[name]
+        timestamp: Optional[int] = state.timestamp
+        for candle in closed:
+            if timestamp is None or candle[0] > timestamp:
+                indicator.add(candle)
+                timestamp = int(candle[0])
+
+        if timestamp != state.timestamp:
+            state.timestamp = timestamp
+            state.state = json.dumps(indicator.get_state())
+            updated.append(state)
+            values[indicator_key(market.pk, timeframe, name)] = to_value(
+                indicator, timestamp
+            )
+
+    IndicatorState.upsert(updated)
+    cache.set_many(values, None)
+    return len(updated)
+
+
+def get_indicators(
+    market: Union[Market, int], timeframe: Timeframes, names: Optional[List[str]] = None
+) -> Dict[str, IndicatorValue]:
+    """Get the last values of indicators from the cache,
+    the saved states are loaded only if the cache misses them
+
+    Arguments:
+        market {Union[Market, int]} -- market or market id
+        timeframe {Timeframes} -- timeframe from candle
+
+    Keyword Arguments:
+        names {Optional[List[str]]} -- indicators like ["sma_20"] (default: {settings.OHLCV_INDICATORS})
+
+    Returns:
+        Dict[str, IndicatorValue] -- values by indicator name, missing without a candle
+    """
+    market_id: int = market if isinstance(market, int) else market.pk
+    names = settings.OHLCV_INDICATORS if names is None else names
+    keys: Dict[str, str] = {
+        indicator_key(market_id, timeframe, name): name for name in names
+    }
+
+    cached: Dict[str, IndicatorValue] = cache.get_many(keys.keys())
+    values: Dict[str, IndicatorValue] = {
+        keys[key]: value for key, value in cached.items()
+    }
+
+    missing: List[str] = [name for name in names if name not in values]
+    if missing:
+        loaded: Dict[str, IndicatorValue] = dict()
+        for state in IndicatorState.objects.filter(
+            market_id=market_id, timeframe=timeframe, name__in=missing
+        ):
+            value: Optional[IndicatorValue] = to_value(
+                create_indicator(state.name, json.loads(state.state)), state.timestamp
+            )
+            if value:
+                values[state.name] = value
+                loaded[indicator_key(market_id, timeframe, state.name)] = value
+        cache.set_many(loaded, None)
+
+    return values
+
+
+def get_indicator(
+    market: Union[Market, int], timeframe: Timeframes, name: str
+) -> Optional[IndicatorValue]:
+    """Get the last value of an indicator
+
+    Arguments:
+        market {Union[Market, int]} -- market or market id
+        timeframe {Timeframes} -- timeframe from candle
+        name {str} -- indicator like "sma_20"
+
+    Returns:
+        Optional[IndicatorValue] -- value, None without a candle
+    """
+    return get_indicators(market=market, timeframe=timeframe, names=[name]).get(name)
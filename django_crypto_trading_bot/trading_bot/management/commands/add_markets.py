@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django_crypto_trading_bot.trading_bot.api.market import (
-    get_all_markets_from_exchange,
+    MarketSyncResult,
+    sync_exchange_markets,
 )
 
 
@@ -22,6 +23,11 @@ class Command(BaseCommand):
         exchange: str = options["exchange"].lower()
 
         # add & update all markets from exchange in db
-        get_all_markets_from_exchange(exchange)
+        result: MarketSyncResult = sync_exchange_markets(exchange)
 
         print("All markets for {} added & updated in the database!".format(exchange))
+        print(
+            "Created: {}, updated: {}, deactivated: {}".format(
+                result.created, result.updated, result.deactivated
+            )
+        )
@@ -0,0 +1,204 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import pytz
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.backtest import (
+    BacktestResult,
+    backtest_rising_chart,
+    backtest_wave_rider,
+    get_best_tickers,
+    replay_rising_chart,
+)
+from django_crypto_trading_bot.trading_bot.candles import Candles, load_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    Bot,
+    Market,
+    Order,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.ticker_history import (
+    TickerArrays,
+    load_ticker_arrays,
+)
+
+
+def to_milliseconds(date: Optional[str]) -> Optional[int]:
+    if not date:
+        return None
+    return int(
+        datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=pytz.UTC).timestamp() * 1000
+    )
+
+
+class Command(BaseCommand):
+    help = "Replay the stored candles through the trading mode of a bot"
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--bot_id",
+            type=int,
+            help="Bot to test",
+            required=True,
+        )
+
+        parser.add_argument(
+            "--since",
+            nargs="?",
+            type=str,
+            help="First day like 2020-01-31",
+        )
+
+        parser.add_argument(
+            "--until",
+            nargs="?",
+            type=str,
+            help="Last day (excluded) like 2020-12-31",
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="?",
+            type=Timeframes,
+            help="Candles to replay, default 1m for wave rider & 1h for rising chart",
+        )
+
+        parser.add_argument(
+            "--amount",
+            nargs="?",
+            type=float,
+            help="Base amount of the first wave rider order or "
+            "quote balance of the rising chart",
+            default=1,
+        )
+
+        parser.add_argument(
+            "--sell_order",
+            action="store_true",
+            help="Start the wave rider with a sell order instead of a buy order.",
+        )
+
+        parser.add_argument(
+            "--ticker_history",
+            action="store_true",
+            help="Replay the recorded tickers instead of candles for the rising chart.",
+        )
+
+        parser.add_argument(
+            "--trades",
+            action="store_true",
+            help="Print all trades & savings.",
+        )
+
+    def handle(self, *args, **options):
+        bot: Bot = Bot.objects.select_related(
+            "account", "market__base", "market__quote", "quote"
+        ).get(pk=options["bot_id"])
+
+        since: Optional[int] = to_milliseconds(options["since"])
+        until: Optional[int] = to_milliseconds(options["until"])
+
+        result: BacktestResult
+        if bot.trade_mode == Bot.TradeMode.WAVE_RIDER:
+            if not bot.market or not bot.timeframe:
+                raise CommandError("Bot has no market or time frame!")
+
+            result = backtest_wave_rider(
+                market=bot.market,
+                candles=load_candles(
+                    market=bot.market,
+                    timeframe=options["timeframe"] or Timeframes.MINUTE_1,
+                    since=since,
+                    until=until,
+                ),
+                timeframe=bot.timeframe,
+                amount=Decimal(options["amount"]),
+                fee_rate=bot.account.default_fee_rate,
+                side=(
+                    Order.Side.SIDE_SELL
+                    if options["sell_order"]
+                    else Order.Side.SIDE_BUY
+                ),
+            )
+        else:
+            if not bot.quote or bot.min_rise is None or bot.stop_loss is None:
+                raise CommandError("Bot has no quote currency, min rise or stop loss!")
+
+            markets: List[Market] = list(
+                Market.objects.filter(
+                    exchange=bot.account.exchange, quote=bot.quote, active=True
+                ).select_related("base", "quote")
+            )
+            if options["ticker_history"]:
+                tickers: TickerArrays = load_ticker_arrays(
+                    exchange_id=bot.account.exchange,
+                    symbols=[market.symbol for market in markets],
+                    since=since,
+                    until=until,
+                )
+                best_market, best_percentage = get_best_tickers(tickers.percentage)
+                result = replay_rising_chart(
+                    markets=markets,
+                    timestamp=tickers.timestamp,
+                    last=tickers.last,
+                    best_market=best_market,
+                    best_percentage=best_percentage,
+                    quote_amount=Decimal(options["amount"]),
+                    min_rise=bot.min_rise,
+                    stop_loss=bot.stop_loss,
+                    lock_time=bot.lock_time,
+                    fee_rate=bot.account.default_fee_rate,
+                    max_amount=bot.max_amount,
+                    bid=tickers.bid,
+                    ask=tickers.ask,
+                )
+            else:
+                candles: Dict[int, Candles] = {
+                    market.pk: load_candles(
+                        market=market,
+                        timeframe=options["timeframe"] or Timeframes.HOUR_1,
+                        since=since,
+                        until=until,
+                    )
+                    for market in markets
+                }
+
+                result = backtest_rising_chart(
+                    markets=markets,
+                    candles=candles,
+                    quote_amount=Decimal(options["amount"]),
+                    min_rise=bot.min_rise,
+                    stop_loss=bot.stop_loss,
+                    lock_time=bot.lock_time,
+                    fee_rate=bot.account.default_fee_rate,
+                    max_amount=bot.max_amount,
+                )
+
+        if options["trades"]:
+            for trade in result.trades:
+                self.stdout.write(
+                    "{} {} {} {} @ {}".format(
+                        datetime.fromtimestamp(trade.timestamp / 1000, tz=pytz.UTC),
+                        trade.symbol,
+                        trade.side,
+                        trade.amount,
+                        trade.price,
+                    )
+                )
+            for saving in result.savings:
+                self.stdout.write(
+                    "{} {} saving {} {}".format(
+                        datetime.fromtimestamp(saving.timestamp / 1000, tz=pytz.UTC),
+                        saving.symbol,
+                        saving.amount,
+                        saving.currency,
+                    )
+                )
+
+        self.stdout.write("Trades: {}".format(len(result.trades)))
+        self.stdout.write("Savings: {}".format(len(result.savings)))
+        self.stdout.write("ROI: {:.2f}%".format(result.roi))
+        self.stdout.write("Max drawdown: {:.2f}%".format(result.drawdown))
@@ -7,10 +7,9 @@ from time import sleep
 from crontab import CronTab
 from django.core.management.base import BaseCommand
 
-from django_crypto_trading_bot.trading_bot.api.market import (
-    get_all_markets_from_exchange,
-)
+from django_crypto_trading_bot.trading_bot.api.market import sync_exchange_markets
 from django_crypto_trading_bot.trading_bot.api.order import update_all_open_orders
+from django_crypto_trading_bot.trading_bot.partitions import create_partitions
 from django_crypto_trading_bot.trading_bot.trade import run_rising_chart, run_wave_rider
 
 logger = logging.getLogger(__name__)
@@ -49,7 +48,23 @@ class UpdateMarket(threading.Thread):
 
             # run trade cron
             logger.info("update markets")
-            get_all_markets_from_exchange("binance")
+            sync_exchange_markets("binance")
+
+
+class CreatePartitions(threading.Thread):
+    def run(self):
+        ct: CronTab = CronTab("@daily")
+
+        while True:
+            # get how long to wait for next cron
+            now: datetime = datetime.utcnow()
+            delay: float = ct.next(now, default_utc=True)
+
+            sleep(delay)
+
+            # create the OHLCV partitions of the next months
+            logger.info("create partitions")
+            create_partitions()
 
 
 class Command(BaseCommand):
@@ -59,9 +74,12 @@ class Command(BaseCommand):
 
         trade_thread: Trade = Trade()
         update_market_thread: UpdateMarket = UpdateMarket()
+        create_partitions_thread: CreatePartitions = CreatePartitions()
 
         trade_thread.start()
         update_market_thread.start()
+        create_partitions_thread.start()
 
         trade_thread.join()
         update_market_thread.join()
+        create_partitions_thread.join()
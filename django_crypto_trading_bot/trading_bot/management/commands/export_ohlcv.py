@@ -0,0 +1,112 @@
+from pathlib import Path
+from typing import Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.management.commands.backtest import (
+    to_milliseconds,
+)
+from django_crypto_trading_bot.trading_bot.models import Market, Timeframes
+from django_crypto_trading_bot.trading_bot.ohlcv_io import (
+    ARROW,
+    CHUNK_SIZE,
+    PARQUET,
+    export_ohlcv,
+)
+
+
+def get_markets(exchange: str, symbols: List[str]) -> List[Market]:
+    markets: Dict[str, Market] = {
+        market.symbol: market
+        for market in Market.objects.filter(exchange=exchange).select_related(
+            "base", "quote"
+        )
+    }
+    if not symbols:
+        return list(markets.values())
+
+    missing: List[str] = [symbol for symbol in symbols if symbol.upper() not in markets]
+    if missing:
+        raise CommandError("Unknown markets {}".format(", ".join(missing)))
+    return [markets[symbol.upper()] for symbol in symbols]
+
+
+class Command(BaseCommand):
+    help = "Stream candles into a Parquet or Arrow IPC file"
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "path",
+            type=Path,
+            help="Output file like candles.parquet or candles.arrow",
+        )
+
+        parser.add_argument(
+            "--exchange",
+            nargs="?",
+            type=str,
+            help="Exchange of the markets",
+            default="binance",
+        )
+
+        parser.add_argument(
+            "--symbol",
+            nargs="*",
+            type=str,
+            help="Markets like TRX/BNB, all markets of the exchange by default",
+            default=[],
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="?",
+            type=Timeframes,
+            help="Only candles of this timeframe",
+        )
+
+        parser.add_argument(
+            "--since",
+            nargs="?",
+            type=str,
+            help="First day like 2020-01-31",
+        )
+
+        parser.add_argument(
+            "--until",
+            nargs="?",
+            type=str,
+            help="Last day (excluded) like 2020-12-31",
+        )
+
+        parser.add_argument(
+            "--format",
+            nargs="?",
+            type=str,
+            choices=[PARQUET, ARROW],
+            help="File format, by default from the file extension",
+        )
+
+        parser.add_argument(
+            "--chunk_size",
+            nargs="?",
+            type=int,
+            help="Candles per record batch",
+            default=CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows: int = export_ohlcv(
+                path=options["path"],
+                markets=get_markets(options["exchange"], options["symbol"]),
+                timeframe=options["timeframe"],
+                since=to_milliseconds(options["since"]),
+                until=to_milliseconds(options["until"]),
+                file_format=options["format"],
+                chunk_size=options["chunk_size"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("Exported {} candles into {}".format(rows, options["path"]))
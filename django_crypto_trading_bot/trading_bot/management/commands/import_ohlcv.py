@@ -0,0 +1,103 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.management.commands.backtest import (
+    to_milliseconds,
+)
+from django_crypto_trading_bot.trading_bot.management.commands.export_ohlcv import (
+    get_markets,
+)
+from django_crypto_trading_bot.trading_bot.models import Timeframes
+from django_crypto_trading_bot.trading_bot.ohlcv_io import (
+    ARROW,
+    CHUNK_SIZE,
+    PARQUET,
+    import_ohlcv,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream candles from a Parquet or Arrow IPC file into the database"
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "path",
+            type=Path,
+            help="Input file like candles.parquet or candles.arrow",
+        )
+
+        parser.add_argument(
+            "--exchange",
+            nargs="?",
+            type=str,
+            help="Exchange of the symbols",
+            default="binance",
+        )
+
+        parser.add_argument(
+            "--symbol",
+            nargs="*",
+            type=str,
+            help="Only candles of these markets like TRX/BNB, "
+            "all known markets by default",
+            default=[],
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="?",
+            type=Timeframes,
+            help="Only candles of this timeframe",
+        )
+
+        parser.add_argument(
+            "--since",
+            nargs="?",
+            type=str,
+            help="First day like 2020-01-31",
+        )
+
+        parser.add_argument(
+            "--until",
+            nargs="?",
+            type=str,
+            help="Last day (excluded) like 2020-12-31",
+        )
+
+        parser.add_argument(
+            "--format",
+            nargs="?",
+            type=str,
+            choices=[PARQUET, ARROW],
+            help="File format, by default from the file extension",
+        )
+
+        parser.add_argument(
+            "--chunk_size",
+            nargs="?",
+            type=int,
+            help="Candles per Parquet record batch",
+            default=CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        try:
+            rows: int = import_ohlcv(
+                path=options["path"],
+                markets=(
+                    get_markets(options["exchange"], options["symbol"])
+                    if options["symbol"]
+                    else None
+                ),
+                timeframe=options["timeframe"],
+                since=to_milliseconds(options["since"]),
+                until=to_milliseconds(options["until"]),
+                file_format=options["format"],
+                chunk_size=options["chunk_size"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("Imported {} candles from {}".format(rows, options["path"]))
@@ -0,0 +1,60 @@
+from typing import List
+
+from django.core.management.base import BaseCommand
+
+from django_crypto_trading_bot.trading_bot.ohlcv_coverage import refresh_coverage
+from django_crypto_trading_bot.trading_bot.partitions import create_partitions
+from django_crypto_trading_bot.trading_bot.retention import (
+    RetentionPolicy,
+    RetentionResult,
+    apply_retention,
+    get_retention_policies,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the next OHLCV partitions & apply the retention policy OHLCV_RETENTION"
+    )
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="?",
+            type=str,
+            help="Apply only the policy of this timeframe",
+        )
+
+        parser.add_argument(
+            "--months_ahead",
+            nargs="?",
+            type=int,
+            help="Months of partitions to create after the current month",
+        )
+
+    def handle(self, *args, **options):
+        create_partitions(months_ahead=options["months_ahead"])
+
+        policies: List[RetentionPolicy] = [
+            policy
+            for policy in get_retention_policies()
+            if not options["timeframe"] or policy.timeframe == options["timeframe"]
+        ]
+        for policy in policies:
+            result: RetentionResult = apply_retention(policy)
+            self.stdout.write(
+                "{}: removed candles before {}, {} {} candles rolled up, "
+                "{} partitions dropped, {} rows deleted".format(
+                    policy.timeframe,
+                    result.cutoff,
+                    result.rolled_up,
+                    policy.rollup,
+                    len(result.dropped),
+                    result.deleted,
+                )
+            )
+
+        # the rollup candles keep their coverage while they are saved
+        for timeframe in {policy.timeframe for policy in policies}:
+            refresh_coverage(timeframe=timeframe)
@@ -0,0 +1,176 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.candles import Candles, load_candles
+from django_crypto_trading_bot.trading_bot.management.commands.backtest import (
+    to_milliseconds,
+)
+from django_crypto_trading_bot.trading_bot.models import Bot, Market, Timeframes
+from django_crypto_trading_bot.trading_bot.optimize import (
+    PARAMETERS,
+    Parameters,
+    SweepResult,
+    apply_parameters,
+    grid_parameters,
+    random_parameters,
+    sweep_rising_chart,
+)
+
+
+def parse_values(values: str) -> np.ndarray:
+    """
+    parse "start:stop:step" (stop included) or "1,2,3"
+    """
+    if ":" in values:
+        start, stop, step = (float(value) for value in values.split(":"))
+        return np.arange(start, stop + step / 2, step)
+    return np.array([float(value) for value in values.split(",")])
+
+
+class Command(BaseCommand):
+    help = "Search the best min rise, stop loss, lock time & max amount of a rising chart bot"
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--bot_id", type=int, help="Rising chart bot", required=True,
+        )
+
+        parser.add_argument(
+            "--since", nargs="?", type=str, help="First day like 2020-01-31",
+        )
+
+        parser.add_argument(
+            "--until", nargs="?", type=str, help="Last day (excluded) like 2020-12-31",
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="?",
+            type=Timeframes,
+            help="Candles to replay",
+            default=Timeframes.HOUR_1,
+        )
+
+        parser.add_argument(
+            "--amount",
+            nargs="?",
+            type=float,
+            help="Start balance of the quote currency",
+            default=1,
+        )
+
+        parser.add_argument(
+            "--min_rise", nargs="?", type=str, help="Like 2:10:0.5", default="2:10:1",
+        )
+
+        parser.add_argument(
+            "--stop_loss", nargs="?", type=str, help="Like -10:0:0.5", default="-10:0:1",
+        )
+
+        parser.add_argument(
+            "--lock_time", nargs="?", type=str, help="Hours like 0:48:6", default="12",
+        )
+
+        parser.add_argument(
+            "--max_amount", nargs="?", type=str, help="Max quote amount like 0.5,1",
+        )
+
+        parser.add_argument(
+            "--samples",
+            nargs="?",
+            type=int,
+            help="Random combinations in the ranges instead of the full grid",
+        )
+
+        parser.add_argument(
+            "--workers", nargs="?", type=int, help="Processes", default=1,
+        )
+
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Save the combination with the best ROI of the pareto front.",
+        )
+
+    def handle(self, *args, **options):
+        bot: Bot = Bot.objects.select_related("account", "quote").get(
+            pk=options["bot_id"]
+        )
+        if bot.trade_mode != Bot.TradeMode.RISING_CHART or not bot.quote:
+            raise CommandError("Bot is no rising chart bot with a quote currency!")
+
+        values: Dict[str, np.ndarray] = {
+            name: parse_values(options[name])
+            for name in PARAMETERS
+            if options[name] is not None
+        }
+
+        parameters: Parameters
+        if options["samples"]:
+            ranges: Dict[str, Tuple[float, float]] = {
+                name: (float(value.min()), float(value.max()))
+                for name, value in values.items()
+            }
+            # parameters without a range keep the value of the bot
+            defaults: Dict[str, float] = {
+                name: float(getattr(bot, name))
+                for name in PARAMETERS
+                if getattr(bot, name) is not None
+            }
+            try:
+                parameters = random_parameters(
+                    ranges=ranges, samples=options["samples"], defaults=defaults
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            parameters = grid_parameters(**values)
+
+        since: Optional[int] = to_milliseconds(options["since"])
+        until: Optional[int] = to_milliseconds(options["until"])
+
+        markets: List[Market] = list(
+            Market.objects.filter(
+                exchange=bot.account.exchange, quote=bot.quote, active=True
+            ).select_related("base", "quote")
+        )
+        candles: Dict[int, Candles] = {
+            market.pk: load_candles(
+                market=market, timeframe=options["timeframe"], since=since, until=until
+            )
+            for market in markets
+        }
+
+        result: SweepResult = sweep_rising_chart(
+            markets=markets,
+            candles=candles,
+            parameters=parameters,
+            quote_amount=Decimal(options["amount"]),
+            fee_rate=bot.account.default_fee_rate,
+            workers=options["workers"],
+        )
+
+        front: np.ndarray = result.front()
+
+        self.stdout.write("Combinations: {}".format(parameters.size))
+        self.stdout.write("min rise | stop loss | lock time | max amount | ROI | drawdown")
+        for index in front:
+            self.stdout.write(
+                "{:.2f} | {:.2f} | {:.0f} | {} | {:.2f}% | {:.2f}%".format(
+                    parameters.min_rise[index],
+                    parameters.stop_loss[index],
+                    parameters.lock_time[index],
+                    parameters.max_amount[index],
+                    result.roi[index],
+                    result.drawdown[index],
+                )
+            )
+
+        if options["apply"] and front.size:
+            best: int = int(front[result.roi[front].argmax()])
+            apply_parameters(bot=bot, parameters=parameters, index=best)
+            self.stdout.write("Saved combination {} to bot {}".format(best, bot.pk))
@@ -0,0 +1,107 @@
+from typing import List
+
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.management.commands.backtest import (
+    to_milliseconds,
+)
+from django_crypto_trading_bot.trading_bot.management.commands.export_ohlcv import (
+    get_markets,
+)
+from django_crypto_trading_bot.trading_bot.models import Timeframes
+from django_crypto_trading_bot.trading_bot.stream_replay import (
+    REPLAY_PATH,
+    build_replay_messages,
+    create_replay_app,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay stored candles as a local websocket stream for stream_market_data, "
+        "e.g. to run the bots offline"
+    )
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--exchange",
+            nargs="?",
+            type=str,
+            help="Exchange of the symbols",
+            default="binance",
+        )
+
+        parser.add_argument(
+            "--symbol",
+            nargs="*",
+            type=str,
+            help="Markets like TRX/BNB, all known markets by default",
+            default=[],
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="*",
+            type=Timeframes,
+            help="Timeframes like 1m, the tickers are built from the first one",
+            default=[Timeframes.MINUTE_1],
+        )
+
+        parser.add_argument(
+            "--since",
+            nargs="?",
+            type=str,
+            help="First day like 2020-01-31",
+        )
+
+        parser.add_argument(
+            "--until",
+            nargs="?",
+            type=str,
+            help="Last day (excluded) like 2020-12-31",
+        )
+
+        parser.add_argument(
+            "--interval",
+            nargs="?",
+            type=float,
+            help="Seconds between the messages",
+            default=0.01,
+        )
+
+        parser.add_argument(
+            "--host",
+            nargs="?",
+            type=str,
+            default="127.0.0.1",
+        )
+
+        parser.add_argument(
+            "--port",
+            nargs="?",
+            type=int,
+            default=8765,
+        )
+
+    def handle(self, *args, **options):
+        messages: List[dict] = build_replay_messages(
+            markets=get_markets(options["exchange"], options["symbol"]),
+            timeframes=options["timeframe"],
+            since=to_milliseconds(options["since"]),
+            until=to_milliseconds(options["until"]),
+        )
+        if not messages:
+            raise CommandError("No stored candles to replay")
+
+        self.stdout.write(
+            "Replay {} messages on ws://{}:{}{}".format(
+                len(messages), options["host"], options["port"], REPLAY_PATH
+            )
+        )
+        web.run_app(
+            create_replay_app(messages, interval=options["interval"]),
+            host=options["host"],
+            port=options["port"],
+        )
@@ -0,0 +1,94 @@
+from typing import List, Set
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_crypto_trading_bot.trading_bot.management.commands.export_ohlcv import (
+    get_markets,
+)
+from django_crypto_trading_bot.trading_bot.models import Bot, Market, Timeframes
+from django_crypto_trading_bot.trading_bot.stream import FLUSH_INTERVAL, run_stream
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the candles & tickers of markets over a websocket, save the closed "
+        "candles & share the last candles & tickers with the bots"
+    )
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--exchange",
+            nargs="?",
+            type=str,
+            help="Exchange of the symbols",
+            default="binance",
+        )
+
+        parser.add_argument(
+            "--symbol",
+            nargs="*",
+            type=str,
+            help="Markets like TRX/BNB, the markets of the active bots by default",
+            default=[],
+        )
+
+        parser.add_argument(
+            "--timeframe",
+            nargs="*",
+            type=Timeframes,
+            help="Timeframes like 1m, the timeframes of the active bots by default",
+            default=[],
+        )
+
+        parser.add_argument(
+            "--url",
+            nargs="?",
+            type=str,
+            help="Websocket url, settings.MARKET_STREAM_URL by default "
+            "or the url of replay_market_data",
+        )
+
+        parser.add_argument(
+            "--flush_interval",
+            nargs="?",
+            type=float,
+            help="Seconds between the flushes of the closed candles",
+            default=FLUSH_INTERVAL,
+        )
+
+        parser.add_argument(
+            "--no_reconnect",
+            action="store_true",
+            help="Stop when the server closes the stream, e.g. after a replay",
+        )
+
+    def handle(self, *args, **options):
+        bots: List[Bot] = list(
+            Bot.objects.filter(
+                active=True,
+                account__exchange=options["exchange"],
+                market__isnull=False,
+            ).select_related("market__base", "market__quote")
+        )
+
+        markets: List[Market] = (
+            get_markets(options["exchange"], options["symbol"])
+            if options["symbol"]
+            else list({bot.market.pk: bot.market for bot in bots}.values())
+        )
+        timeframes: Set[str] = set(options["timeframe"]) or {
+            bot.timeframe for bot in bots if bot.timeframe
+        }
+        if not markets or not timeframes:
+            raise CommandError("No markets or timeframes to stream")
+
+        rows: int = run_stream(
+            exchange_id=options["exchange"],
+            markets=markets,
+            timeframes=sorted(timeframes),
+            url=options["url"],
+            flush_interval=options["flush_interval"],
+            reconnect=not options["no_reconnect"],
+        )
+        self.stdout.write("Saved {} streamed candles".format(rows))
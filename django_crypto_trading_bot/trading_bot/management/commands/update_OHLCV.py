@@ -1,10 +1,57 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+import pytz
 from django.core.management.base import BaseCommand
 
-from django_crypto_trading_bot.trading_bot.models import OHLCV, Timeframes
+from django_crypto_trading_bot.trading_bot.models import OHLCV, Market, Timeframes
+from django_crypto_trading_bot.trading_bot.resample import (
+    get_period_start,
+    materialize_timeframe,
+)
+from django_crypto_trading_bot.trading_bot.retention import (
+    RetentionPolicy,
+    get_retention_policies,
+)
+
+# days of 1m candles downloaded for a new market without a 1m retention policy
+MINUTE_HISTORY_DAYS: int = 30
+
+
+def get_minute_since(timeframe: str, now: datetime, days: Optional[int] = None) -> int:
+    """Get the first 1m candle to download for a market without 1m candles,
+    the 1m candles older than the retention would be removed again.
+    The time is moved back to the start of a candle of the resampled timeframe.
+
+    Arguments:
+        timeframe {str} -- resampled timeframe
+        now {datetime} -- current time
+
+    Keyword Arguments:
+        days {Optional[int]} -- days of 1m candles, by default the 1m retention
+                                or MINUTE_HISTORY_DAYS (default: {None})
+
+    Returns:
+        int -- UTC timestamp in milliseconds
+    """
+    if days is None:
+        policies: Dict[str, RetentionPolicy] = {
+            policy.timeframe: policy for policy in get_retention_policies()
+        }
+        policy: Optional[RetentionPolicy] = policies.get(Timeframes.MINUTE_1)
+        days = policy.days if policy else MINUTE_HISTORY_DAYS
+
+    since: int = int((now - timedelta(days=days)).timestamp() * 1000)
+    return int(get_period_start(np.array([since], dtype=np.int64), timeframe)[0])
 
 
 class Command(BaseCommand):
-    help = "Download the chart history of all markets for a timeframe"
+    help = (
+        "Download the chart history of all markets for a timeframe. "
+        "By default only 1m candles are downloaded & the timeframe is built "
+        "from them, new markets get the 1m candles of the 1m retention only."
+    )
 
     def add_arguments(self, parser):
 
@@ -16,5 +63,64 @@ class Command(BaseCommand):
             default=Timeframes.DAY_1,
         )
 
+        parser.add_argument(
+            "--concurrency",
+            nargs="?",
+            type=int,
+            help="Parallel requests to the exchange",
+            default=8,
+        )
+
+        parser.add_argument(
+            "--window_size",
+            nargs="?",
+            type=int,
+            help="Candles per request",
+            default=500,
+        )
+
+        parser.add_argument(
+            "--weight",
+            nargs="?",
+            type=int,
+            help="Request weight per minute for each exchange",
+        )
+
+        parser.add_argument(
+            "--no_resample",
+            action="store_true",
+            help="Download the timeframe instead of building it from 1m candles.",
+        )
+
+        parser.add_argument(
+            "--minute_days",
+            nargs="?",
+            type=int,
+            help="Days of 1m candles to download for markets without 1m candles, "
+            "default is the 1m retention.",
+        )
+
     def handle(self, *args, **options):
-        OHLCV.update_new_candles_all_markets(timeframe=options["timeframe"])
+        timeframe: Timeframes = options["timeframe"]
+        resample: bool = not options["no_resample"] and timeframe != Timeframes.MINUTE_1
+
+        # download only the 1m candles, the other timeframes are built from them
+        OHLCV.update_new_candles_all_markets(
+            timeframe=Timeframes.MINUTE_1 if resample else timeframe,
+            concurrency=options["concurrency"],
+            window_size=options["window_size"],
+            weight=options["weight"],
+            since=(
+                get_minute_since(
+                    timeframe=timeframe,
+                    now=datetime.now(tz=pytz.UTC),
+                    days=options["minute_days"],
+                )
+                if resample
+                else None
+            ),
+        )
+
+        if resample:
+            for market in Market.objects.filter(active=True):
+                materialize_timeframe(market=market, timeframe=timeframe)
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.5 on 2026-10-18 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trading_bot", "0005_bot_lock_time"),
+    ]
+
+    operations = [
+        # remove duplicated candles before adding the unique constraint
+        migrations.RunSQL(
+            sql="""
+            DELETE FROM trading_bot_ohlcv WHERE id NOT IN (
+                SELECT MIN(id) FROM trading_bot_ohlcv
+                GROUP BY market_id, timeframe, timestamp
+            )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="ohlcv",
+            constraint=models.UniqueConstraint(
+                fields=("market", "timeframe", "timestamp"), name="unique_candle"
+            ),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.0.5 on 2026-10-18 00:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trading_bot", "0007_compactohlcv"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndicatorState",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "timeframe",
+                    models.CharField(
+                        choices=[
+                            ("1m", "Minute 1"),
+                            ("3m", "Minute 3"),
+                            ("5m", "Minute 5"),
+                            ("15m", "Minute 15"),
+                            ("30m", "Minute 30"),
+                            ("1h", "Hour 1"),
+                            ("2h", "Hour 2"),
+                            ("4h", "Hour 4"),
+                            ("6h", "Hour 6"),
+                            ("8h", "Hour 8"),
+                            ("12h", "Hour 12"),
+                            ("1d", "Day 1"),
+                            ("3d", "Day 3"),
+                            ("1w", "Week 1"),
+                            ("1M", "Month 1"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("name", models.CharField(max_length=30)),
+                ("timestamp", models.BigIntegerField(null=True)),
+                ("state", models.TextField(default="{}")),
+                (
+                    "market",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="trading_bot.Market",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="indicatorstate",
+            constraint=models.UniqueConstraint(
+                fields=("market", "timeframe", "name"), name="unique_indicator_state"
+            ),
+        ),
+    ]
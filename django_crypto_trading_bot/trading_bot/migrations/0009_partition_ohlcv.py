@@ -0,0 +1,137 @@
+from django.db import migrations
+
+# timeframe values & table suffix, 1m & 1M are the same name for PostgreSQL
+TIMEFRAMES = [
+    ("1m", "minute_1"),
+    ("3m", "minute_3"),
+    ("5m", "minute_5"),
+    ("15m", "minute_15"),
+    ("30m", "minute_30"),
+    ("1h", "hour_1"),
+    ("2h", "hour_2"),
+    ("4h", "hour_4"),
+    ("6h", "hour_6"),
+    ("8h", "hour_8"),
+    ("12h", "hour_12"),
+    ("1d", "day_1"),
+    ("3d", "day_3"),
+    ("1w", "week_1"),
+    ("1M", "month_1"),
+]
+
+TABLE = "trading_bot_ohlcv"
+OLD_TABLE = "trading_bot_ohlcv_unpartitioned"
+FOREIGN_KEY = (
+    "ALTER TABLE {} ADD CONSTRAINT {}_market_id_fk FOREIGN KEY (market_id) "
+    "REFERENCES trading_bot_market (id) DEFERRABLE INITIALLY DEFERRED"
+)
+
+
+def rename_table(cursor, table: str, name: str):
+    # index names are unique per schema, so the constraints are renamed too
+    cursor.execute("ALTER TABLE {} RENAME TO {}".format(table, name))
+    cursor.execute(
+        "ALTER TABLE {} RENAME CONSTRAINT {}_pkey TO {}_pkey".format(name, table, name)
+    )
+    cursor.execute(
+        "ALTER TABLE {} RENAME CONSTRAINT unique_candle TO {}_unique_candle".format(
+            name, name
+        )
+    )
+
+
+def partition_ohlcv(apps, schema_editor):
+    """
+    Partition OHLCV by timeframe & each timeframe by month on PostgreSQL,
+    the month partitions are created with the candles by ensure_partitions
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+
+        rename_table(cursor, TABLE, OLD_TABLE)
+        cursor.execute(
+            "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS) "
+            "PARTITION BY LIST (timeframe)".format(TABLE, OLD_TABLE)
+        )
+        # the primary key & unique constraints must contain the partition keys
+        cursor.execute(
+            'ALTER TABLE {0} ADD CONSTRAINT {0}_pkey PRIMARY KEY (id, timeframe, "timestamp")'.format(
+                TABLE
+            )
+        )
+        cursor.execute(
+            "ALTER TABLE {} ADD CONSTRAINT unique_candle "
+            'UNIQUE (market_id, timeframe, "timestamp")'.format(TABLE)
+        )
+        cursor.execute(FOREIGN_KEY.format(TABLE, TABLE))
+        cursor.execute("ALTER SEQUENCE {} OWNED BY {}.id".format(sequence, TABLE))
+
+        for timeframe, suffix in TIMEFRAMES:
+            cursor.execute(
+                "CREATE TABLE {0}_{1} PARTITION OF {0} FOR VALUES IN (%s) "
+                'PARTITION BY RANGE ("timestamp")'.format(TABLE, suffix),
+                [timeframe],
+            )
+
+        cursor.execute(
+            "SELECT DISTINCT timeframe, "
+            "to_char(date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC'), 'YYYY_MM'), "
+            "date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', "
+            "(date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC') "
+            "+ interval '1 month') AT TIME ZONE 'UTC' FROM {}".format(OLD_TABLE)
+        )
+        suffixes = dict(TIMEFRAMES)
+        for timeframe, month, since, until in cursor.fetchall():
+            cursor.execute(
+                "CREATE TABLE {0}_{1}_{2} PARTITION OF {0}_{1} "
+                "FOR VALUES FROM (%s) TO (%s)".format(
+                    TABLE, suffixes[timeframe], month
+                ),
+                [since, until],
+            )
+
+        cursor.execute("INSERT INTO {} SELECT * FROM {}".format(TABLE, OLD_TABLE))
+        cursor.execute("DROP TABLE {}".format(OLD_TABLE))
+
+
+def unpartition_ohlcv(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    partitioned = "trading_bot_ohlcv_partitioned"
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+
+        rename_table(cursor, TABLE, partitioned)
+        cursor.execute(
+            "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS)".format(TABLE, partitioned)
+        )
+        cursor.execute(
+            "ALTER TABLE {0} ADD CONSTRAINT {0}_pkey PRIMARY KEY (id)".format(TABLE)
+        )
+        cursor.execute(
+            "ALTER TABLE {} ADD CONSTRAINT unique_candle "
+            'UNIQUE (market_id, timeframe, "timestamp")'.format(TABLE)
+        )
+        cursor.execute(FOREIGN_KEY.format(TABLE, TABLE))
+        cursor.execute("CREATE INDEX {0}_market_id ON {0} (market_id)".format(TABLE))
+        cursor.execute("ALTER SEQUENCE {} OWNED BY {}.id".format(sequence, TABLE))
+
+        cursor.execute("INSERT INTO {} SELECT * FROM {}".format(TABLE, partitioned))
+        cursor.execute("DROP TABLE {} CASCADE".format(partitioned))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trading_bot", "0008_indicatorstate"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_ohlcv, unpartition_ohlcv),
+    ]
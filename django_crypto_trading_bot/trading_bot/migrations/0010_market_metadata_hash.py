@@ -0,0 +1,23 @@
+# Generated by Django 3.0.5 on 2026-10-18 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trading_bot", "0009_partition_ohlcv"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="market",
+            name="limits_changed_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="market",
+            name="metadata_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 3.0.5 on 2026-10-18 01:15
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Q, Sum, When
+import django.db.models.deletion
+
+
+def create_performance(apps, schema_editor):
+    # sum up the existing orders & savings of each bot
+    Bot = apps.get_model("trading_bot", "Bot")
+    BotPerformance = apps.get_model("trading_bot", "BotPerformance")
+    Order = apps.get_model("trading_bot", "Order")
+    Saving = apps.get_model("trading_bot", "Saving")
+
+    for bot in Bot.objects.select_related("market"):
+        orders = Order.objects.filter(bot=bot)
+        closed = orders.filter(status="closed")
+        first = orders.order_by("timestamp").first()
+        last = orders.order_by("-timestamp").first()
+        last_closed = closed.order_by("-timestamp").first()
+        cost = F("filled") * F("price")
+        realized_pnl = closed.aggregate(
+            pnl=Sum(
+                Case(
+                    When(side="sell", then=cost),
+                    default=-cost,
+                    output_field=models.DecimalField(),
+                )
+            )
+        )["pnl"]
+        quotes = {bot.quote_id, bot.market.quote_id if bot.market_id else None}
+        savings = Saving.objects.filter(bot=bot).aggregate(
+            count=Count("pk"), quote=Sum("amount", filter=Q(currency__in=quotes))
+        )
+
+        BotPerformance.objects.create(
+            bot=bot,
+            orders_count=orders.count(),
+            closed_orders_count=closed.count(),
+            first_order_at=first.timestamp if first else None,
+            start_amount=first.amount if first else None,
+            last_order_at=last.timestamp if last else None,
+            estimate_current_amount=last.amount if last else None,
+            last_closed_at=last_closed.timestamp if last_closed else None,
+            current_amount=last_closed.amount if last_closed else None,
+            realized_pnl=realized_pnl or Decimal(0),
+            savings_count=savings["count"],
+            quote_savings=savings["quote"] or Decimal(0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trading_bot", "0010_market_metadata_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BotPerformance",
+            fields=[
+                (
+                    "bot",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="performance",
+                        serialize=False,
+                        to="trading_bot.Bot",
+                    ),
+                ),
+                ("orders_count", models.IntegerField(default=0)),
+                ("closed_orders_count", models.IntegerField(default=0)),
+                ("first_order_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "start_amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=8, max_digits=30, null=True
+                    ),
+                ),
+                ("last_order_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "estimate_current_amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=8, max_digits=30, null=True
+                    ),
+                ),
+                ("last_closed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "current_amount",
+                    models.DecimalField(
+                        blank=True, decimal_places=8, max_digits=30, null=True
+                    ),
+                ),
+                (
+                    "realized_pnl",
+                    models.DecimalField(decimal_places=8, default=0, max_digits=30),
+                ),
+                ("savings_count", models.IntegerField(default=0)),
+                (
+                    "quote_savings",
+                    models.DecimalField(decimal_places=8, default=0, max_digits=30),
+                ),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_performance, migrations.RunPython.noop),
+    ]
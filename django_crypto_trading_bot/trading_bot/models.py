@@ -1,24 +1,18 @@
 from __future__ import annotations
 
 import logging
-from collections import OrderedDict
 from datetime import datetime
-from decimal import ROUND_DOWN, Decimal, getcontext
-from functools import partial
-from multiprocessing.pool import ThreadPool
-from operator import getitem
-from time import sleep
-from typing import List, Optional
+from decimal import ROUND_DOWN, Decimal, getcontext, localcontext
+from typing import List, Optional, Type
 
 import pytz
-from ccxt.base.errors import RequestTimeout
 from ccxt.base.exchange import Exchange
-from django.core.cache import cache
-from django.db import models
+from django.db import connections, models, router, transaction
 
 from django_crypto_trading_bot.users.models import User
 
 from .api.client import get_client
+from .api.ticker import TickerSnapshot, get_ticker_snapshot
 from .exceptions import (
     PriceToHigh,
     PriceToLow,
@@ -30,6 +24,74 @@ from .exceptions import (
 logger = logging.getLogger(__name__)
 
 
+def bulk_upsert(
+    model: Type[models.Model],
+    objs: List[models.Model],
+    unique_fields: List[str],
+    update: bool = True,
+) -> int:
+    """Insert rows with INSERT ... ON CONFLICT, existing rows are updated or skipped
+
+    Arguments:
+        model {Type[models.Model]} -- model of the rows
+        objs {List[models.Model]} -- unsaved rows
+        unique_fields {List[str]} -- fields of the unique constraint
+
+    Keyword Arguments:
+        update {bool} -- update existing rows, otherwise skip them (default: {True})
+
+    Returns:
+        int -- amount of inserted or updated rows
+    """
+    if not objs:
+        return 0
+
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+
+    fields: List[models.Field] = [
+        field for field in model._meta.concrete_fields if not field.primary_key
+    ]
+    columns: str = ", ".join(quote_name(field.column) for field in fields)
+    conflict_columns: str = ", ".join(
+        quote_name(model._meta.get_field(name).column) for name in unique_fields
+    )
+    action: str = "DO NOTHING"
+    if update:
+        action = "DO UPDATE SET " + ", ".join(
+            "{0} = EXCLUDED.{0}".format(quote_name(field.column))
+            for field in fields
+            if field.name not in unique_fields
+        )
+    row: str = "({})".format(", ".join(["%s"] * len(fields)))
+
+    batch_size: int = max(connection.ops.bulk_batch_size(fields, objs), 1)
+    rows: int = 0
+
+    with transaction.atomic(using=connection.alias, savepoint=False):
+        with connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                batch: List[models.Model] = objs[start : start + batch_size]
+                params: List = [
+                    field.get_db_prep_save(getattr(obj, field.attname), connection)
+                    for obj in batch
+                    for field in fields
+                ]
+                cursor.execute(
+                    "INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) {}".format(
+                        quote_name(model._meta.db_table),
+                        columns,
+                        ", ".join([row] * len(batch)),
+                        conflict_columns,
+                        action,
+                    ),
+                    params,
+                )
+                rows += cursor.rowcount
+
+    return rows
+
+
 class Timeframes(models.TextChoices):
     MINUTE_1 = "1m"
     MINUTE_3 = "3m"
@@ -103,6 +165,25 @@ class Market(models.Model):
     limits_amount_max = models.DecimalField(max_digits=30, decimal_places=8)
     limits_price_min = models.DecimalField(max_digits=30, decimal_places=8)
     limits_price_max = models.DecimalField(max_digits=30, decimal_places=8)
+    # fingerprint of the exchange metadata above, unchanged markets aren't saved
+    metadata_hash = models.CharField(max_length=64, blank=True, default="")
+    # last change of the precision or limits
+    limits_changed_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    @staticmethod
+    def changed_since(since: datetime) -> models.QuerySet:
+        """Get the markets whose precision or limits changed after a time,
+        to refresh only their cached order amounts & prices
+
+        Arguments:
+            since {datetime} -- time of the last check
+
+        Returns:
+            models.QuerySet -- changed markets ordered by change
+        """
+        return Market.objects.filter(limits_changed_at__gt=since).order_by(
+            "limits_changed_at"
+        )
 
     @property
     def symbol(self):
@@ -142,6 +223,45 @@ class Market(models.Model):
         getcontext().prec = 20
         return amount.quantize(Decimal(".1") ** self.precision_amount)
 
+    def get_retrade_amount(
+        self,
+        amount: Decimal,
+        side: str,
+        order_price: Decimal,
+        price: Decimal,
+        fee_rate: Decimal,
+    ) -> Decimal:
+        """Get the amount of the opposite order after an order was filled
+
+        Arguments:
+            amount {Decimal} -- amount of the filled order
+            side {str} -- side of the filled order
+            order_price {Decimal} -- price of the filled order
+            price {Decimal} -- price of the opposite order
+            fee_rate {Decimal} -- fee in percent
+
+        Returns:
+            Decimal -- retrade amount
+        """
+        if price < self.limits_price_min:
+            raise PriceToLow()
+        if price > self.limits_price_max:
+            raise PriceToHigh()
+
+        getcontext().rounding = ROUND_DOWN
+
+        fee_cost: Decimal = amount / Decimal(100) * fee_rate
+
+        amount -= fee_cost
+
+        if side == Order.Side.SIDE_SELL:
+            quote_amount: Decimal = amount * order_price
+            amount = quote_amount / price
+
+        amount -= amount % self.limits_amount_min
+
+        return self.get_min_max_order_amount(amount=amount)
+
     def __str__(self) -> str:
         return self.symbol
 
@@ -279,37 +399,45 @@ class Order(models.Model):
         else:
             raise NoMarket("No market in bot or order available!")
 
-        if price < market.limits_price_min:
-            raise PriceToLow()
-        if price > market.limits_price_max:
-            raise PriceToHigh()
-
-        getcontext().rounding = ROUND_DOWN
-
-        amount: Decimal = Decimal(self.amount)
-
         fee_rate: Decimal
         if self.fee_rate:
             fee_rate = self.fee_rate
         else:
             fee_rate = self.bot.account.default_fee_rate
 
-        fee_cost: Decimal = amount / Decimal(100) * fee_rate
-
-        amount -= fee_cost
-
-        if self.side == Order.Side.SIDE_SELL:
-            quote_amount: Decimal = amount * self.price
-            amount = quote_amount / price
-
-        amount -= amount % market.limits_amount_min
-
-        return market.get_min_max_order_amount(amount=amount)
+        return market.get_retrade_amount(
+            amount=Decimal(self.amount),
+            side=self.side,
+            order_price=self.price,
+            price=price,
+            fee_rate=fee_rate,
+        )
 
     @property
     def errors(self) -> int:
         return OrderErrorLog.objects.filter(order=self).count()
 
+    # fields which are summed up in the bot performance
+    PERFORMANCE_FIELDS: List[str] = [
+        "bot_id",
+        "status",
+        "side",
+        "timestamp",
+        "amount",
+        "price",
+        "filled",
+    ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values) -> Order:
+        order: Order = super().from_db(db, field_names, values)
+        # values of the last save, the bot performance is updated by the changes
+        order._performance_values = order.get_performance_values()
+        return order
+
+    def get_performance_values(self) -> dict:
+        return {name: self.__dict__.get(name) for name in Order.PERFORMANCE_FIELDS}
+
     def __str__(self):
         return "{0}: {1}".format(self.pk, self.order_id)
 
@@ -357,32 +485,24 @@ class Bot(models.Model):
     )
     lock_time = models.IntegerField(default=12)
 
+    def get_performance(self) -> BotPerformance:
+        """Get the performance ledger, an empty ledger for bots without orders"""
+        try:
+            return self.performance
+        except BotPerformance.DoesNotExist:
+            return BotPerformance(bot=self)
+
     @property
     def start_amount(self) -> Optional[Decimal]:
-        orders: models.Manager[Order] = Order.objects.filter(bot=self).order_by(
-            "timestamp"
-        )[:1]
-        if orders:
-            return orders[0].amount
-        return None
+        return self.get_performance().start_amount
 
     @property
     def current_amount(self) -> Optional[Decimal]:
-        orders: models.Manager[Order] = Order.objects.filter(
-            bot=self, status=Order.Status.CLOSED
-        ).order_by("-timestamp")[:1]
-        if orders:
-            return orders[0].amount
-        return None
+        return self.get_performance().current_amount
 
     @property
     def estimate_current_amount(self) -> Optional[Decimal]:
-        orders: models.Manager[Order] = Order.objects.filter(bot=self).order_by(
-            "-timestamp"
-        )[:1]
-        if orders:
-            return orders[0].amount
-        return None
+        return self.get_performance().estimate_current_amount
 
     @property
     def roi(self) -> Optional[Decimal]:
@@ -394,9 +514,11 @@ class Bot(models.Model):
         if not current_amount:
             return None
 
-        getcontext().prec = 2
-        win: Decimal = current_amount - start_amount
-        return win / current_amount * Decimal(100)
+        # the precision isn't changed for other calculations of the thread
+        with localcontext() as context:
+            context.prec = 2
+            win: Decimal = current_amount - start_amount
+            return win / current_amount * Decimal(100)
 
     @property
     def estimate_roi(self) -> Optional[Decimal]:
@@ -408,13 +530,19 @@ class Bot(models.Model):
         if not current_amount:
             return None
 
-        getcontext().prec = 2
-        win: Decimal = current_amount - start_amount
-        return win / current_amount * Decimal(100)
+        # the precision isn't changed for other calculations of the thread
+        with localcontext() as context:
+            context.prec = 2
+            win: Decimal = current_amount - start_amount
+            return win / current_amount * Decimal(100)
 
     @property
     def orders_count(self) -> int:
-        return Order.objects.filter(bot=self).count()
+        return self.get_performance().orders_count
+
+    @property
+    def realized_pnl(self) -> Decimal:
+        return self.get_performance().realized_pnl
 
     def fetch_balance(self, test: bool = False) -> Decimal:
         # todo add test case
@@ -430,19 +558,8 @@ class Bot(models.Model):
             ]
         )
 
-    def fetch_tickers(self) -> OrderedDict:
-        exchange: Exchange = get_client(exchange_id=self.account.exchange)
-        tickers: dict = cache.get_or_set(
-            "tickers-{}".format(self.account.exchange), exchange.fetch_tickers(), 50
-        )
-        item: dict
-        return OrderedDict(
-            sorted(
-                tickers.items(),
-                reverse=True,
-                key=lambda item: getitem(item[1], "percentage"),
-            )
-        )
+    def fetch_tickers(self) -> TickerSnapshot:
+        return get_ticker_snapshot(exchange_id=self.account.exchange)
 
     def __str__(self):
         return "{0}: {1} - {2}".format(
@@ -450,6 +567,43 @@ class Bot(models.Model):
         )
 
 
+class BotPerformance(models.Model):
+    """
+    Running totals of the orders & savings of a bot, updated on each saved order
+    & saving so the ROI is read without order queries
+    """
+
+    bot = models.OneToOneField(
+        Bot, on_delete=models.CASCADE, primary_key=True, related_name="performance"
+    )
+    orders_count = models.IntegerField(default=0)
+    closed_orders_count = models.IntegerField(default=0)
+    # amount of the first order
+    first_order_at = models.DateTimeField(blank=True, null=True)
+    start_amount = models.DecimalField(
+        max_digits=30, decimal_places=8, blank=True, null=True
+    )
+    # amount of the last order
+    last_order_at = models.DateTimeField(blank=True, null=True)
+    estimate_current_amount = models.DecimalField(
+        max_digits=30, decimal_places=8, blank=True, null=True
+    )
+    # amount of the last closed order
+    last_closed_at = models.DateTimeField(blank=True, null=True)
+    current_amount = models.DecimalField(
+        max_digits=30, decimal_places=8, blank=True, null=True
+    )
+    # quote currency of closed sell orders minus closed buy orders
+    realized_pnl = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    savings_count = models.IntegerField(default=0)
+    # savings in the quote currency of the bot
+    quote_savings = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "{0}: {1} orders".format(self.bot_id, self.orders_count)
+
+
 class Saving(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     bot = models.ForeignKey(Bot, on_delete=models.CASCADE)
@@ -495,6 +649,14 @@ class OHLCV(models.Model):
     closing_price = models.DecimalField(max_digits=30, decimal_places=8)
     volume = models.DecimalField(max_digits=30, decimal_places=8)
 
+    class Meta:
+        constraints = [
+            # the index of this constraint is also used to find the last candle
+            models.UniqueConstraint(
+                fields=["market", "timeframe", "timestamp"], name="unique_candle"
+            )
+        ]
+
     @staticmethod
     def get_OHLCV(candle: List[float], timeframe: str, market: Market) -> OHLCV:
         """Get a OHLCV candle from a OHLCV request
@@ -532,9 +694,12 @@ class OHLCV(models.Model):
         Returns:
             OHLCV -- saved OHLCV candle
         """
+        from .partitions import ensure_partitions
+
         ohlcv: OHLCV = OHLCV.get_OHLCV(
             candle=candle, timeframe=timeframe, market=market
         )
+        ensure_partitions(timeframe=timeframe, timestamps=[ohlcv.timestamp])
         ohlcv.save()
         return ohlcv
 
@@ -551,8 +716,39 @@ class OHLCV(models.Model):
         """
         return (
             OHLCV.objects.filter(timeframe=timeframe, market=market)
-            .order_by("timestamp")
-            .last()
+            .order_by("-timestamp")
+            .first()
+        )
+
+    @staticmethod
+    def upsert(ohlcvs: List[OHLCV], update: bool = True) -> int:
+        """Insert candles, existing candles of the same market, timeframe & timestamp
+        are updated or skipped, missing partitions are created first
+
+        Arguments:
+            ohlcvs {List[OHLCV]} -- unsaved candles
+
+        Keyword Arguments:
+            update {bool} -- update existing candles, otherwise skip them (default: {True})
+
+        Returns:
+            int -- amount of inserted or updated candles
+        """
+        from .partitions import ensure_partitions
+
+        for timeframe in {ohlcv.timeframe for ohlcv in ohlcvs}:
+            ensure_partitions(
+                timeframe=timeframe,
+                timestamps=(
+                    ohlcv.timestamp for ohlcv in ohlcvs if ohlcv.timeframe == timeframe
+                ),
+            )
+
+        return bulk_upsert(
+            model=OHLCV,
+            objs=ohlcvs,
+            unique_fields=["market", "timeframe", "timestamp"],
+            update=update,
         )
 
     @staticmethod
@@ -563,73 +759,172 @@ class OHLCV(models.Model):
             market {Market} -- market from candle
             timeframe {Timeframes} -- timeframe from candle
         """
-        exchange: Exchange = get_client(exchange_id=market.exchange)
+        from .api.ohlcv import backfill_markets
 
-        last_candle: Optional[OHLCV] = OHLCV.last_candle(
-            timeframe=timeframe, market=market
+        backfill_markets(markets=[market], timeframe=timeframe)
+
+    @staticmethod
+    def update_new_candles_all_markets(
+        timeframe: Timeframes,
+        concurrency: int = 8,
+        window_size: int = 500,
+        weight: Optional[int] = None,
+        since: Optional[int] = None,
+    ):
+        """Update all candles for all markets of a timeframe
+
+        Arguments:
+            timeframe {Timeframes} -- timeframe from candle
+
+        Keyword Arguments:
+            concurrency {int} -- parallel requests (default: {8})
+            window_size {int} -- candles per request (default: {500})
+            weight {Optional[int]} -- request weight per minute of each exchange (default: {None})
+            since {Optional[int]} -- first timestamp in milliseconds of markets
+                                     without candles (default: {None})
+        """
+        from .api.ohlcv import backfill_markets
+
+        backfill_markets(
+            markets=list(Market.objects.filter(active=True)),
+            timeframe=timeframe,
+            concurrency=concurrency,
+            window_size=window_size,
+            weight=weight,
+            since=since,
         )
-        last_candle_time: int = 0
 
-        if last_candle:
-            last_candle_time = int(last_candle.timestamp.timestamp()) * 1000
 
-        ohlcvs: List[OHLCV] = list()
+class OHLCVCoverage(models.Model):
+    """
+    Stored candles of a market & timeframe, kept up to date by save_candles
+    to show & count the candles without scanning OHLCV
+    """
 
-        while True:
-            try:
-                candles: List[List[float]] = exchange.fetch_ohlcv(
-                    symbol=market.symbol,
-                    timeframe=timeframe,
-                    since=last_candle_time + 1,
-                )
-            except RequestTimeout:
-                logger.warning(
-                    "Connetion error from {} ... wait 120s for next try".format(
-                        market.exchange
-                    )
-                )
-                sleep(120)
-                continue
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=10, choices=Timeframes.choices)
+    first_timestamp = models.DateTimeField(blank=True, null=True)
+    last_timestamp = models.DateTimeField(blank=True, null=True)
+    candles = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["market", "timeframe"], name="unique_coverage"
+            )
+        ]
 
-            for candle in candles:
-                ohlcvs.append(
-                    OHLCV.get_OHLCV(candle=candle, timeframe=timeframe, market=market)
-                )
+    def __str__(self):
+        return "{0} {1}: {2} candles".format(self.market, self.timeframe, self.candles)
 
-            if len(ohlcvs) >= 10000:
-                OHLCV.objects.bulk_create(ohlcvs)
-                ohlcvs.clear()
 
-            # no new candles
-            if len(candles) == 0:
-                break
+class CompactOHLCV(models.Model):
+    """
+    OHLCV candle with epoch milliseconds & prices scaled to integers,
+    a small copy of OHLCV to load large ranges of candles fast
+    """
 
-            last_candle_time = int(candles[-1][0])
+    # prices are stored as integer of price * PRICE_SCALE
+    PRICE_SCALE: int = 10**8
 
-        OHLCV.objects.bulk_create(ohlcvs)
-        ohlcvs.clear()
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=10, choices=Timeframes.choices)
+    timestamp = models.BigIntegerField()  # UTC timestamp in milliseconds
+    open_price = models.BigIntegerField()
+    highest_price = models.BigIntegerField()
+    lowest_price = models.BigIntegerField()
+    closing_price = models.BigIntegerField()
+    volume = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["market", "timeframe", "timestamp"],
+                name="unique_compact_candle",
+            )
+        ]
+
+    @staticmethod
+    def get_compact_OHLCV(
+        candle: List[float], timeframe: str, market: Market
+    ) -> CompactOHLCV:
+        """Get a compact candle from a OHLCV request
+
+        Arguments:
+            candle {List[float]} -- candle list
+            timeframe {Timeframes} -- timeframe from candle
+            market {Market} -- market from candle
 
-        logger.info(
-            "Update market {} for timeframe {}.".format(market.symbol, timeframe)
+        Returns:
+            CompactOHLCV -- unsaved compact candle
+        """
+        return CompactOHLCV(
+            market=market,
+            timeframe=timeframe,
+            timestamp=int(candle[0]),
+            open_price=round(candle[1] * CompactOHLCV.PRICE_SCALE),
+            highest_price=round(candle[2] * CompactOHLCV.PRICE_SCALE),
+            lowest_price=round(candle[3] * CompactOHLCV.PRICE_SCALE),
+            closing_price=round(candle[4] * CompactOHLCV.PRICE_SCALE),
+            volume=float(candle[5]),
         )
 
     @staticmethod
-    def update_new_candles_all_markets(timeframe: Timeframes):
-        """Update all candles for all markets of a timeframe
+    def upsert(candles: List[CompactOHLCV], update: bool = True) -> int:
+        """Insert compact candles, existing candles are updated or skipped
 
         Arguments:
-            timeframe {Timeframes} -- timeframe from candle
+            candles {List[CompactOHLCV]} -- unsaved compact candles
+
+        Keyword Arguments:
+            update {bool} -- update existing candles, otherwise skip them (default: {True})
+
+        Returns:
+            int -- amount of inserted or updated candles
         """
+        return bulk_upsert(
+            model=CompactOHLCV,
+            objs=candles,
+            unique_fields=["market", "timeframe", "timestamp"],
+            update=update,
+        )
 
-        markets: List[Market] = list()
-        for market in Market.objects.filter(active=True):
-            markets.append(market)
 
-        # Make the Pool of workers
-        pool = ThreadPool(8)
+class IndicatorState(models.Model):
+    """
+    Rolling state of an indicator for a market & timeframe,
+    new candles are added to the state without loading the history again
+    """
 
-        pool.map(partial(OHLCV.update_new_candles, timeframe=timeframe), markets)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=10, choices=Timeframes.choices)
+    name = models.CharField(max_length=30)  # indicator & period like sma_20
+    timestamp = models.BigIntegerField(null=True)  # last added candle
+    state = models.TextField(default="{}")  # JSON
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["market", "timeframe", "name"], name="unique_indicator_state"
+            )
+        ]
 
-        # Close the pool and wait for the work to finish
-        pool.close()
-        pool.join()
+    def __str__(self):
+        return "{} {} {}".format(self.market_id, self.timeframe, self.name)
+
+    @staticmethod
+    def upsert(states: List[IndicatorState]) -> int:
+        """Insert or update indicator states
+
+        Arguments:
+            states {List[IndicatorState]} -- unsaved states
+
+        Returns:
+            int -- amount of inserted or updated states
+        """
+        return bulk_upsert(
+            model=IndicatorState,
+            objs=states,
+            unique_fields=["market", "timeframe", "name"],
+        )
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    F,
+    Max,
+    Min,
+    Q,
+    QuerySet,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import OHLCV, Market, OHLCVCoverage, bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_coverage(
+    markets: Optional[List[Market]] = None, timeframe: Optional[str] = None
+) -> int:
+    """Count the stored candles of each market & timeframe into OHLCVCoverage
+    with one grouped query over the unique candle index
+
+    Keyword Arguments:
+        markets {Optional[List[Market]]} -- only these markets (default: {None})
+        timeframe {Optional[str]} -- only this timeframe (default: {None})
+
+    Returns:
+        int -- amount of coverage rows
+    """
+    candles: QuerySet = OHLCV.objects.all()
+    coverages: QuerySet = OHLCVCoverage.objects.all()
+    if markets is not None:
+        candles = candles.filter(market__in=markets)
+        coverages = coverages.filter(market__in=markets)
+    if timeframe:
+        candles = candles.filter(timeframe=timeframe)
+        coverages = coverages.filter(timeframe=timeframe)
+
+    now = timezone.now()
+    # bulk_upsert skips auto_now, so updated is set here
+    rows: List[OHLCVCoverage] = [
+        OHLCVCoverage(
+            market_id=row["market"],
+            timeframe=row["timeframe"],
+            first_timestamp=row["first_timestamp"],
+            last_timestamp=row["last_timestamp"],
+            candles=row["candles"],
+            updated=now,
+        )
+        for row in candles.values("market", "timeframe")
+        .annotate(
+            first_timestamp=Min("timestamp"),
+            last_timestamp=Max("timestamp"),
+            candles=Count("pk"),
+        )
+        .order_by()
+    ]
+
+    with transaction.atomic():
+        bulk_upsert(OHLCVCoverage, rows, unique_fields=["market", "timeframe"])
+        # markets & timeframes without candles anymore
+        coverages.filter(updated__lt=now).delete()
+
+    logger.info("Refresh the candle coverage of {} timeframes.".format(len(rows)))
+    return len(rows)
+
+
+def count_candles(
+    market: Market, timeframe: str, first: datetime, last: datetime
+) -> int:
+    """Count the stored candles of a market & timeframe between two timestamps"""
+    return OHLCV.objects.filter(
+        market=market, timeframe=timeframe, timestamp__range=(first, last)
+    ).count()
+
+
+def update_coverage(
+    market: Market, timeframe: str, first: datetime, last: datetime, inserted: int
+):
+    """Add a saved batch of candles to the coverage of its market & timeframe,
+    a missing coverage is counted once from the stored candles
+
+    Arguments:
+        market {Market} -- market of the candles
+        timeframe {str} -- timeframe of the candles
+        first {datetime} -- first timestamp of the batch
+        last {datetime} -- last timestamp of the batch
+        inserted {int} -- amount of new candles, updated candles aren't counted
+    """
+    updated: int = OHLCVCoverage.objects.filter(
+        market=market, timeframe=timeframe
+    ).update(
+        first_timestamp=Least(
+            "first_timestamp", Value(first, output_field=DateTimeField())
+        ),
+        last_timestamp=Greatest(
+            "last_timestamp", Value(last, output_field=DateTimeField())
+        ),
+        candles=F("candles") + inserted,
+        updated=timezone.now(),
+    )
+    if not updated:
+        refresh_coverage(markets=[market], timeframe=timeframe)
+
+
+def estimate_candles(
+    market_id: Optional[int] = None, timeframe: Optional[str] = None
+) -> Optional[int]:
+    """Get the stored candles from the coverage instead of counting them
+
+    Keyword Arguments:
+        market_id {Optional[int]} -- only this market (default: {None})
+        timeframe {Optional[str]} -- only this timeframe (default: {None})
+
+    Returns:
+        Optional[int] -- amount of candles, None without a coverage
+    """
+    filters: Q = Q()
+    if market_id is not None:
+        filters &= Q(market_id=market_id)
+    if timeframe:
+        filters &= Q(timeframe=timeframe)
+    return OHLCVCoverage.objects.filter(filters).aggregate(candles=Sum("candles"))[
+        "candles"
+    ]
@@ -0,0 +1,593 @@
+from __future__ import annotations
+
+import io
+import logging
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+import pytz
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from .candles import epoch_milliseconds, save_candles
+from .indicators import update_indicators
+from .models import OHLCV, CompactOHLCV, Market
+from .ohlcv_coverage import count_candles, update_coverage
+from .partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# candles per record batch, the memory use depends only on this size
+CHUNK_SIZE: int = 100000
+
+PARQUET: str = "parquet"
+ARROW: str = "arrow"  # Arrow IPC file format, also known as Feather V2
+FORMATS: Dict[str, str] = {
+    ".parquet": PARQUET,
+    ".pq": PARQUET,
+    ".arrow": ARROW,
+    ".feather": ARROW,
+    ".ipc": ARROW,
+}
+
+PRICE_COLUMNS: List[str] = ["open", "high", "low", "close", "volume"]
+SCHEMA: pa.Schema = pa.schema(
+    [
+        ("exchange", pa.string()),
+        ("symbol", pa.string()),
+        ("timeframe", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+    ]
+    + [(column, pa.float64()) for column in PRICE_COLUMNS]
+)
+
+# database columns in the order of PRICE_COLUMNS
+DATABASE_COLUMNS: List[str] = [
+    "open_price",
+    "highest_price",
+    "lowest_price",
+    "closing_price",
+    "volume",
+]
+
+# temporary table for COPY on PostgreSQL
+IMPORT_TABLE: str = "trading_bot_ohlcv_import"
+
+
+def get_format(path: Path, file_format: Optional[str] = None) -> str:
+    """Get the file format from the option or the file extension
+
+    Arguments:
+        path {Path} -- file path
+
+    Keyword Arguments:
+        file_format {Optional[str]} -- parquet or arrow (default: {None})
+
+    Returns:
+        str -- parquet or arrow
+    """
+    if file_format:
+        if file_format not in (PARQUET, ARROW):
+            raise ValueError("Unknown file format {}".format(file_format))
+        return file_format
+    if path.suffix.lower() not in FORMATS:
+        raise ValueError("Unknown file extension {}".format(path.suffix))
+    return FORMATS[path.suffix.lower()]
+
+
+def to_batch(
+    market: Market, timeframe: pa.Array, timestamp: pa.Array, prices: List[pa.Array]
+) -> pa.RecordBatch:
+    return pa.RecordBatch.from_arrays(
+        [
+            pa.array([market.exchange] * len(timestamp), pa.string()),
+            pa.array([market.symbol] * len(timestamp), pa.string()),
+            timeframe.cast(pa.string()),
+            timestamp.cast(pa.int64()).cast(SCHEMA.field("timestamp").type),
+        ]
+        + [price.cast(pa.float64()) for price in prices],
+        schema=SCHEMA,
+    )
+
+
+def get_candle_query(
+    connection,
+    market: Market,
+    timeframe: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> Tuple[str, list]:
+    """Get the SELECT of the candles of a market with the columns
+    timeframe, timestamp in milliseconds & the prices as float
+
+    Arguments:
+        connection {BaseDatabaseWrapper} -- database connection
+        market {Market} -- market from candle
+
+    Keyword Arguments:
+        timeframe {Optional[str]} -- only candles of this timeframe (default: {None})
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Returns:
+        Tuple[str, list] -- SQL & parameters
+    """
+    quote_name = connection.ops.quote_name
+    timestamp: str = quote_name("timestamp")
+    field = OHLCV._meta.get_field("timestamp")
+
+    where: List[str] = ["{} = %s".format(quote_name("market_id"))]
+    params: list = [market.pk]
+    if timeframe:
+        where.append("{} = %s".format(quote_name("timeframe")))
+        params.append(timeframe)
+    for operator, milliseconds in ((">=", since), ("<", until)):
+        if milliseconds is not None:
+            where.append("{} {} %s".format(timestamp, operator))
+            params.append(
+                field.get_db_prep_value(
+                    datetime.fromtimestamp(milliseconds / 1000, tz=pytz.UTC),
+                    connection,
+                )
+            )
+
+    return (
+        "SELECT {}, {}, {} FROM {} WHERE {} ORDER BY {}, {}".format(
+            quote_name("timeframe"),
+            epoch_milliseconds(connection, timestamp),
+            ", ".join(
+                "CAST({} AS DOUBLE PRECISION)".format(quote_name(column))
+                for column in DATABASE_COLUMNS
+            ),
+            quote_name(OHLCV._meta.db_table),
+            " AND ".join(where),
+            quote_name("timeframe"),
+            timestamp,
+        ),
+        params,
+    )
+
+
+def fetch_batches(
+    connection, market: Market, sql: str, params: list, chunk_size: int
+) -> Iterator[pa.RecordBatch]:
+    """Read the candles with fetchmany"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows: list = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            data: np.ndarray = np.array([row[1:] for row in rows], dtype=np.float64)
+            yield to_batch(
+                market=market,
+                timeframe=pa.array([row[0] for row in rows], pa.string()),
+                timestamp=pa.array(data[:, 0].astype(np.int64)),
+                prices=[pa.array(data[:, index]) for index in range(1, 6)],
+            )
+
+
+def copy_batches(
+    connection, market: Market, sql: str, params: list, chunk_size: int
+) -> Iterator[pa.RecordBatch]:
+    """Read the candles with COPY TO on PostgreSQL, the CSV is spooled to
+    a temporary file & parsed in blocks of about chunk_size rows"""
+    with tempfile.TemporaryFile() as spool:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY ({}) TO STDOUT WITH (FORMAT csv)".format(
+                    cursor.mogrify(sql, params).decode()
+                ),
+                spool,
+            )
+        spool.seek(0)
+
+        column_types: Dict[str, pa.DataType] = {
+            "timeframe": pa.string(),
+            "timestamp": pa.int64(),
+        }
+        column_types.update({column: pa.float64() for column in PRICE_COLUMNS})
+        reader = pa_csv.open_csv(
+            spool,
+            read_options=pa_csv.ReadOptions(
+                column_names=list(column_types),
+                # about 100 bytes per CSV row
+                block_size=chunk_size * 100,
+            ),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+        for batch in reader:
+            yield to_batch(
+                market=market,
+                timeframe=batch.column(0),
+                timestamp=batch.column(1),
+                prices=batch.columns[2:],
+            )
+
+
+def read_candle_batches(
+    market: Market,
+    timeframe: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[pa.RecordBatch]:
+    """Read the candles of a market as record batches ordered by timeframe & time,
+    with COPY on PostgreSQL & fetchmany on other databases
+
+    Arguments:
+        market {Market} -- market from candle
+
+    Keyword Arguments:
+        timeframe {Optional[str]} -- only candles of this timeframe (default: {None})
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+        chunk_size {int} -- candles per batch (default: {CHUNK_SIZE})
+
+    Yields:
+        pa.RecordBatch -- candles with the columns of SCHEMA
+    """
+    connection = connections[router.db_for_read(OHLCV)]
+    sql, params = get_candle_query(
+        connection, market=market, timeframe=timeframe, since=since, until=until
+    )
+    read = copy_batches if connection.vendor == "postgresql" else fetch_batches
+    yield from read(connection, market, sql, params, chunk_size)
+
+
+def export_ohlcv(
+    path: Path,
+    markets: List[Market],
+    timeframe: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    file_format: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Stream the candles of markets into a Parquet or Arrow IPC file
+
+    Arguments:
+        path {Path} -- output file
+        markets {List[Market]} -- markets to export
+
+    Keyword Arguments:
+        timeframe {Optional[str]} -- only candles of this timeframe (default: {None})
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+        file_format {Optional[str]} -- parquet or arrow, by default from
+                                       the file extension (default: {None})
+        chunk_size {int} -- candles per batch (default: {CHUNK_SIZE})
+
+    Returns:
+        int -- amount of exported candles
+    """
+    file_format = get_format(path, file_format)
+    writer = (
+        pq.ParquetWriter(str(path), SCHEMA)
+        if file_format == PARQUET
+        else pa_ipc.new_file(str(path), SCHEMA)
+    )
+
+    rows: int = 0
+    try:
+        for market in markets:
+            for batch in read_candle_batches(
+                market=market,
+                timeframe=timeframe,
+                since=since,
+                until=until,
+                chunk_size=chunk_size,
+            ):
+                if file_format == PARQUET:
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                rows += batch.num_rows
+    finally:
+        writer.close()
+
+    logger.info("Export {} candles into {}.".format(rows, path))
+    return rows
+
+
+def read_file_batches(
+    path: Path, file_format: Optional[str] = None, chunk_size: int = CHUNK_SIZE
+) -> Iterator[pa.RecordBatch]:
+    """Read a Parquet or Arrow IPC file batch by batch
+
+    Arguments:
+        path {Path} -- input file
+
+    Keyword Arguments:
+        file_format {Optional[str]} -- parquet or arrow, by default from
+                                       the file extension (default: {None})
+        chunk_size {int} -- candles per Parquet batch (default: {CHUNK_SIZE})
+
+    Yields:
+        pa.RecordBatch -- candles
+    """
+    if get_format(path, file_format) == PARQUET:
+        yield from pq.ParquetFile(str(path)).iter_batches(batch_size=chunk_size)
+    else:
+        # the IPC file is memory mapped, only the current batch is read
+        with pa.memory_map(str(path)) as source:
+            reader = pa_ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+
+def to_numpy_strings(column: pa.Array) -> Tuple[np.ndarray, List[str]]:
+    """Get the dictionary codes & values of a string column"""
+    if not pa.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+    return (
+        column.indices.to_numpy(zero_copy_only=False).astype(np.int64),
+        column.dictionary.to_pylist(),
+    )
+
+
+def unique_candles(
+    timestamp: np.ndarray, prices: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Order candles by time & keep the last row of each timestamp
+
+    Arguments:
+        timestamp {np.ndarray} -- UTC timestamps in milliseconds
+        prices {np.ndarray} -- open, high, low, close & volume columns
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- unique timestamps & their prices
+    """
+    order: np.ndarray = np.argsort(timestamp, kind="stable")
+    timestamp = timestamp[order]
+    # the last row of equal timestamps is followed by another timestamp
+    last: np.ndarray = np.append(timestamp[1:] != timestamp[:-1], True)
+    return timestamp[last], prices[order][last]
+
+
+def copy_candles(
+    market: Market, timeframe: str, timestamp: np.ndarray, prices: np.ndarray
+) -> int:
+    """Upsert candles with COPY into a temporary table on PostgreSQL,
+    the compact storage is filled from the same table, the coverage is updated
+    & the closed candles are added to the indicators like in save_candles.
+    A single upsert can't update a row twice, so only the last row
+    of each timestamp is copied.
+
+    Arguments:
+        market {Market} -- market from candle
+        timeframe {str} -- timeframe from candle
+        timestamp {np.ndarray} -- UTC timestamps in milliseconds
+        prices {np.ndarray} -- open, high, low, close & volume columns
+
+    Returns:
+        int -- amount of inserted or updated candles
+    """
+    timestamp, prices = unique_candles(timestamp, prices)
+    connection = connections[router.db_for_write(OHLCV)]
+    quote_name = connection.ops.quote_name
+
+    ensure_partitions(
+        timeframe=timeframe,
+        timestamps=(
+            datetime.fromtimestamp(int(month) / 1000, tz=pytz.UTC)
+            for month in np.unique(
+                timestamp.astype("datetime64[ms]")
+                .astype("datetime64[M]")
+                .astype("datetime64[ms]")
+                .astype(np.int64)
+            )
+        ),
+        alias=connection.alias,
+    )
+
+    buffer: io.BytesIO = io.BytesIO()
+    pa_csv.write_csv(
+        pa.table(
+            [pa.array(timestamp)] + [pa.array(column) for column in prices.T],
+            names=["timestamp"] + PRICE_COLUMNS,
+        ),
+        buffer,
+        pa_csv.WriteOptions(include_header=False),
+    )
+    buffer.seek(0)
+
+    columns: str = ", ".join(quote_name(column) for column in DATABASE_COLUMNS)
+    unique: str = ", ".join(
+        quote_name(column) for column in ("market_id", "timeframe", "timestamp")
+    )
+    update: str = ", ".join(
+        "{0} = EXCLUDED.{0}".format(quote_name(column)) for column in DATABASE_COLUMNS
+    )
+
+    first: datetime = datetime.fromtimestamp(int(timestamp.min()) / 1000, tz=pytz.UTC)
+    last: datetime = datetime.fromtimestamp(int(timestamp.max()) / 1000, tz=pytz.UTC)
+
+    rows: int = 0
+    with transaction.atomic(using=connection.alias):
+        stored: int = count_candles(market, timeframe, first, last)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE IF NOT EXISTS {} ({} BIGINT, {})".format(
+                    quote_name(IMPORT_TABLE),
+                    quote_name("timestamp"),
+                    ", ".join(
+                        "{} DOUBLE PRECISION".format(quote_name(column))
+                        for column in DATABASE_COLUMNS
+                    ),
+                )
+            )
+            cursor.execute("TRUNCATE {}".format(quote_name(IMPORT_TABLE)))
+            cursor.copy_expert(
+                "COPY {} FROM STDIN WITH (FORMAT csv)".format(quote_name(IMPORT_TABLE)),
+                buffer,
+            )
+            cursor.execute(
+                "INSERT INTO {} ({}, {}) SELECT %s, %s, to_timestamp({} / 1000.0), {} "
+                "FROM {} ON CONFLICT ({}) DO UPDATE SET {}".format(
+                    quote_name(OHLCV._meta.db_table),
+                    unique,
+                    columns,
+                    quote_name("timestamp"),
+                    columns,
+                    quote_name(IMPORT_TABLE),
+                    unique,
+                    update,
+                ),
+                [market.pk, timeframe],
+            )
+            rows = cursor.rowcount
+
+            if settings.OHLCV_COMPACT_STORAGE:
+                cursor.execute(
+                    "INSERT INTO {} ({}, {}) SELECT %s, %s, {}, {}, {} FROM {} "
+                    "ON CONFLICT ({}) DO UPDATE SET {}".format(
+                        quote_name(CompactOHLCV._meta.db_table),
+                        unique,
+                        columns,
+                        quote_name("timestamp"),
+                        ", ".join(
+                            "CAST(ROUND({} * %s) AS BIGINT)".format(quote_name(column))
+                            for column in DATABASE_COLUMNS[:4]
+                        ),
+                        quote_name("volume"),
+                        quote_name(IMPORT_TABLE),
+                        unique,
+                        update,
+                    ),
+                    [market.pk, timeframe] + [CompactOHLCV.PRICE_SCALE] * 4,
+                )
+
+        update_coverage(
+            market=market,
+            timeframe=timeframe,
+            first=first,
+            last=last,
+            inserted=count_candles(market, timeframe, first, last) - stored,
+        )
+
+    update_indicators(
+        market=market,
+        timeframe=timeframe,
+        candles=np.column_stack((timestamp.astype(np.float64), prices)).tolist(),
+    )
+    return rows
+
+
+def import_ohlcv(
+    path: Path,
+    markets: Optional[List[Market]] = None,
+    timeframe: Optional[str] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    file_format: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """Stream the candles of a Parquet or Arrow IPC file into the database,
+    existing candles are updated. PostgreSQL gets the candles with COPY,
+    other databases through save_candles.
+
+    Arguments:
+        path {Path} -- input file with the columns of SCHEMA
+
+    Keyword Arguments:
+        markets {Optional[List[Market]]} -- only candles of these markets (default: {None})
+        timeframe {Optional[str]} -- only candles of this timeframe (default: {None})
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+        file_format {Optional[str]} -- parquet or arrow, by default from
+                                       the file extension (default: {None})
+        chunk_size {int} -- candles per batch (default: {CHUNK_SIZE})
+
+    Returns:
+        int -- amount of inserted or updated candles
+    """
+    copy: bool = connections[router.db_for_write(OHLCV)].vendor == "postgresql"
+    known: Dict[Tuple[str, str], Market] = {
+        (market.exchange, market.symbol): market
+        for market in (
+            markets or Market.objects.select_related("base", "quote").iterator()
+        )
+    }
+    unknown: Set[Tuple[str, str]] = set()
+
+    rows: int = 0
+    for batch in read_file_batches(
+        path, file_format=file_format, chunk_size=chunk_size
+    ):
+        columns: Dict[str, pa.Array] = dict(zip(batch.schema.names, batch.columns))
+        timestamp: np.ndarray = (
+            columns["timestamp"]
+            .cast(pa.timestamp("ms", tz="UTC"))
+            .cast(pa.int64())
+            .to_numpy(zero_copy_only=False)
+        )
+        prices: np.ndarray = np.column_stack(
+            [
+                columns[column].cast(pa.float64()).to_numpy(zero_copy_only=False)
+                for column in PRICE_COLUMNS
+            ]
+        )
+
+        selected: np.ndarray = np.ones(batch.num_rows, dtype=bool)
+        if since is not None:
+            selected &= timestamp >= since
+        if until is not None:
+            selected &= timestamp < until
+
+        # group the rows by exchange, symbol & timeframe through the dictionary codes
+        codes: List[np.ndarray] = list()
+        dictionaries: List[List[str]] = list()
+        for name in ("exchange", "symbol", "timeframe"):
+            column_codes, dictionary = to_numpy_strings(columns[name])
+            codes.append(column_codes)
+            dictionaries.append(dictionary)
+
+        for group_codes in np.unique(np.column_stack(codes)[selected], axis=0):
+            group: np.ndarray = selected.copy()
+            for column_codes, code in zip(codes, group_codes):
+                group &= column_codes == code
+            exchange, symbol, group_timeframe = (
+                dictionary[code] for dictionary, code in zip(dictionaries, group_codes)
+            )
+
+            if timeframe and group_timeframe != timeframe:
+                continue
+            market: Optional[Market] = known.get((exchange, symbol))
+            if not market:
+                if not markets and (exchange, symbol) not in unknown:
+                    logger.warning(
+                        "Skip candles of unknown market {} {}.".format(exchange, symbol)
+                    )
+                unknown.add((exchange, symbol))
+                continue
+
+            if copy:
+                rows += copy_candles(
+                    market=market,
+                    timeframe=group_timeframe,
+                    timestamp=timestamp[group],
+                    prices=prices[group],
+                )
+            else:
+                # the indicators need the candles ordered by time
+                group_timestamp, group_prices = unique_candles(
+                    timestamp[group], prices[group]
+                )
+                rows += save_candles(
+                    candles=np.column_stack(
+                        (group_timestamp.astype(np.float64), group_prices)
+                    ).tolist(),
+                    timeframe=group_timeframe,
+                    market=market,
+                )
+
+    logger.info("Import {} candles from {}.".format(rows, path))
+    return rows
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .backtest import ALIGN_WINDOW, AlignedCloses, align_candles, get_best_rise
+from .candles import Candles
+from .models import Bot, Market
+
+logger = logging.getLogger(__name__)
+
+# parameters of the rising chart which can be optimized
+PARAMETERS: Tuple[str, ...] = ("min_rise", "stop_loss", "lock_time", "max_amount")
+
+
+class Parameters(NamedTuple):
+    """
+    Rising chart parameters, each field holds one value per combination
+    """
+
+    min_rise: np.ndarray
+    stop_loss: np.ndarray
+    lock_time: np.ndarray  # hours
+    max_amount: np.ndarray  # np.inf for no limit
+
+    @property
+    def size(self) -> int:
+        return len(self.min_rise)
+
+    def take(self, indices: np.ndarray) -> Parameters:
+        return Parameters(*(values[indices] for values in self))
+
+
+class SweepResult(NamedTuple):
+    parameters: Parameters
+    roi: np.ndarray  # percent
+    drawdown: np.ndarray  # percent
+
+    def front(self) -> np.ndarray:
+        """
+        Indices of the pareto front, ordered by drawdown
+        """
+        return pareto_front(roi=self.roi, drawdown=self.drawdown)
+
+
+def grid_parameters(
+    min_rise: Sequence[float],
+    stop_loss: Sequence[float],
+    lock_time: Sequence[float],
+    max_amount: Sequence[float] = (np.inf,),
+) -> Parameters:
+    """Create all combinations of the parameter values
+
+    Arguments:
+        min_rise {Sequence[float]} -- min rise values in percent
+        stop_loss {Sequence[float]} -- stop loss values in percent
+        lock_time {Sequence[float]} -- lock time values in hours
+
+    Keyword Arguments:
+        max_amount {Sequence[float]} -- max quote amount values (default: {(np.inf,)})
+
+    Returns:
+        Parameters -- all combinations
+    """
+    grid: List[np.ndarray] = np.meshgrid(
+        np.asarray(min_rise, dtype=np.float64),
+        np.asarray(stop_loss, dtype=np.float64),
+        np.asarray(lock_time, dtype=np.float64),
+        np.asarray(max_amount, dtype=np.float64),
+        indexing="ij",
+    )
+    return Parameters(*(values.ravel() for values in grid))
+
+
+def random_parameters(
+    ranges: Dict[str, Tuple[float, float]],
+    samples: int,
+    seed: Optional[int] = None,
+    defaults: Optional[Dict[str, float]] = None,
+) -> Parameters:
+    """Draw random parameter combinations
+
+    Arguments:
+        ranges {Dict[str, Tuple[float, float]]} -- (low, high) of each parameter,
+                                                   max_amount is unlimited if it's missing
+        samples {int} -- amount of combinations
+
+    Keyword Arguments:
+        seed {Optional[int]} -- random seed (default: {None})
+        defaults {Optional[Dict[str, float]]} -- fixed value of each parameter
+                                                 without a range (default: {None})
+
+    Raises:
+        ValueError: a parameter has neither a range nor a default
+
+    Returns:
+        Parameters -- random combinations
+    """
+    generator: np.random.Generator = np.random.default_rng(seed)
+    defaults = defaults or dict()
+    values: Dict[str, np.ndarray] = dict()
+    for name in PARAMETERS:
+        if name in ranges:
+            low, high = ranges[name]
+            values[name] = generator.uniform(low, high, samples)
+        elif name in defaults:
+            values[name] = np.full(samples, float(defaults[name]))
+        elif name == "max_amount":
+            values[name] = np.full(samples, np.inf)
+        else:
+            raise ValueError("{} needs a range or a default.".format(name))
+    values["lock_time"] = np.round(values["lock_time"])
+    return Parameters(**values)
+
+
+def pareto_front(roi: np.ndarray, drawdown: np.ndarray) -> np.ndarray:
+    """Get the combinations which are not beaten in ROI & drawdown by another one
+
+    Arguments:
+        roi {np.ndarray} -- ROI of each combination
+        drawdown {np.ndarray} -- drawdown of each combination
+
+    Returns:
+        np.ndarray -- indices of the front ordered by drawdown
+    """
+    # lowest drawdown first & highest roi first for the same drawdown
+    order: np.ndarray = np.lexsort((-roi, drawdown))
+    best: np.ndarray = np.maximum.accumulate(roi[order])
+    # keep each combination with a higher roi than all with a lower drawdown
+    keep: np.ndarray = np.empty(order.size, dtype=bool)
+    keep[:1] = True
+    keep[1:] = roi[order][1:] > best[:-1]
+    return order[keep]
+
+
+def simulate_rising_chart(
+    close: AlignedCloses,
+    best_market: np.ndarray,
+    best_percentage: np.ndarray,
+    limits_amount_min: np.ndarray,
+    parameters: Parameters,
+    quote_amount: float,
+    fee_rate: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Run the rising chart for all parameter combinations at once,
+    the time axis is replayed step by step & the combinations are vectorized
+
+    Arguments:
+        close {AlignedCloses} -- closing prices, aligned in windows of ALIGN_WINDOW
+        best_market {np.ndarray} -- index of the market with the highest rise
+        best_percentage {np.ndarray} -- highest 24h change in percent
+        limits_amount_min {np.ndarray} -- min order amount of each market
+        parameters {Parameters} -- parameter combinations
+        quote_amount {float} -- start balance of the quote currency
+        fee_rate {float} -- fee in percent
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- ROI & max drawdown in percent
+                                         of each combination
+    """
+    size: int = parameters.size
+    fee: float = 1 - fee_rate / 100
+    lock: np.ndarray = (parameters.lock_time * 60 * 60 * 1000).astype(np.int64)
+    lowest_rise: float = float(parameters.min_rise.min()) if size else np.inf
+
+    timestamp: np.ndarray = close.timestamp
+
+    market: np.ndarray = np.full(size, -1)  # market index of the open order
+    quote: np.ndarray = np.full(size, float(quote_amount))
+    base: np.ndarray = np.zeros(size)
+    last_price_tick: np.ndarray = np.zeros(size)
+    lock_until: np.ndarray = np.full(size, np.iinfo(np.int64).min)
+    equity_peak: np.ndarray = np.full(size, float(quote_amount))
+    drawdown: np.ndarray = np.zeros(size)
+    equity: np.ndarray = quote.copy()
+
+    for start in range(0, timestamp.size, ALIGN_WINDOW):
+        window: np.ndarray = close.window(
+            start, min(start + ALIGN_WINDOW, timestamp.size)
+        )
+        for offset in range(window.shape[1]):
+            index: int = start + offset
+            prices: np.ndarray = window[:, offset]
+
+            # sell or update orders
+            holding: np.ndarray = np.flatnonzero(market >= 0)
+            if holding.size:
+                last: np.ndarray = prices[market[holding]]
+                tick: np.ndarray = last_price_tick[holding]
+                stop: np.ndarray = (last - tick) / tick * 100 <= parameters.stop_loss[
+                    holding
+                ]
+
+                sell: np.ndarray = holding[stop]
+                quote[sell] += base[sell] * last[stop] * fee
+                base[sell] = 0
+                market[sell] = -1
+                lock_until[sell] = timestamp[index] + lock[sell]
+
+                last_price_tick[holding[~stop]] = np.maximum(tick[~stop], last[~stop])
+
+            # buy the ticker with the highest rise
+            if best_percentage[index] >= lowest_rise:
+                best: int = int(best_market[index])
+                bid: float = float(prices[best])
+
+                buy: np.ndarray = np.flatnonzero(
+                    (market < 0)
+                    & (lock_until < timestamp[index])
+                    & (parameters.min_rise <= best_percentage[index])
+                )
+                spend: np.ndarray = np.minimum(quote[buy], parameters.max_amount[buy])
+                amount: np.ndarray = spend / bid
+                valid: np.ndarray = amount >= limits_amount_min[best]
+
+                buy = buy[valid]
+                quote[buy] -= spend[valid]
+                base[buy] = amount[valid] * fee
+                market[buy] = best
+                last_price_tick[buy] = bid
+
+            equity = quote + base * np.nan_to_num(prices[np.maximum(market, 0)])
+            np.maximum(equity_peak, equity, out=equity_peak)
+            np.maximum(drawdown, (equity_peak - equity) / equity_peak, out=drawdown)
+
+    roi: np.ndarray = (equity - quote_amount) / quote_amount * 100
+    return roi, drawdown * 100
+
+
+def _simulate_chunk(arguments: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    return simulate_rising_chart(*arguments)
+
+
+def sweep_rising_chart(
+    markets: List[Market],
+    candles: Dict[int, Candles],
+    parameters: Parameters,
+    quote_amount: Decimal,
+    fee_rate: Decimal,
+    workers: int = 1,
+) -> SweepResult:
+    """Evaluate parameter combinations of the rising chart over historical candles,
+    the combinations are split into chunks for a pool of processes
+
+    Arguments:
+        markets {List[Market]} -- markets with the quote currency of the bot
+        candles {Dict[int, Candles]} -- candles by market id
+        parameters {Parameters} -- parameter combinations
+        quote_amount {Decimal} -- start balance of the quote currency
+        fee_rate {Decimal} -- fee in percent
+
+    Keyword Arguments:
+        workers {int} -- processes, 1 to run in the current process (default: {1})
+
+    Returns:
+        SweepResult -- ROI & drawdown of each combination
+    """
+    close: AlignedCloses = align_candles(markets=markets, candles=candles)
+    best_market, best_percentage = get_best_rise(close)
+    limits_amount_min: np.ndarray = np.array(
+        [float(market.limits_amount_min) for market in markets], dtype=np.float64
+    )
+
+    chunks: List[np.ndarray] = [
+        chunk
+        for chunk in np.array_split(
+            np.arange(parameters.size), max(1, min(workers, parameters.size))
+        )
+        if chunk.size
+    ]
+    arguments: List[tuple] = [
+        (
+            close,
+            best_market,
+            best_percentage,
+            limits_amount_min,
+            parameters.take(chunk),
+            float(quote_amount),
+            float(fee_rate),
+        )
+        for chunk in chunks
+    ]
+
+    results: List[Tuple[np.ndarray, np.ndarray]]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [_simulate_chunk(argument) for argument in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            results = list(executor.map(_simulate_chunk, arguments))
+
+    return SweepResult(
+        parameters=parameters,
+        roi=np.concatenate([result[0] for result in results] + [np.empty(0)]),
+        drawdown=np.concatenate([result[1] for result in results] + [np.empty(0)]),
+    )
+
+
+def apply_parameters(bot: Bot, parameters: Parameters, index: int):
+    """Write a parameter combination to a bot
+
+    Arguments:
+        bot {Bot} -- rising chart bot
+        parameters {Parameters} -- parameter combinations
+        index {int} -- index of the combination
+    """
+    bot.min_rise = Decimal(str(round(float(parameters.min_rise[index]), 2)))
+    bot.stop_loss = Decimal(str(round(float(parameters.stop_loss[index]), 2)))
+    bot.lock_time = int(round(float(parameters.lock_time[index])))
+
+    max_amount: float = float(parameters.max_amount[index])
+    bot.max_amount = (
+        Decimal(str(round(max_amount, 8))) if np.isfinite(max_amount) else None
+    )
+
+    bot.save(update_fields=["min_rise", "stop_loss", "lock_time", "max_amount"])
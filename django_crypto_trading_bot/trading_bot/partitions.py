@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pytz
+from django.conf import settings
+from django.db import DatabaseError, connections, router, transaction
+
+from .models import OHLCV, Timeframes
+
+logger = logging.getLogger(__name__)
+
+# OHLCV is partitioned by timeframe & each timeframe by month of the timestamp
+# on PostgreSQL, see migration 0009_partition_ohlcv
+
+# partitions known to exist, by database alias
+_partitions: Dict[str, Set[Tuple[str, date]]] = dict()
+_partitioned: Dict[str, bool] = dict()
+_partitions_lock: threading.Lock = threading.Lock()
+
+
+def get_month(timestamp: datetime) -> date:
+    timestamp = timestamp.astimezone(pytz.UTC)
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def month_start(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=pytz.UTC)
+
+
+def add_months(month: date, months: int) -> date:
+    index: int = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def timeframe_table(timeframe: str) -> str:
+    """Get the partition of a timeframe, named after the Timeframes member
+    because 1m & 1M are the same name for PostgreSQL
+
+    Arguments:
+        timeframe {str} -- timeframe like 1m
+
+    Returns:
+        str -- table name like trading_bot_ohlcv_minute_1
+    """
+    return "{}_{}".format(OHLCV._meta.db_table, Timeframes(timeframe).name.lower())
+
+
+def month_table(timeframe: str, month: date) -> str:
+    return "{}_{:%Y_%m}".format(timeframe_table(timeframe), month)
+
+
+def get_connection(alias: Optional[str] = None):
+    return connections[alias or router.db_for_write(OHLCV)]
+
+
+def is_partitioned(alias: Optional[str] = None) -> bool:
+    """Check once per process if the OHLCV table is partitioned
+
+    Keyword Arguments:
+        alias {Optional[str]} -- database alias (default: {None})
+
+    Returns:
+        bool -- True for a partitioned table on PostgreSQL
+    """
+    connection = get_connection(alias)
+    if connection.vendor != "postgresql":
+        return False
+
+    if connection.alias not in _partitioned:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(%s))",
+                [OHLCV._meta.db_table],
+            )
+            _partitioned[connection.alias] = bool(cursor.fetchone()[0])
+    return _partitioned[connection.alias]
+
+
+def ensure_partitions(
+    timeframe: str, timestamps: Iterable[datetime], alias: Optional[str] = None
+) -> int:
+    """Create the missing month partitions for candles before they are inserted
+
+    Arguments:
+        timeframe {str} -- timeframe of the candles
+        timestamps {Iterable[datetime]} -- opening times of the candles
+
+    Keyword Arguments:
+        alias {Optional[str]} -- database alias (default: {None})
+
+    Returns:
+        int -- amount of checked partitions
+    """
+    if not is_partitioned(alias):
+        return 0
+
+    connection = get_connection(alias)
+    # other threads add partitions to the shared set while holding the lock
+    with _partitions_lock:
+        known: Set[Tuple[str, date]] = _partitions.setdefault(connection.alias, set())
+        known_months: Set[date] = {
+            month for known_timeframe, month in known if known_timeframe == timeframe
+        }
+    months: List[date] = sorted(
+        {get_month(timestamp) for timestamp in timestamps} - known_months
+    )
+    if not months:
+        return 0
+
+    quote_name = connection.ops.quote_name
+    with _partitions_lock:
+        for month in months:
+            try:
+                with transaction.atomic(using=connection.alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} "
+                            "FOR VALUES FROM (%s) TO (%s)".format(
+                                quote_name(month_table(timeframe, month)),
+                                quote_name(timeframe_table(timeframe)),
+                            ),
+                            [month_start(month), month_start(add_months(month, 1))],
+                        )
+            except DatabaseError as e:
+                # another process created the partition at the same time
+                logger.warning(
+                    "Create partition {} failed with {}".format(
+                        month_table(timeframe, month), e
+                    )
+                )
+                continue
+            known.add((timeframe, month))
+
+    return len(months)
+
+
+def create_partitions(months_ahead: Optional[int] = None) -> int:
+    """Create the partitions of all timeframes from the current month on
+
+    Keyword Arguments:
+        months_ahead {Optional[int]} -- months after the current month
+                                        (default: {settings.OHLCV_PARTITIONS_AHEAD})
+
+    Returns:
+        int -- amount of checked partitions
+    """
+    if months_ahead is None:
+        months_ahead = settings.OHLCV_PARTITIONS_AHEAD
+
+    current: date = get_month(datetime.now(tz=pytz.UTC))
+    months: List[datetime] = [
+        month_start(add_months(current, offset)) for offset in range(months_ahead + 1)
+    ]
+    return sum(
+        ensure_partitions(timeframe=timeframe, timestamps=months)
+        for timeframe in Timeframes.values
+    )
+
+
+def drop_partitions(
+    timeframe: str, before: datetime, alias: Optional[str] = None
+) -> List[str]:
+    """Drop the month partitions of a timeframe which end before a time,
+    dropping a partition is much faster than deleting its rows
+
+    Arguments:
+        timeframe {str} -- timeframe like 1m
+        before {datetime} -- all candles before are removed
+
+    Keyword Arguments:
+        alias {Optional[str]} -- database alias (default: {None})
+
+    Returns:
+        List[str] -- dropped tables
+    """
+    if not is_partitioned(alias):
+        return list()
+
+    connection = get_connection(alias)
+    quote_name = connection.ops.quote_name
+    prefix: str = "{}_".format(timeframe_table(timeframe))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(%s)",
+            [timeframe_table(timeframe)],
+        )
+        tables: List[str] = [row[0] for row in cursor.fetchall()]
+
+    dropped: List[str] = list()
+    for table in sorted(tables):
+        try:
+            month: date = datetime.strptime(table[len(prefix) :], "%Y_%m").date()
+        except ValueError:
+            continue
+
+        if month_start(add_months(month, 1)) > before:
+            continue
+
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE {}".format(quote_name(table)))
+        with _partitions_lock:
+            _partitions.get(connection.alias, set()).discard((timeframe, month))
+        dropped.append(table)
+
+    return dropped
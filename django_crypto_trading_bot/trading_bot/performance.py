@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.db import models
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Bot, BotPerformance, Order, Saving
+
+logger = logging.getLogger(__name__)
+
+# order changes which are added to the ledger, all others rebuild it
+INCREMENTAL_CHANGES: Set[str] = {"status", "filled"}
+
+
+def get_pnl(order: Order) -> Decimal:
+    """Get the realized profit of a closed order in the quote currency
+
+    Arguments:
+        order {Order} -- closed order
+
+    Returns:
+        Decimal -- filled cost of a sell order, negative for a buy order
+    """
+    cost: Decimal = Decimal(order.filled) * Decimal(order.price)
+    return cost if order.side == Order.Side.SIDE_SELL else -cost
+
+
+def get_quote_currencies(bot: Bot) -> Set[int]:
+    quotes: Set[int] = set()
+    if bot.quote_id:
+        quotes.add(bot.quote_id)
+    if bot.market_id:
+        quotes.add(bot.market.quote_id)
+    return quotes
+
+
+def clear_cached_performance(bot: Optional[Bot]):
+    """Remove the ledger loaded on a bot instance, so the properties
+    read the updated ledger"""
+    if not bot:
+        return
+    related = Bot._meta.get_field("performance")
+    if related.is_cached(bot):
+        related.delete_cached_value(bot)
+
+
+def rebuild_performance(bot_ids: Iterable[int], create: bool = True) -> int:
+    """Sum up the orders & savings of bots into their ledgers again
+
+    Arguments:
+        bot_ids {Iterable[int]} -- bots to rebuild
+
+    Keyword Arguments:
+        create {bool} -- create missing ledgers, otherwise only existing ledgers
+                         are updated, e.g. while the bot is deleted (default: {True})
+
+    Returns:
+        int -- amount of rebuilt ledgers
+    """
+    rows: int = 0
+    for bot in Bot.objects.filter(pk__in=set(bot_ids)).select_related("market"):
+        orders: models.QuerySet = Order.objects.filter(bot=bot)
+        closed: models.QuerySet = orders.filter(status=Order.Status.CLOSED)
+        first: Optional[Order] = orders.order_by("timestamp").first()
+        last: Optional[Order] = orders.order_by("-timestamp").first()
+        last_closed: Optional[Order] = closed.order_by("-timestamp").first()
+        cost = F("filled") * F("price")
+        totals: Dict[str, Optional[Decimal]] = closed.aggregate(
+            realized_pnl=Sum(
+                Case(
+                    When(side=Order.Side.SIDE_SELL, then=cost),
+                    default=-cost,
+                    output_field=models.DecimalField(),
+                )
+            )
+        )
+        savings: Dict[str, Optional[Decimal]] = Saving.objects.filter(
+            bot=bot
+        ).aggregate(
+            savings_count=Count("pk"),
+            quote_savings=Sum(
+                "amount", filter=Q(currency__in=get_quote_currencies(bot))
+            ),
+        )
+
+        values: dict = dict(
+            orders_count=orders.count(),
+            closed_orders_count=closed.count(),
+            first_order_at=first.timestamp if first else None,
+            start_amount=first.amount if first else None,
+            last_order_at=last.timestamp if last else None,
+            estimate_current_amount=last.amount if last else None,
+            last_closed_at=last_closed.timestamp if last_closed else None,
+            current_amount=last_closed.amount if last_closed else None,
+            realized_pnl=totals["realized_pnl"] or Decimal(0),
+            savings_count=savings["savings_count"],
+            quote_savings=savings["quote_savings"] or Decimal(0),
+            updated=timezone.now(),
+        )
+        if BotPerformance.objects.filter(bot=bot).update(**values):
+            rows += 1
+        elif create:
+            BotPerformance.objects.update_or_create(bot=bot, defaults=values)
+            rows += 1
+    return rows
+
+
+def add_order(order: Order, created: bool):
+    """Add a new or closed order to the ledger of its bot with a single UPDATE,
+    a missing ledger is rebuilt
+
+    Arguments:
+        order {Order} -- saved order
+        created {bool} -- the order is new
+    """
+    updates: dict = dict()
+    closed: bool = order.status == Order.Status.CLOSED
+
+    if created:
+        first: Q = Q(first_order_at__isnull=True) | Q(
+            first_order_at__gt=order.timestamp
+        )
+        last: Q = Q(last_order_at__isnull=True) | Q(last_order_at__lte=order.timestamp)
+        updates.update(
+            orders_count=F("orders_count") + 1,
+            first_order_at=Case(
+                When(first, then=Value(order.timestamp)), default=F("first_order_at")
+            ),
+            start_amount=Case(
+                When(first, then=Value(Decimal(order.amount))),
+                default=F("start_amount"),
+            ),
+            last_order_at=Case(
+                When(last, then=Value(order.timestamp)), default=F("last_order_at")
+            ),
+            estimate_current_amount=Case(
+                When(last, then=Value(Decimal(order.amount))),
+                default=F("estimate_current_amount"),
+            ),
+        )
+
+    if closed:
+        last_closed: Q = Q(last_closed_at__isnull=True) | Q(
+            last_closed_at__lte=order.timestamp
+        )
+        updates.update(
+            closed_orders_count=F("closed_orders_count") + 1,
+            last_closed_at=Case(
+                When(last_closed, then=Value(order.timestamp)),
+                default=F("last_closed_at"),
+            ),
+            current_amount=Case(
+                When(last_closed, then=Value(Decimal(order.amount))),
+                default=F("current_amount"),
+            ),
+            realized_pnl=F("realized_pnl") + get_pnl(order),
+        )
+
+    if not updates:
+        return
+
+    updates["updated"] = timezone.now()
+    if not BotPerformance.objects.filter(bot_id=order.bot_id).update(**updates):
+        rebuild_performance([order.bot_id])
+
+
+def record_order(order: Order, created: bool):
+    """Update the ledger by the changes of a saved order, new & closed orders
+    are added, other changes rebuild the ledgers of the old & new bot
+
+    Arguments:
+        order {Order} -- saved order
+        created {bool} -- the order is new
+    """
+    previous: Optional[dict] = getattr(order, "_performance_values", None)
+    current: dict = order.get_performance_values()
+    order._performance_values = current
+
+    if created:
+        add_order(order, created=True)
+    elif previous is None:
+        rebuild_performance([order.bot_id])
+    elif previous == current:
+        return
+    elif {
+        name for name in current if current[name] != previous[name]
+    } <= INCREMENTAL_CHANGES and previous["status"] != Order.Status.CLOSED:
+        add_order(order, created=False)
+    else:
+        rebuild_performance({previous["bot_id"], order.bot_id})
+
+    if Order.bot.is_cached(order):
+        clear_cached_performance(order.bot)
+
+
+def record_orders(orders: List[Order]):
+    """Update the ledgers by orders saved without signals like bulk_update
+
+    Arguments:
+        orders {List[Order]} -- saved orders
+    """
+    for order in orders:
+        record_order(order, created=False)
+
+
+def record_savings(savings: List[Saving]):
+    """Add saved savings to the ledgers of their bots,
+    e.g. after a bulk_create without signals
+
+    Arguments:
+        savings {List[Saving]} -- saved savings
+    """
+    bots: Dict[int, Bot] = dict()
+    counts: Dict[int, int] = dict()
+    amounts: Dict[int, Decimal] = dict()
+    for saving in savings:
+        bot: Bot = saving.bot
+        bots[bot.pk] = bot
+        counts[bot.pk] = counts.get(bot.pk, 0) + 1
+        if saving.currency_id in get_quote_currencies(bot):
+            amounts[bot.pk] = amounts.get(bot.pk, Decimal(0)) + Decimal(saving.amount)
+
+    for bot_id, count in counts.items():
+        if not BotPerformance.objects.filter(bot_id=bot_id).update(
+            savings_count=F("savings_count") + count,
+            quote_savings=F("quote_savings") + amounts.get(bot_id, Decimal(0)),
+            updated=timezone.now(),
+        ):
+            rebuild_performance([bot_id])
+        clear_cached_performance(bots[bot_id])
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .api.ohlcv import timeframe_to_milliseconds
+from .candles import Candles, load_candles, save_candles
+from .models import OHLCV, Market, Timeframes
+
+logger = logging.getLogger(__name__)
+
+MINUTE: int = 60 * 1000
+DAY: int = 24 * 60 * 60 * 1000
+WEEK: int = 7 * DAY
+# exchange weeks start on monday, 1970-01-01 was a thursday
+WEEK_OFFSET: int = 4 * DAY
+# 1m candles per resample step while materializing a whole history
+MATERIALIZE_WINDOW: int = 50000 * MINUTE
+
+
+def get_periods(timestamp: np.ndarray, timeframe: str) -> np.ndarray:
+    """Get the candle period of a timeframe for each timestamp
+
+    Arguments:
+        timestamp {np.ndarray} -- UTC timestamps in milliseconds
+        timeframe {str} -- timeframe like 1h, 1w, 1M
+
+    Returns:
+        np.ndarray -- period number of each timestamp, non decreasing
+    """
+    if timeframe == Timeframes.MONTH_1:
+        return (
+            timestamp.astype("datetime64[ms]").astype("datetime64[M]").astype(np.int64)
+        )
+    if timeframe == Timeframes.WEEK_1:
+        return (timestamp - WEEK_OFFSET) // WEEK
+    return timestamp // timeframe_to_milliseconds(timeframe)
+
+
+def get_period_start(timestamp: np.ndarray, timeframe: str) -> np.ndarray:
+    """Get the opening time of the candle of a timeframe for each timestamp
+
+    Arguments:
+        timestamp {np.ndarray} -- UTC timestamps in milliseconds
+        timeframe {str} -- timeframe like 1h, 1w, 1M
+
+    Returns:
+        np.ndarray -- UTC timestamps in milliseconds
+    """
+    periods: np.ndarray = get_periods(timestamp, timeframe)
+    if timeframe == Timeframes.MONTH_1:
+        return periods.astype("datetime64[M]").astype("datetime64[ms]").astype(np.int64)
+    if timeframe == Timeframes.WEEK_1:
+        return periods * WEEK + WEEK_OFFSET
+    return periods * timeframe_to_milliseconds(timeframe)
+
+
+def resample_candles(candles: Candles, timeframe: str) -> Candles:
+    """Merge candles into candles of a higher timeframe
+
+    Arguments:
+        candles {Candles} -- candles ordered by time
+        timeframe {str} -- higher timeframe like 1h
+
+    Returns:
+        Candles -- candles of the timeframe, the last one can be unfinished
+    """
+    if not candles.size:
+        return candles
+
+    start: np.ndarray = get_period_start(candles.timestamp, timeframe)
+    first: np.ndarray = np.flatnonzero(
+        np.concatenate(([True], start[1:] != start[:-1]))
+    )
+    last: np.ndarray = np.concatenate((first[1:], [candles.size])) - 1
+
+    return Candles(
+        timestamp=start[first],
+        open=candles.open[first],
+        high=np.maximum.reduceat(candles.high, first),
+        low=np.minimum.reduceat(candles.low, first),
+        close=candles.close[last],
+        volume=np.add.reduceat(candles.volume, first),
+    )
+
+
+def get_source_timeframe(timeframe: str, timeframes: List[str]) -> str:
+    """Get the highest timeframe with candles which fit exactly into a candle
+    of the timeframe
+
+    Arguments:
+        timeframe {str} -- timeframe to build
+        timeframes {List[str]} -- available timeframes
+
+    Returns:
+        str -- source timeframe, 1m if no other fits
+    """
+    # months & weeks are made of whole days
+    duration: int = (
+        DAY
+        if timeframe in (Timeframes.MONTH_1, Timeframes.WEEK_1)
+        else timeframe_to_milliseconds(timeframe)
+    )
+    sources: List[Tuple[int, str]] = [
+        (timeframe_to_milliseconds(source), source)
+        for source in timeframes
+        if source not in (Timeframes.MONTH_1, Timeframes.WEEK_1, timeframe)
+        and duration % timeframe_to_milliseconds(source) == 0
+    ]
+    return max(sources)[1] if sources else Timeframes.MINUTE_1
+
+
+def resample_market(
+    market: Market,
+    since: int,
+    until: int,
+    timeframes: Optional[List[str]] = None,
+) -> int:
+    """Build the candles of higher timeframes for a range of changed 1m candles,
+    each timeframe is built from the highest timeframe built before it,
+    so only a few candles before the range are loaded again
+
+    Arguments:
+        market {Market} -- market from candle
+        since {int} -- first changed 1m candle in milliseconds
+        until {int} -- end of the changed 1m candles in milliseconds, excluded
+
+    Keyword Arguments:
+        timeframes {Optional[List[str]]} -- timeframes to build
+                                            (default: {settings.OHLCV_RESAMPLE_TIMEFRAMES})
+
+    Returns:
+        int -- amount of saved candles
+    """
+    if timeframes is None:
+        timeframes = settings.OHLCV_RESAMPLE_TIMEFRAMES
+
+    changed: Dict[str, Tuple[int, int]] = {Timeframes.MINUTE_1: (since, until)}
+    rows: int = 0
+
+    for timeframe in sorted(
+        (timeframe for timeframe in timeframes if timeframe != Timeframes.MINUTE_1),
+        key=timeframe_to_milliseconds,
+    ):
+        source: str = get_source_timeframe(timeframe, list(changed))
+        source_since, source_until = changed[source]
+
+        # the candle at the start of the range gets all source candles again
+        start: int = int(
+            get_period_start(np.array([source_since], dtype=np.int64), timeframe)[0]
+        )
+        candles: Candles = resample_candles(
+            load_candles(
+                market=market, timeframe=source, since=start, until=source_until
+            ),
+            timeframe,
+        )
+        if not candles.size:
+            continue
+
+        rows += save_candles(
+            candles=np.column_stack(candles).tolist(),
+            timeframe=timeframe,
+            market=market,
+        )
+        changed[timeframe] = (start, int(candles.timestamp[-1]) + 1)
+
+    return rows
+
+
+def resample_range(market: Market, timeframe: str, since: int, until: int) -> int:
+    """Build the candles of a timeframe from the 1m candles of a long time range
+    in steps of MATERIALIZE_WINDOW
+
+    Arguments:
+        market {Market} -- market from candle
+        timeframe {str} -- higher timeframe
+        since {int} -- first 1m candle in milliseconds
+        until {int} -- end of the 1m candles in milliseconds, excluded
+
+    Returns:
+        int -- amount of saved candles
+    """
+    rows: int = 0
+    for start in range(since, until, MATERIALIZE_WINDOW):
+        rows += resample_market(
+            market=market,
+            since=start,
+            until=min(start + MATERIALIZE_WINDOW, until),
+            timeframes=[timeframe],
+        )
+    return rows
+
+
+def materialize_timeframe(market: Market, timeframe: Timeframes) -> int:
+    """Build the missing candles of a timeframe from the stored 1m candles,
+    starting with the last candle of the timeframe
+
+    Arguments:
+        market {Market} -- market from candle
+        timeframe {Timeframes} -- higher timeframe
+
+    Returns:
+        int -- amount of saved candles
+    """
+    first_candle: Optional[OHLCV] = OHLCV.last_candle(
+        timeframe=timeframe, market=market
+    ) or (
+        OHLCV.objects.filter(timeframe=Timeframes.MINUTE_1, market=market)
+        .order_by("timestamp")
+        .first()
+    )
+    last_candle: Optional[OHLCV] = OHLCV.last_candle(
+        timeframe=Timeframes.MINUTE_1, market=market
+    )
+    if not first_candle or not last_candle:
+        return 0
+
+    rows: int = resample_range(
+        market=market,
+        timeframe=timeframe,
+        since=int(first_candle.timestamp.timestamp()) * 1000,
+        until=int(last_candle.timestamp.timestamp()) * 1000 + MINUTE,
+    )
+
+    logger.info(
+        "Resample {} candles of {} for timeframe {}.".format(
+            rows, market.symbol, timeframe
+        )
+    )
+    return rows
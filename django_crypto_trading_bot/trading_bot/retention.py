@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pytz
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Min
+
+from .models import OHLCV, CompactOHLCV, Market
+from .partitions import drop_partitions
+from .resample import get_period_start, resample_range
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy(NamedTuple):
+    timeframe: str
+    days: int  # days to keep the candles
+    rollup: Optional[str]  # timeframe built from the candles before they are removed
+
+
+class RetentionResult(NamedTuple):
+    policy: RetentionPolicy
+    cutoff: datetime  # all candles before were removed
+    rolled_up: int  # saved candles of the rollup timeframe
+    dropped: List[str]  # dropped partitions
+    deleted: int  # deleted rows outside of the dropped partitions
+
+
+def get_retention_policies() -> List[RetentionPolicy]:
+    """Get the retention policies of settings.OHLCV_RETENTION
+
+    Returns:
+        List[RetentionPolicy] -- policies with a retention
+    """
+    return [
+        RetentionPolicy(
+            timeframe=timeframe, days=int(policy["days"]), rollup=policy.get("rollup")
+        )
+        for timeframe, policy in settings.OHLCV_RETENTION.items()
+        if policy.get("days")
+    ]
+
+
+def get_cutoff(policy: RetentionPolicy, now: datetime) -> datetime:
+    """Get the time before which the candles are removed, moved back to the start
+    of a rollup candle so only complete rollup candles are built
+
+    Arguments:
+        policy {RetentionPolicy} -- retention policy
+        now {datetime} -- current time
+
+    Returns:
+        datetime -- cutoff time
+    """
+    cutoff: datetime = now - timedelta(days=policy.days)
+    if policy.rollup:
+        start: int = int(
+            get_period_start(
+                np.array([int(cutoff.timestamp() * 1000)], dtype=np.int64),
+                policy.rollup,
+            )[0]
+        )
+        cutoff = datetime.fromtimestamp(start / 1000, tz=pytz.UTC)
+    return cutoff
+
+
+def rollup_candles(policy: RetentionPolicy, cutoff: datetime) -> int:
+    """Build the candles of the rollup timeframe from the candles before the cutoff
+
+    Arguments:
+        policy {RetentionPolicy} -- retention policy with a rollup timeframe
+        cutoff {datetime} -- cutoff time
+
+    Returns:
+        int -- amount of saved candles
+    """
+    first_candles: Dict[int, datetime] = dict(
+        OHLCV.objects.filter(timeframe=policy.timeframe, timestamp__lt=cutoff)
+        .values_list("market")
+        .annotate(first=Min("timestamp"))
+        .order_by()
+    )
+    markets: Dict[int, Market] = Market.objects.in_bulk(list(first_candles))
+
+    rows: int = 0
+    for market_id, first in first_candles.items():
+        rows += resample_range(
+            market=markets[market_id],
+            timeframe=policy.rollup,
+            since=int(first.timestamp()) * 1000,
+            until=int(cutoff.timestamp()) * 1000,
+        )
+    return rows
+
+
+def delete_candles(timeframe: str, before: datetime) -> int:
+    """Delete the candles of a timeframe before a time without loading them
+
+    Arguments:
+        timeframe {str} -- timeframe like 1m
+        before {datetime} -- end time, excluded
+
+    Returns:
+        int -- amount of deleted candles
+    """
+    connection = connections[router.db_for_write(OHLCV)]
+    quote_name = connection.ops.quote_name
+
+    rows: int = 0
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {} WHERE {} = %s AND {} < %s".format(
+                    quote_name(OHLCV._meta.db_table),
+                    quote_name("timeframe"),
+                    quote_name("timestamp"),
+                ),
+                [
+                    timeframe,
+                    OHLCV._meta.get_field("timestamp").get_db_prep_value(
+                        before, connection
+                    ),
+                ],
+            )
+            rows = cursor.rowcount
+            cursor.execute(
+                "DELETE FROM {} WHERE {} = %s AND {} < %s".format(
+                    quote_name(CompactOHLCV._meta.db_table),
+                    quote_name("timeframe"),
+                    quote_name("timestamp"),
+                ),
+                [timeframe, int(before.timestamp() * 1000)],
+            )
+    return rows
+
+
+def apply_retention(
+    policy: RetentionPolicy, now: Optional[datetime] = None
+) -> RetentionResult:
+    """Roll up & remove the candles of a timeframe which are older than the retention,
+    whole month partitions are dropped on PostgreSQL
+
+    Arguments:
+        policy {RetentionPolicy} -- retention policy
+
+    Keyword Arguments:
+        now {Optional[datetime]} -- current time (default: {None})
+
+    Returns:
+        RetentionResult -- removed candles
+    """
+    cutoff: datetime = get_cutoff(policy, now or datetime.now(tz=pytz.UTC))
+
+    rolled_up: int = rollup_candles(policy, cutoff) if policy.rollup else 0
+    dropped: List[str] = drop_partitions(timeframe=policy.timeframe, before=cutoff)
+    deleted: int = delete_candles(timeframe=policy.timeframe, before=cutoff)
+
+    logger.info(
+        "Remove {} candles before {}, rolled up {} {} candles & dropped {} partitions.".format(
+            policy.timeframe, cutoff, rolled_up, policy.rollup, len(dropped)
+        )
+    )
+    return RetentionResult(
+        policy=policy,
+        cutoff=cutoff,
+        rolled_up=rolled_up,
+        dropped=dropped,
+        deleted=deleted,
+    )
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Bot, BotPerformance, Order, Saving
+from .performance import (
+    clear_cached_performance,
+    rebuild_performance,
+    record_order,
+    record_savings,
+)
+
+
+@receiver(post_save, sender=Bot)
+def bot_saved(sender, instance: Bot, created: bool, raw: bool, **kwargs):
+    # orders are added to an existing ledger with a single UPDATE
+    if created and not raw:
+        BotPerformance.objects.create(bot=instance)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance: Order, created: bool, **kwargs):
+    record_order(instance, created=created)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance: Order, **kwargs):
+    # the ledger isn't created again while the bot is deleted
+    rebuild_performance([instance.bot_id], create=False)
+    if Order.bot.is_cached(instance):
+        clear_cached_performance(instance.bot)
+
+
+@receiver(post_save, sender=Saving)
+def saving_saved(sender, instance: Saving, created: bool, **kwargs):
+    if created:
+        record_savings([instance])
+    else:
+        rebuild_performance([instance.bot_id])
+        if Saving.bot.is_cached(instance):
+            clear_cached_performance(instance.bot)
+
+
+@receiver(post_delete, sender=Saving)
+def saving_deleted(sender, instance: Saving, **kwargs):
+    rebuild_performance([instance.bot_id], create=False)
+    if Saving.bot.is_cached(instance):
+        clear_cached_performance(instance.bot)
@@ -0,0 +1,388 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from time import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from django.conf import settings
+from django.core.cache import cache
+
+from .api.ticker import Ticker, TickerSnapshot, set_ticker_snapshot
+from .candles import save_candles
+from .models import OHLCV, Market
+
+logger = logging.getLogger(__name__)
+
+REST: str = "rest"
+STREAM: str = "stream"
+# stream with the tickers of all markets
+TICKER_STREAM: str = "!ticker@arr"
+# seconds between the flushes of the closed candles & the published market data
+FLUSH_INTERVAL: float = 5
+# seconds until a published candle is outdated & the bots fall back to REST
+STREAM_CANDLE_TTL: int = 60
+# seconds to wait before the stream is connected again
+RECONNECT_DELAY: float = 5
+# streams per connection, binance allows 1024 & the names go into the url
+CONNECTION_STREAMS: int = 200
+
+
+def stream_symbol(market: Market) -> str:
+    """Get the symbol of a market in the stream messages like TRXBNB"""
+    return market.market_id.upper()
+
+
+def kline_stream(market: Market, timeframe: str) -> str:
+    """Get the name of the kline stream of a market like trxbnb@kline_1m"""
+    return "{}@kline_{}".format(market.market_id, timeframe)
+
+
+def stream_candle_key(market_id: int, timeframe: str) -> str:
+    return "stream-candle-{}-{}".format(market_id, timeframe)
+
+
+def split_streams(streams: List[str], size: Optional[int] = None) -> List[List[str]]:
+    """Split the streams into the streams of each connection
+
+    Arguments:
+        streams {List[str]} -- stream names
+
+    Keyword Arguments:
+        size {Optional[int]} -- max streams per connection (default: {CONNECTION_STREAMS})
+
+    Returns:
+        List[List[str]] -- streams of each connection
+    """
+    size = size or CONNECTION_STREAMS
+    return [streams[start : start + size] for start in range(0, len(streams), size)]
+
+
+class MarketDataTable:
+    """
+    Last candle & ticker of each market from the stream messages,
+    closed candles are kept until they are flushed
+    & only the updated market data is published again
+    """
+
+    def __init__(self, exchange_id: str, markets: Iterable[Market]):
+        self.exchange_id: str = exchange_id
+        self.markets: Dict[str, Market] = {
+            stream_symbol(market): market for market in markets
+        }
+        self.candles: Dict[Tuple[int, str], List[float]] = dict()
+        self.closed: Dict[Tuple[int, str], List[List[float]]] = dict()
+        # opening time of the last closed candle
+        self.closed_at: Dict[Tuple[int, str], float] = dict()
+        self.tickers: Dict[str, Ticker] = dict()
+        # time of the last message of each candle & of the tickers
+        self.updated: Dict[Tuple[int, str], float] = dict()
+        self.tickers_updated: float = 0
+        # event time of the newest ticker message in milliseconds
+        self.tickers_timestamp: int = 0
+        # time of the previous flush
+        self.flushed: float = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def add_message(self, message: dict):
+        """Add a message of a combined stream like {"stream": ..., "data": ...}
+
+        Arguments:
+            message {dict} -- decoded message
+        """
+        data = message.get("data")
+        if isinstance(data, list):
+            self.add_tickers(data)
+        elif isinstance(data, dict) and data.get("e") == "kline":
+            self.add_kline(data["k"])
+
+    def add_kline(self, kline: dict):
+        """Update the last candle of a market, a closed candle is kept for the flush
+
+        Arguments:
+            kline {dict} -- kline of a stream message
+        """
+        market: Optional[Market] = self.markets.get(kline["s"])
+        if not market:
+            return
+
+        key: Tuple[int, str] = (market.pk, kline["i"])
+        candle: List[float] = [
+            float(kline["t"]),
+            float(kline["o"]),
+            float(kline["h"]),
+            float(kline["l"]),
+            float(kline["c"]),
+            float(kline["v"]),
+        ]
+        with self.lock:
+            previous: Optional[List[float]] = self.candles.get(key)
+            # the close of the previous candle was missed
+            if (
+                previous
+                and previous[0] < candle[0]
+                and self.closed_at.get(key) != previous[0]
+            ):
+                self.closed.setdefault(key, []).append(previous)
+                self.closed_at[key] = previous[0]
+            self.candles[key] = candle
+            self.updated[key] = time()
+            if kline["x"]:
+                self.closed.setdefault(key, []).append(candle)
+                self.closed_at[key] = candle[0]
+
+    def add_tickers(self, tickers: List[dict]):
+        """Update the tickers of the markets
+
+        Arguments:
+            tickers {List[dict]} -- 24h tickers of a stream message
+        """
+        with self.lock:
+            for ticker in tickers:
+                market: Optional[Market] = self.markets.get(ticker["s"])
+                if market:
+                    self.tickers_updated = time()
+                    self.tickers_timestamp = max(
+                        self.tickers_timestamp,
+                        int(ticker.get("E") or self.tickers_updated * 1000),
+                    )
+                    self.tickers[market.symbol] = Ticker(
+                        symbol=market.symbol,
+                        percentage=float(ticker["P"]),
+                        last=float(ticker["c"]),
+                        bid=float(ticker["b"]),
+                        ask=float(ticker["a"]),
+                    )
+
+    def pop_closed(self) -> Dict[Tuple[int, str], List[List[float]]]:
+        """Get & remove the closed candles
+
+        Returns:
+            Dict[Tuple[int, str], List[List[float]]] -- candles by market id & timeframe
+        """
+        with self.lock:
+            closed: Dict[Tuple[int, str], List[List[float]]] = self.closed
+            self.closed = dict()
+        return closed
+
+    def flush(self) -> int:
+        """Save the closed candles in batches & share the last candles & tickers
+        updated since the previous flush with the bots through the cache,
+        without messages the published data expires & the bots fall back to REST
+
+        Returns:
+            int -- amount of saved candles
+        """
+        markets: Dict[int, Market] = {
+            market.pk: market for market in self.markets.values()
+        }
+        rows: int = 0
+        for (market_id, timeframe), candles in self.pop_closed().items():
+            rows += save_candles(
+                candles=sorted(candles), timeframe=timeframe, market=markets[market_id]
+            )
+
+        with self.lock:
+            last_candles: Dict[str, List[float]] = {
+                stream_candle_key(*key): candle
+                for key, candle in self.candles.items()
+                if self.updated[key] >= self.flushed
+            }
+            tickers: List[Ticker] = (
+                list(self.tickers.values())
+                if self.tickers_updated >= self.flushed
+                else list()
+            )
+            timestamp: int = self.tickers_timestamp
+            self.flushed = time()
+
+        if last_candles:
+            cache.set_many(last_candles, STREAM_CANDLE_TTL)
+        if tickers:
+            set_ticker_snapshot(
+                self.exchange_id, TickerSnapshot(tickers=tickers, timestamp=timestamp)
+            )
+        return rows
+
+
+async def consume(
+    url: str,
+    streams: List[str],
+    table: MarketDataTable,
+    max_messages: Optional[int] = None,
+    stop: Optional[threading.Event] = None,
+    reconnect: bool = True,
+):
+    """Read the messages of a combined stream into the table,
+    the stream is connected again after errors
+
+    Arguments:
+        url {str} -- websocket url like wss://stream.binance.com:9443/stream
+        streams {List[str]} -- stream names
+        table {MarketDataTable} -- table of the market data
+
+    Keyword Arguments:
+        max_messages {Optional[int]} -- stop after these messages (default: {None})
+        stop {Optional[threading.Event]} -- stop after the next message (default: {None})
+        reconnect {bool} -- connect again after the server closed the stream,
+                            the exchange closes a stream after 24h (default: {True})
+    """
+    messages: int = 0
+    async with aiohttp.ClientSession() as session:
+        while not (stop and stop.is_set()):
+            try:
+                async with session.ws_connect(
+                    url, params={"streams": "/".join(streams)}, heartbeat=30
+                ) as websocket:
+                    async for message in websocket:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        table.add_message(json.loads(message.data))
+                        messages += 1
+                        if (max_messages and messages >= max_messages) or (
+                            stop and stop.is_set()
+                        ):
+                            return
+                if not reconnect:
+                    # e.g. a finished replay isn't started again
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("Market stream {} failed: {}".format(url, e))
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+class MarketStream(threading.Thread):
+    """
+    Websocket client in its own thread with an event loop,
+    the database is only used by the flushing thread
+    """
+
+    def __init__(
+        self,
+        url: str,
+        streams: List[str],
+        table: MarketDataTable,
+        max_messages: Optional[int] = None,
+        reconnect: bool = True,
+    ):
+        super().__init__(daemon=True)
+        self.url: str = url
+        self.streams: List[str] = streams
+        self.table: MarketDataTable = table
+        self.max_messages: Optional[int] = max_messages
+        self.reconnect: bool = reconnect
+        self.stop: threading.Event = threading.Event()
+
+    def run(self):
+        asyncio.run(
+            consume(
+                url=self.url,
+                streams=self.streams,
+                table=self.table,
+                max_messages=self.max_messages,
+                stop=self.stop,
+                reconnect=self.reconnect,
+            )
+        )
+
+
+def run_stream(
+    exchange_id: str,
+    markets: List[Market],
+    timeframes: List[str],
+    url: Optional[str] = None,
+    max_messages: Optional[int] = None,
+    flush_interval: float = FLUSH_INTERVAL,
+    reconnect: bool = True,
+) -> int:
+    """Stream the candles & tickers of markets, flush them every flush_interval
+    until the streams end. The streams are split into connections
+    of CONNECTION_STREAMS streams.
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+        markets {List[Market]} -- markets of the kline streams
+        timeframes {List[str]} -- timeframes of the kline streams
+
+    Keyword Arguments:
+        url {Optional[str]} -- websocket url (default: {settings.MARKET_STREAM_URL})
+        max_messages {Optional[int]} -- stop each connection after these messages
+                                        (default: {None})
+        flush_interval {float} -- seconds between the flushes (default: {FLUSH_INTERVAL})
+        reconnect {bool} -- connect again after the server closed a stream (default: {True})
+
+    Returns:
+        int -- amount of saved candles
+    """
+    # the tickers of all markets are shared with the bots
+    table: MarketDataTable = MarketDataTable(
+        exchange_id=exchange_id,
+        markets=list(
+            Market.objects.filter(exchange=exchange_id).select_related("base", "quote")
+        )
+        + markets,
+    )
+    streams: List[MarketStream] = [
+        MarketStream(
+            url=url or settings.MARKET_STREAM_URL,
+            streams=connection_streams,
+            table=table,
+            max_messages=max_messages,
+            reconnect=reconnect,
+        )
+        for connection_streams in split_streams(
+            [TICKER_STREAM]
+            + [
+                kline_stream(market, timeframe)
+                for market in markets
+                for timeframe in timeframes
+            ]
+        )
+    ]
+    for stream in streams:
+        stream.start()
+
+    rows: int = 0
+    try:
+        alive: List[MarketStream] = streams
+        while alive:
+            alive[0].join(flush_interval)
+            rows += table.flush()
+            alive = [stream for stream in streams if stream.is_alive()]
+    finally:
+        for stream in streams:
+            stream.stop.set()
+        rows += table.flush()
+
+    logger.info("Saved {} streamed candles.".format(rows))
+    return rows
+
+
+def get_stream_candles(
+    pairs: Iterable[Tuple[Market, str]],
+) -> Dict[Tuple[int, str], OHLCV]:
+    """Get the last streamed candle of markets & timeframes,
+    outdated or missing candles are left out
+
+    Arguments:
+        pairs {Iterable[Tuple[Market, str]]} -- markets & timeframes, may repeat
+
+    Returns:
+        Dict[Tuple[int, str], OHLCV] -- unsaved candles by market id & timeframe
+    """
+    markets: Dict[Tuple[int, str], Market] = {
+        (market.pk, timeframe): market for market, timeframe in pairs
+    }
+    cached: Dict[str, List[float]] = cache.get_many(
+        [stream_candle_key(*key) for key in markets]
+    )
+    return {
+        key: OHLCV.get_OHLCV(
+            candle=cached[stream_candle_key(*key)], timeframe=key[1], market=market
+        )
+        for key, market in markets.items()
+        if stream_candle_key(*key) in cached
+    }
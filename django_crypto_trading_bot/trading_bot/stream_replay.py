@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+from aiohttp import web
+
+from .api.ohlcv import timeframe_to_milliseconds
+from .candles import Candles, load_candles
+from .models import Market
+from .stream import TICKER_STREAM, kline_stream, stream_symbol
+
+logger = logging.getLogger(__name__)
+
+# path of the combined streams like the exchange
+REPLAY_PATH: str = "/stream"
+
+
+def get_kline_message(
+    market: Market, timeframe: str, candles: Candles, index: int
+) -> dict:
+    """Get a closed kline message of a stored candle"""
+    start: int = int(candles.timestamp[index])
+    end: int = start + timeframe_to_milliseconds(timeframe)
+    return {
+        "stream": kline_stream(market, timeframe),
+        "data": {
+            "e": "kline",
+            "E": end,
+            "s": stream_symbol(market),
+            "k": {
+                "t": start,
+                "T": end - 1,
+                "s": stream_symbol(market),
+                "i": timeframe,
+                "o": str(candles.open[index]),
+                "h": str(candles.high[index]),
+                "l": str(candles.low[index]),
+                "c": str(candles.close[index]),
+                "v": str(candles.volume[index]),
+                "x": True,
+            },
+        },
+    }
+
+
+def get_ticker(market: Market, timeframe: str, candles: Candles, index: int) -> dict:
+    """Get the ticker of a market at the close of a stored candle,
+    the change of the candle stands in for the 24h change"""
+    close: float = float(candles.close[index])
+    open_price: float = float(candles.open[index])
+    return {
+        "e": "24hrTicker",
+        "E": int(candles.timestamp[index]) + timeframe_to_milliseconds(timeframe),
+        "s": stream_symbol(market),
+        "P": str((close - open_price) / open_price * 100 if open_price else 0),
+        "c": str(close),
+        "b": str(close),
+        "a": str(close),
+    }
+
+
+def build_replay_messages(
+    markets: List[Market],
+    timeframes: List[str],
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> List[dict]:
+    """Build the kline & ticker stream messages of stored candles ordered by time,
+    the tickers come from the candles of the first timeframe
+
+    Arguments:
+        markets {List[Market]} -- markets to replay
+        timeframes {List[str]} -- timeframes to replay
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Returns:
+        List[dict] -- messages of the combined streams
+    """
+    klines: List[dict] = list()
+    tickers: Dict[int, List[dict]] = dict()
+
+    for market in markets:
+        for timeframe in timeframes:
+            candles: Candles = load_candles(
+                market=market, timeframe=timeframe, since=since, until=until
+            )
+            for index in range(candles.size):
+                klines.append(get_kline_message(market, timeframe, candles, index))
+                if timeframe == timeframes[0]:
+                    tickers.setdefault(int(candles.timestamp[index]), []).append(
+                        get_ticker(market, timeframe, candles, index)
+                    )
+
+    # a ticker array follows the candles closed at the same time
+    messages: List[dict] = klines + [
+        {"stream": TICKER_STREAM, "data": data} for data in tickers.values()
+    ]
+    return sorted(
+        messages,
+        key=lambda message: (
+            (
+                message["data"][0]["E"]
+                if message["stream"] == TICKER_STREAM
+                else message["data"]["E"]
+            ),
+            message["stream"] == TICKER_STREAM,
+        ),
+    )
+
+
+async def replay(request: web.Request) -> web.WebSocketResponse:
+    """Send the messages of the requested streams, then close the websocket"""
+    websocket: web.WebSocketResponse = web.WebSocketResponse()
+    await websocket.prepare(request)
+
+    streams: Set[str] = set(request.query.get("streams", "").split("/"))
+    logger.info("Replay the streams {} to {}.".format(streams, request.remote))
+    interval: float = request.app["interval"]
+    for message in request.app["messages"]:
+        if message["stream"] in streams:
+            await websocket.send_json(message)
+            if interval:
+                await asyncio.sleep(interval)
+
+    await websocket.close()
+    return websocket
+
+
+def create_replay_app(messages: List[dict], interval: float = 0) -> web.Application:
+    """Create a websocket server which replays stream messages to each client
+
+    Arguments:
+        messages {List[dict]} -- messages of build_replay_messages
+
+    Keyword Arguments:
+        interval {float} -- seconds between the messages (default: {0})
+
+    Returns:
+        web.Application -- server application
+    """
+    app: web.Application = web.Application()
+    app["messages"] = messages
+    app["interval"] = interval
+    app.router.add_get(REPLAY_PATH, replay)
+    return app
+
+
+class ReplayServer(threading.Thread):
+    """
+    Replay server on a free local port in its own thread, e.g. for offline tests
+    """
+
+    def __init__(self, messages: List[dict], interval: float = 0):
+        super().__init__(daemon=True)
+        self.app: web.Application = create_replay_app(messages, interval)
+        self.url: Optional[str] = None
+        self.ready: threading.Event = threading.Event()
+        self.loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.runner: web.AppRunner = web.AppRunner(self.app)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.runner.setup())
+        site: web.TCPSite = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+
+        host, port = self.runner.addresses[0][:2]
+        self.url = "ws://{}:{}{}".format(host, port, REPLAY_PATH)
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.runner.cleanup())
+
+    def start(self):
+        super().start()
+        self.ready.wait()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
@@ -1,5 +1,13 @@
+from typing import List
+
+import ccxt
 from ccxt.base.exchange import Exchange
-from django_crypto_trading_bot.trading_bot.api.client import get_client
+
+from django_crypto_trading_bot.trading_bot.api import client
+from django_crypto_trading_bot.trading_bot.api.client import clear_clients, get_client
+from django_crypto_trading_bot.trading_bot.tests.api_client.api_data_example import (
+    market_structure,
+)
 
 
 def test_get_client():
@@ -8,3 +16,49 @@ def test_get_client():
     exchange.load_markets()
     market_exchange = exchange.market("TRX/BNB")
     assert market_exchange["symbol"] == "TRX/BNB"
+
+
+def test_get_client_shared():
+    clear_clients()
+
+    exchange: Exchange = get_client(exchange_id="binance")
+    assert get_client(exchange_id="binance") is exchange
+
+    # every account gets an own client
+    account_exchange: Exchange = get_client(
+        exchange_id="binance", api_key="key", secret="secret"
+    )
+    assert account_exchange is not exchange
+    assert (
+        get_client(exchange_id="binance", api_key="key", secret="secret")
+        is account_exchange
+    )
+
+
+def test_load_markets_shared(monkeypatch):
+    clear_clients()
+    requests: List[str] = list()
+
+    def fetch_markets(self, params={}) -> List[dict]:
+        requests.append(self.apiKey)
+        return [market_structure()]
+
+    monkeypatch.setattr(ccxt.binance, "fetch_markets", fetch_markets)
+    monkeypatch.setattr(ccxt.binance, "fetch_currencies", lambda self, params={}: {})
+
+    exchange: Exchange = get_client(exchange_id="binance")
+    account_exchange: Exchange = get_client(
+        exchange_id="binance", api_key="key", secret="secret"
+    )
+
+    exchange.load_markets()
+    account_exchange.load_markets()
+    assert account_exchange.market("BTC/USDT")["symbol"] == "BTC/USDT"
+    assert len(requests) == 1
+
+    # reload markets after the ttl
+    monkeypatch.setattr(client, "MARKETS_TTL", -1)
+    account_exchange.load_markets()
+    assert len(requests) == 2
+
+    clear_clients()
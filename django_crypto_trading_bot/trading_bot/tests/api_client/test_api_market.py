@@ -1,13 +1,24 @@
+from datetime import datetime
+from decimal import Decimal
+
 import pytest
 from ccxt.base.exchange import Exchange
+from django.utils import timezone
 from django_crypto_trading_bot.trading_bot.api.client import get_client
 from django_crypto_trading_bot.trading_bot.api.market import (
+    MarketSyncResult,
+    get_market_values,
+    get_metadata_hash,
     get_or_create_market,
+    sync_markets,
     update_market,
     update_all_markets,
 )
 from django_crypto_trading_bot.trading_bot.models import Market, Currency
-from django_crypto_trading_bot.trading_bot.tests.factories import OutOfDataMarketFactory
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    MarketFactory,
+    OutOfDataMarketFactory,
+)
 from django_crypto_trading_bot.trading_bot.tests.api_client.api_data_example import (
     market_structure,
     market_structure_eth_btc,
@@ -87,3 +98,62 @@ def test_update_all_markets():
     assert updated_market.active == market_exchange["active"]
     assert updated_market.precision_amount == market_exchange["precision"]["amount"]
     assert updated_market.precision_price == market_exchange["precision"]["price"]
+
+
+@pytest.mark.django_db()
+def test_sync_markets(django_assert_max_num_queries):
+    # BTC/USDT changed, TRX/BNB is no longer listed & ETH/BTC is new
+    out_of_data_market: Market = OutOfDataMarketFactory()
+    delisted_market: Market = MarketFactory()
+
+    with django_assert_max_num_queries(10):
+        result: MarketSyncResult = sync_markets(
+            responses=[market_structure(), market_structure_eth_btc()],
+            exchange_id="binance",
+        )
+
+    assert (result.created, result.updated, result.deactivated) == (1, 1, 1)
+    assert [market.symbol for market in result.markets] == ["BTC/USDT", "ETH/BTC"]
+    assert all(market.pk for market in result.markets)
+
+    out_of_data_market.refresh_from_db()
+    assert out_of_data_market.active
+    assert out_of_data_market.precision_amount == 8
+    delisted_market.refresh_from_db()
+    assert not delisted_market.active
+    eth_btc: Market = Market.objects.get(base__short="ETH", quote__short="BTC")
+    assert eth_btc.limits_price_min == Decimal("0.000001")
+
+    # nothing changed
+    # savepoint, currencies, markets & release
+    with django_assert_max_num_queries(4):
+        result = sync_markets(
+            responses=[market_structure(), market_structure_eth_btc()],
+            exchange_id="binance",
+        )
+    assert (result.created, result.updated, result.deactivated) == (0, 0, 0)
+
+
+@pytest.mark.django_db()
+def test_sync_markets_changed_since():
+    sync_markets(
+        responses=[market_structure(), market_structure_eth_btc()],
+        exchange_id="binance",
+    )
+    synced: datetime = timezone.now()
+    assert not Market.changed_since(synced).exists()
+
+    # only the active flag of BTC/USDT & the price limit of ETH/BTC changed
+    btc_usdt: dict = market_structure()
+    btc_usdt["active"] = False
+    eth_btc: dict = market_structure_eth_btc()
+    eth_btc["limits"]["price"]["min"] = 1e-05
+
+    result: MarketSyncResult = sync_markets(
+        responses=[btc_usdt, eth_btc], exchange_id="binance"
+    )
+    assert result.updated == 2
+    assert [market.symbol for market in Market.changed_since(synced)] == ["ETH/BTC"]
+    assert result.markets[1].metadata_hash == get_metadata_hash(
+        get_market_values(eth_btc)
+    )
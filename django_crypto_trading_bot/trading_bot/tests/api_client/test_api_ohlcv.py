@@ -0,0 +1,300 @@
+from datetime import timedelta
+from typing import List, Optional
+
+import pytest
+from django.db import DatabaseError
+from django.utils import timezone
+
+from django_crypto_trading_bot.trading_bot.api.ohlcv import (
+    LATEST_CANDLE_MAX_AGE,
+    MarketBackfill,
+    backfill_markets,
+    fetch_window,
+    get_latest_candles,
+    split_range,
+)
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Market,
+    OHLCVCoverage,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    BnbEurMarketFactory,
+    MarketFactory,
+)
+
+MINUTE: int = 60 * 1000
+
+
+class CandleExchange:
+    """
+    Offline exchange with a candle for every minute of a time range
+    """
+
+    id = "binance"
+
+    def __init__(self, first: int, now: int):
+        self.first: int = first
+        self.now: int = now
+        self.requests: int = 0
+
+    def milliseconds(self) -> int:
+        return self.now
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[List[float]]:
+        self.requests += 1
+        limit = limit or 500
+        if since is None:
+            # latest candles
+            since = self.now - self.now % MINUTE - (limit - 1) * MINUTE
+        start: int = max(since, self.first)
+        start += -start % MINUTE
+        return [
+            [timestamp, 1.0, 2.0, 0.5, 1.5, 100.0]
+            for timestamp in range(start, self.now, MINUTE)[:limit]
+        ]
+
+
+def test_split_range():
+    windows = split_range(
+        since=0, until=25 * MINUTE, timeframe=Timeframes.MINUTE_1, window_size=10
+    )
+
+    assert windows == [
+        (0, 10 * MINUTE),
+        (10 * MINUTE, 20 * MINUTE),
+        (20 * MINUTE, 25 * MINUTE),
+    ]
+
+
+def test_fetch_window():
+    exchange: CandleExchange = CandleExchange(first=0, now=250 * MINUTE)
+
+    # a full window needs only one request
+    candles = fetch_window(
+        exchange=exchange,
+        symbol="TRX/BNB",
+        timeframe=Timeframes.MINUTE_1,
+        since=0,
+        until=100 * MINUTE,
+        limit=100,
+    )
+    assert len(candles) == 100
+    assert exchange.requests == 1
+
+    # the window is fetched page by page
+    candles = fetch_window(
+        exchange=exchange,
+        symbol="TRX/BNB",
+        timeframe=Timeframes.MINUTE_1,
+        since=0,
+        until=200 * MINUTE,
+        limit=100,
+    )
+    assert len(candles) == 200
+    assert exchange.requests == 3
+
+    # a short page ends the window
+    candles = fetch_window(
+        exchange=exchange,
+        symbol="TRX/BNB",
+        timeframe=Timeframes.MINUTE_1,
+        since=200 * MINUTE,
+        until=300 * MINUTE,
+        limit=100,
+    )
+    assert len(candles) == 50
+    assert exchange.requests == 4
+
+
+@pytest.mark.django_db()
+def test_market_backfill_writes_ordered():
+    market: Market = MarketFactory()
+    backfill: MarketBackfill = MarketBackfill(
+        market=market,
+        timeframe=Timeframes.MINUTE_1,
+        windows=[(0, MINUTE), (MINUTE, 2 * MINUTE)],
+    )
+
+    # second window arrives first & waits for the first window
+    backfill.add(1, [[MINUTE, 1, 1, 1, 1, 1]])
+    assert OHLCV.objects.count() == 0
+
+    backfill.add(0, [[0, 1, 1, 1, 1, 1]])
+    assert OHLCV.objects.filter(timeframe=Timeframes.MINUTE_1).count() == 2
+    assert backfill.candles == 2
+
+    # the higher timeframes are built from the 1m candles
+    assert OHLCV.objects.filter(timeframe=Timeframes.HOUR_1).get().volume == 2
+
+
+@pytest.mark.django_db()
+def test_backfill_markets():
+    market: Market = MarketFactory()
+    exchange: CandleExchange = CandleExchange(first=10 * MINUTE, now=1010 * MINUTE)
+
+    candles: int = backfill_markets(
+        markets=[market],
+        timeframe=Timeframes.MINUTE_1,
+        concurrency=4,
+        window_size=100,
+        exchange=exchange,
+    )
+
+    assert candles == 1000
+    assert (
+        OHLCV.objects.filter(market=market, timeframe=Timeframes.MINUTE_1).count()
+        == 1000
+    )
+
+    # update only the new candles
+    exchange.now += 5 * MINUTE
+    candles = backfill_markets(
+        markets=[market],
+        timeframe=Timeframes.MINUTE_1,
+        window_size=100,
+        exchange=exchange,
+    )
+
+    # the last candle is updated again
+    assert candles == 6
+    assert (
+        OHLCV.objects.filter(market=market, timeframe=Timeframes.MINUTE_1).count()
+        == 1005
+    )
+
+
+@pytest.mark.django_db()
+def test_backfill_markets_database_error(monkeypatch):
+    market: Market = MarketFactory()
+    market2: Market = BnbEurMarketFactory()
+    exchange: CandleExchange = CandleExchange(first=10 * MINUTE, now=1010 * MINUTE)
+
+    write = MarketBackfill.write
+
+    def failing_write(backfill: MarketBackfill, candles: List[List[float]]):
+        if backfill.market == market:
+            raise DatabaseError("could not extend file")
+        write(backfill, candles)
+
+    monkeypatch.setattr(MarketBackfill, "write", failing_write)
+
+    candles: int = backfill_markets(
+        markets=[market, market2],
+        timeframe=Timeframes.MINUTE_1,
+        concurrency=4,
+        window_size=100,
+        exchange=exchange,
+    )
+
+    # the database error stops only the backfill of the failed market
+    assert candles == 1000
+    assert not OHLCV.objects.filter(market=market).exists()
+    assert (
+        OHLCV.objects.filter(market=market2, timeframe=Timeframes.MINUTE_1).count()
+        == 1000
+    )
+
+
+@pytest.mark.django_db()
+def test_get_latest_candles(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    market2: Market = BnbEurMarketFactory()
+    exchange: CandleExchange = CandleExchange(first=0, now=100 * MINUTE + 10)
+
+    # the current candle of market2 was just saved
+    save_candles(
+        candles=[[100 * MINUTE, 1.0, 2.0, 0.5, 1.5, 100.0]],
+        timeframe=Timeframes.MINUTE_1,
+        market=market2,
+    )
+
+    candles = get_latest_candles(
+        [
+            (market, Timeframes.MINUTE_1),
+            (market, Timeframes.MINUTE_1),
+            (market2, Timeframes.MINUTE_1),
+            (market2, Timeframes.MINUTE_1),
+        ],
+        exchange=exchange,
+    )
+
+    assert exchange.requests == 1
+    assert len(candles) == 2
+    assert candles[(market.pk, Timeframes.MINUTE_1)].timestamp.timestamp() == 6000
+    assert candles[(market2.pk, Timeframes.MINUTE_1)].pk is not None
+
+
+@pytest.mark.django_db()
+def test_get_latest_candles_without_candle():
+    market: Market = MarketFactory()
+    # the exchange has no candles yet
+    exchange: CandleExchange = CandleExchange(first=200 * MINUTE, now=100 * MINUTE)
+
+    candles = get_latest_candles(
+        [(market, Timeframes.MINUTE_1), (market, Timeframes.MINUTE_1)],
+        exchange=exchange,
+    )
+
+    assert exchange.requests == 1
+    assert candles == {}
+
+
+@pytest.mark.django_db()
+def test_get_latest_candles_stale_candle(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    exchange: CandleExchange = CandleExchange(first=0, now=100 * MINUTE + 10)
+
+    # the unfinished candle was saved long ago & has an old closing price
+    save_candles(
+        candles=[[100 * MINUTE, 1.0, 1.0, 1.0, 1.0, 1.0]],
+        timeframe=Timeframes.MINUTE_1,
+        market=market,
+    )
+    OHLCVCoverage.objects.update(
+        updated=timezone.now() - timedelta(seconds=LATEST_CANDLE_MAX_AGE + 1)
+    )
+
+    candles = get_latest_candles([(market, Timeframes.MINUTE_1)], exchange=exchange)
+
+    assert exchange.requests == 1
+    candle: OHLCV = candles[(market.pk, Timeframes.MINUTE_1)]
+    assert candle.pk is None
+    assert float(candle.closing_price) == 1.5
+
+
+@pytest.mark.django_db()
+def test_backfill_markets_since(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    market2: Market = BnbEurMarketFactory()
+    exchange: CandleExchange = CandleExchange(first=10 * MINUTE, now=1010 * MINUTE)
+
+    # a market without candles starts at since instead of its first candle
+    candles: int = backfill_markets(
+        markets=[market, market2],
+        timeframe=Timeframes.MINUTE_1,
+        window_size=50,
+        exchange=exchange,
+        since=910 * MINUTE,
+    )
+
+    assert candles == 200
+    for updated_market in [market, market2]:
+        assert (
+            OHLCV.objects.filter(market=updated_market, timeframe=Timeframes.MINUTE_1)
+            .order_by("timestamp")
+            .first()
+            .timestamp.timestamp()
+            == 910 * 60
+        )
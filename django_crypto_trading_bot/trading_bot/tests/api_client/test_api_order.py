@@ -1,10 +1,14 @@
+import threading
 from datetime import datetime
 from decimal import Decimal
-from typing import List
+from typing import Dict, List, Optional
 
 import pytest
 import pytz
 from ccxt import Exchange
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from django_crypto_trading_bot.trading_bot.api.client import get_client
 from django_crypto_trading_bot.trading_bot.api.market import (
@@ -12,20 +16,102 @@ from django_crypto_trading_bot.trading_bot.api.market import (
 )
 from django_crypto_trading_bot.trading_bot.api.order import (
     create_order,
+    order_sync_key,
+    update_all_open_orders,
     update_order_from_api_response,
 )
-from django_crypto_trading_bot.trading_bot.models import Market, Order, Trade
+from django_crypto_trading_bot.trading_bot.api.paper import (
+    PAPER_ORDER_PREFIX,
+    fill_paper_orders,
+)
+from django_crypto_trading_bot.trading_bot.api.ticker import (
+    Ticker,
+    TickerSnapshot,
+    set_ticker_snapshot,
+)
+from django_crypto_trading_bot.trading_bot.models import Account, Market, Order, Trade
 from django_crypto_trading_bot.trading_bot.tests.api_client.api_data_example import (
     order_structure,
+    trade_structure,
 )
 from django_crypto_trading_bot.trading_bot.tests.factories import (
+    AccountFactory,
     BotFactory,
     BtcCurrencyFactory,
     BuyOrderFactory,
     EthCurrencyFactory,
+    OpenBuyOrderFactory,
 )
 
 
+class OrderExchange:
+    """
+    Offline exchange which answers order requests from a dict of orders
+    """
+
+    id = "binance"
+    has = {
+        "fetchOpenOrders": True,
+        "fetchOrders": True,
+        "fetchMyTrades": True,
+    }
+
+    def __init__(self, orders: Dict[str, dict], trades: List[dict]):
+        self.orders: Dict[str, dict] = orders
+        self.trades: List[dict] = trades
+        self.requests: List[str] = list()
+
+    def milliseconds(self) -> int:
+        return 1502962956216
+
+    def fetch_open_orders(
+        self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        self.requests.append("fetch_open_orders")
+        return [order for order in self.orders.values() if order["status"] == "open"]
+
+    def fetch_orders(
+        self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        self.requests.append("fetch_orders")
+        return list(self.orders.values())
+
+    def fetch_order(self, id: str, symbol: str) -> dict:
+        self.requests.append("fetch_order")
+        return self.orders[id]
+
+    def fetch_my_trades(
+        self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        self.requests.append("fetch_my_trades")
+        return self.trades
+
+
+class SlowOrderExchange(OrderExchange):
+    """
+    Offline exchange which answers only after the release event is set
+    """
+
+    def __init__(self, orders: Dict[str, dict], trades: List[dict]):
+        super().__init__(orders=orders, trades=trades)
+        self.release: threading.Event = threading.Event()
+
+    def fetch_order(self, id: str, symbol: str) -> dict:
+        self.release.wait(timeout=10)
+        return super().fetch_order(id=id, symbol=symbol)
+
+
+class BrokenTradesExchange(OrderExchange):
+    """
+    Offline exchange which fails while the trades are fetched
+    """
+
+    def fetch_my_trades(
+        self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        raise KeyError(symbol)
+
+
 @pytest.mark.django_db()
 def test_create_buy_order():
     exchange: Exchange = get_client(exchange_id="binance")
@@ -85,6 +171,120 @@ def test_create_sell_order():
     assert len(Order.objects.all()) == 2
 
 
+@pytest.mark.django_db()
+def test_create_paper_order():
+    bot = BotFactory()
+
+    with CaptureQueriesContext(connection) as context:
+        order: Order = create_order(
+            amount=Decimal(1),
+            price=Decimal("0.01"),
+            side="buy",
+            bot=bot,
+            isTestOrder=True,
+            market=bot.market,
+        )
+
+    # only the insert & the update of the bot performance,
+    # no matter how many orders exist
+    assert len(context.captured_queries) == 2
+
+    # market orders are filled at the price of the shared tickers
+    set_ticker_snapshot(
+        bot.account.exchange,
+        TickerSnapshot(
+            tickers=[
+                Ticker(
+                    symbol=bot.market.symbol,
+                    percentage=1.0,
+                    last=0.02,
+                    bid=0.019,
+                    ask=0.021,
+                )
+            ],
+            timestamp=0,
+        ),
+    )
+    order2: Order = create_order(
+        amount=Decimal(1),
+        side="sell",
+        bot=bot,
+        isTestOrder=True,
+        market=bot.market,
+    )
+
+    assert order.order_id.startswith(PAPER_ORDER_PREFIX)
+    assert order.order_id != order2.order_id
+    assert order.order_type == Order.OrderType.LIMIT
+    assert order.status == Order.Status.OPEN
+    assert order.price == Decimal("0.01")
+    assert order.filled == Decimal(0)
+
+    # market orders are filled at once
+    assert order2.order_type == Order.OrderType.MARKET
+    assert order2.status == Order.Status.CLOSED
+    assert order2.filled == Decimal(1)
+    assert order2.price == Decimal("0.019")
+
+
+class PaperCandleExchange:
+    """
+    Offline exchange with the latest 1m candles of a market
+    """
+
+    id = "binance"
+
+    def __init__(self, candles: List[List[float]]):
+        self.candles: List[List[float]] = candles
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[List[float]]:
+        return self.candles[-limit:]
+
+
+@pytest.mark.django_db()
+def test_fill_paper_orders():
+    bot = BotFactory()
+    created: datetime = datetime(2020, 5, 1, 12, 0, 30, tzinfo=pytz.UTC)
+    start: int = int(created.timestamp() * 1000) - 30 * 1000
+    buy: Order = OpenBuyOrderFactory(
+        bot=bot,
+        order_id=PAPER_ORDER_PREFIX + "1",
+        timestamp=created,
+        price=Decimal("0.9"),
+        amount=Decimal(10),
+    )
+    sell: Order = OpenBuyOrderFactory(
+        bot=bot,
+        order_id=PAPER_ORDER_PREFIX + "2",
+        side=Order.Side.SIDE_SELL,
+        timestamp=created,
+        price=Decimal("1.5"),
+        amount=Decimal(10),
+    )
+    exchange: PaperCandleExchange = PaperCandleExchange(
+        [
+            # the low before the orders is too early
+            [start - 60 * 1000, 1.0, 1.0, 0.5, 1.0, 1.0],
+            [start, 1.0, 1.2, 0.85, 1.0, 1.0],
+            [start + 60 * 1000, 1.0, 1.4, 0.95, 1.0, 1.0],
+        ]
+    )
+
+    filled: List[Order] = fill_paper_orders([buy, sell], exchange=exchange)
+
+    # only the buy order is crossed by a candle after its creation
+    assert filled == [buy]
+    assert buy.status == Order.Status.CLOSED
+    assert buy.filled == Decimal(10)
+    assert sell.status == Order.Status.OPEN
+
+
 @pytest.mark.django_db()
 def test_get_all_markets_from_exchange():
     # load all markets
@@ -130,3 +330,134 @@ def test_update_order_from_api_response():
     assert order.fee_currency == BtcCurrencyFactory()
     assert "{:.4f}".format(order.fee_cost) == "{:.4f}".format(order_dict["fee"]["cost"])
     assert "{:.4f}".format(order.fee_rate) == "{:.4f}".format(order_dict["fee"]["rate"])
+
+
+@pytest.mark.django_db()
+def test_update_all_open_orders(monkeypatch):
+    order: Order = OpenBuyOrderFactory()
+    order2: Order = OpenBuyOrderFactory(order_id="4")
+
+    order_dict: dict = order_structure(add_trades=False)
+    order_dict["id"] = order.order_id
+    order_dict2: dict = order_structure(add_trades=False)
+    order_dict2["id"] = order2.order_id
+    order_dict2["status"] = "closed"
+    order_dict2["filled"] = order_dict2["amount"]
+    order_dict2["fee"]["rate"] = None
+
+    trade: dict = trade_structure()
+    trade["order"] = order2.order_id
+
+    exchange: OrderExchange = OrderExchange(
+        orders={order.order_id: order_dict, order2.order_id: order_dict2},
+        trades=[trade],
+    )
+    monkeypatch.setattr(Account, "get_account_client", lambda account: exchange)
+
+    update_all_open_orders(workers=1)
+
+    # one bulk request per type instead of a request per order
+    assert exchange.requests == ["fetch_open_orders", "fetch_orders", "fetch_my_trades"]
+
+    order.refresh_from_db()
+    assert order.status == Order.Status.OPEN
+    assert order.filled == Decimal("1.1")
+    assert order.fee_currency == BtcCurrencyFactory()
+
+    order2.refresh_from_db()
+    assert order2.status == Order.Status.CLOSED
+    assert order2.filled == Decimal("1.5")
+    assert order2.fee_rate is None
+
+    assert Trade.objects.get(trade_id=trade["id"]).order == order2
+    assert Trade.objects.count() == 1
+
+    # trades are only created once
+    update_all_open_orders(workers=1)
+    assert Trade.objects.count() == 1
+
+
+@pytest.mark.django_db()
+def test_update_all_open_orders_deadline(monkeypatch):
+    BtcCurrencyFactory()
+    order: Order = OpenBuyOrderFactory(
+        bot=BotFactory(account=AccountFactory(api_key="fast"))
+    )
+    slow_order: Order = OpenBuyOrderFactory(
+        order_id="4", bot=BotFactory(account=AccountFactory(api_key="slow"))
+    )
+
+    order_dict: dict = order_structure(add_trades=False)
+    order_dict["id"] = order.order_id
+    slow_order_dict: dict = order_structure(add_trades=False)
+    slow_order_dict["id"] = slow_order.order_id
+
+    exchanges: Dict[str, OrderExchange] = {
+        "fast": OrderExchange(orders={order.order_id: order_dict}, trades=[]),
+        "slow": SlowOrderExchange(
+            orders={slow_order.order_id: slow_order_dict}, trades=[]
+        ),
+    }
+    monkeypatch.setattr(
+        Account, "get_account_client", lambda account: exchanges[account.api_key]
+    )
+
+    try:
+        # the slow account doesn't hold up the fast account
+        update_all_open_orders(workers=2, deadline=0.5)
+
+        order.refresh_from_db()
+        assert order.filled == Decimal("1.1")
+        slow_order.refresh_from_db()
+        assert slow_order.filled == Decimal(100)
+
+        # the slow account is skipped while its lane is still running
+        update_all_open_orders(workers=2, deadline=0.5)
+        assert exchanges["fast"].requests.count("fetch_order") == 2
+        assert exchanges["slow"].requests == []
+    finally:
+        exchanges["slow"].release.set()
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("workers", [1, 2])
+def test_update_all_open_orders_failed_lane(monkeypatch, workers):
+    cache.clear()
+    # the lanes only read the currencies, sqlite locks concurrent inserts
+    BtcCurrencyFactory()
+    EthCurrencyFactory()
+    order: Order = OpenBuyOrderFactory(
+        bot=BotFactory(account=AccountFactory(api_key="ok"))
+    )
+    broken_order: Order = OpenBuyOrderFactory(
+        order_id="4", bot=BotFactory(account=AccountFactory(api_key="broken"))
+    )
+
+    exchanges: Dict[str, OrderExchange] = dict()
+    for api_key, exchange_class, exchange_order in (
+        ("ok", OrderExchange, order),
+        ("broken", BrokenTradesExchange, broken_order),
+    ):
+        order_dict: dict = order_structure(add_trades=False)
+        order_dict["id"] = exchange_order.order_id
+        trade: dict = trade_structure()
+        trade["id"] = "trade-{}".format(api_key)
+        trade["order"] = exchange_order.order_id
+        exchanges[api_key] = exchange_class(
+            orders={exchange_order.order_id: order_dict}, trades=[trade]
+        )
+    monkeypatch.setattr(
+        Account, "get_account_client", lambda account: exchanges[account.api_key]
+    )
+
+    # the error of one account doesn't drop the updates of the others
+    update_all_open_orders(workers=workers, deadline=5)
+
+    order.refresh_from_db()
+    assert order.filled == Decimal("1.1")
+    assert list(Trade.objects.values_list("trade_id", flat=True)) == ["trade-ok"]
+
+    # only the cursor of the saved trades moved
+    symbol: str = order.bot.market.symbol
+    assert cache.get(order_sync_key(order.bot.account, symbol)) == 1502962956216
+    assert cache.get(order_sync_key(broken_order.bot.account, symbol)) is None
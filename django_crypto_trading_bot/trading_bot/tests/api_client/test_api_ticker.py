@@ -0,0 +1,55 @@
+import pickle
+
+from django.core.cache import cache
+
+from django_crypto_trading_bot.trading_bot.api import ticker
+from django_crypto_trading_bot.trading_bot.api.ticker import (
+    TickerSnapshot,
+    get_ticker_snapshot,
+)
+
+TICKERS: dict = {
+    "BNB/EUR": {"symbol": "BNB/EUR", "percentage": 2.0, "last": 1.0},
+    "TRX/BNB": {"symbol": "TRX/BNB", "percentage": None, "last": 2.0},
+    "ETH/BNB": {"symbol": "ETH/BNB", "percentage": 10.0, "last": 3.0},
+    "BTC/EUR": {"symbol": "BTC/EUR", "percentage": -4.0, "last": 4.0},
+}
+
+
+def test_ticker_snapshot():
+    snapshot: TickerSnapshot = TickerSnapshot.from_ccxt(tickers=TICKERS, timestamp=1)
+
+    # ordered by percentage, tickers without percentage are the last
+    assert [ticker.symbol for ticker in snapshot] == [
+        "ETH/BNB",
+        "BNB/EUR",
+        "BTC/EUR",
+        "TRX/BNB",
+    ]
+    assert snapshot["TRX/BNB"].last == 2.0
+    assert "XRP/BNB" not in snapshot
+
+    loaded: TickerSnapshot = pickle.loads(pickle.dumps(snapshot))
+    assert loaded.tickers == snapshot.tickers
+    assert loaded.by_symbol == snapshot.by_symbol
+    assert loaded.timestamp == 1
+
+
+def test_get_ticker_snapshot(monkeypatch):
+    cache.clear()
+
+    fetches: list = list()
+
+    def fetch_ticker_snapshot(exchange_id: str) -> TickerSnapshot:
+        fetches.append(exchange_id)
+        return TickerSnapshot.from_ccxt(tickers=TICKERS, timestamp=1)
+
+    monkeypatch.setattr(ticker, "fetch_ticker_snapshot", fetch_ticker_snapshot)
+
+    snapshot: TickerSnapshot = get_ticker_snapshot("binance")
+    assert len(snapshot) == 4
+
+    # all other bots get the cached snapshot
+    get_ticker_snapshot("binance")
+    get_ticker_snapshot("binance")
+    assert fetches == ["binance"]
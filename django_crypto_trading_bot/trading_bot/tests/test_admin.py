@@ -0,0 +1,124 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    Bot,
+    Market,
+    OHLCVCoverage,
+    Order,
+    OrderErrorLog,
+    Timeframes,
+    Trade,
+)
+from django_crypto_trading_bot.trading_bot.ohlcv_coverage import refresh_coverage
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    BnbCurrencyFactory,
+    BotFactory,
+    MarketFactory,
+)
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import create_candles
+
+CHANGELISTS = ["order", "bot", "trade", "market", "account", "ohlcvcoverage"]
+
+
+def create_orders(amount: int, start: int):
+    previous: Order = None
+    for index in range(start, start + amount):
+        bot: Bot = BotFactory()
+        order: Order = Order.objects.create(
+            bot=bot,
+            order_id="order-{}".format(index),
+            timestamp=timezone.now(),
+            order_type=Order.OrderType.LIMIT,
+            side=Order.Side.SIDE_BUY,
+            price=Decimal(1),
+            amount=Decimal(1),
+            next_order=previous,
+        )
+        OrderErrorLog.objects.create(
+            order=order, error_type=OrderErrorLog.ErrorTypes.InvalidOrder
+        )
+        Trade.objects.create(
+            order=order,
+            trade_id="trade-{}".format(index),
+            timestamp=timezone.now(),
+            taker_or_maker=Order.OrderType.LIMIT,
+            amount=Decimal(1),
+            fee_currency=BnbCurrencyFactory(),
+            fee_cost=Decimal(0),
+        )
+        previous = order
+
+
+def count_queries(client, name: str) -> int:
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse("admin:trading_bot_{}_changelist".format(name)))
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("name", CHANGELISTS)
+def test_changelist_queries(admin_client, name):
+    create_orders(amount=2, start=0)
+    queries: int = count_queries(admin_client, name)
+
+    # the queries don't grow with the rows of the page
+    create_orders(amount=8, start=2)
+    assert count_queries(admin_client, name) == queries
+
+
+@pytest.mark.django_db()
+def test_order_errors_annotation(admin_client):
+    create_orders(amount=3, start=0)
+    response = admin_client.get(
+        reverse("admin:trading_bot_order_changelist"), {"o": "8"}
+    )
+    orders = list(response.context["cl"].result_list)
+    assert [order.errors_count for order in orders] == [1, 1, 1]
+
+
+@pytest.mark.django_db()
+def test_ohlcv_keyset_pages(admin_client, settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    save_candles(create_candles(250), timeframe=Timeframes.MINUTE_1, market=market)
+    url: str = reverse("admin:trading_bot_ohlcv_changelist")
+
+    # save_candles keeps the coverage, without it the candles are counted
+    # up to COUNT_LIMIT
+    OHLCVCoverage.objects.all().delete()
+    response = admin_client.get(url, {"market__id__exact": market.pk})
+    cl = response.context["cl"]
+    assert cl.result_count == 250
+    assert cl.first_url is None
+
+    timestamps: List[datetime] = []
+    while True:
+        timestamps += [candle.timestamp for candle in cl.result_list]
+        if not cl.next_url:
+            break
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.get(url + cl.next_url)
+        cl = response.context["cl"]
+        assert not any("OFFSET" in query["sql"] for query in context.captured_queries)
+        assert cl.first_url
+
+    assert len(timestamps) == 250
+    assert timestamps == sorted(timestamps)
+
+    refresh_coverage()
+    response = admin_client.get(url, {"timeframe__exact": Timeframes.MINUTE_1})
+    assert response.context["cl"].result_count == 250
+    assert [row.candles for row in response.context["coverage"]] == [250]
+
+    response = admin_client.get(url, {"after": "invalid"})
+    assert response.status_code == 302
@@ -0,0 +1,173 @@
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pytest
+
+from django_crypto_trading_bot.trading_bot.backtest import (
+    AlignedCloses,
+    BacktestResult,
+    align_candles,
+    backtest_rising_chart,
+    backtest_wave_rider,
+    get_best_rise,
+    max_drawdown,
+)
+from django_crypto_trading_bot.trading_bot.candles import Candles
+from django_crypto_trading_bot.trading_bot.models import Market, Order, Timeframes
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    EthBnbMarketFactory,
+    MarketFactory,
+)
+
+MINUTE: int = 60 * 1000
+HOUR: int = 60 * MINUTE
+
+
+def create_candles(prices: List[Tuple[float, float]], step: int) -> Candles:
+    """
+    create candles from (high, low) prices
+    """
+    high: np.ndarray = np.array([price[0] for price in prices], dtype=np.float64)
+    low: np.ndarray = np.array([price[1] for price in prices], dtype=np.float64)
+    close: np.ndarray = (high + low) / 2
+    return Candles(
+        timestamp=np.arange(len(prices), dtype=np.int64) * step,
+        open=close,
+        high=high,
+        low=low,
+        close=close,
+        volume=np.ones(len(prices)),
+    )
+
+
+def test_max_drawdown():
+    assert max_drawdown(np.array([1.0, 2.0, 1.5, 3.0, 1.5])) == 50.0
+    assert max_drawdown(np.array([])) == 0.0
+
+
+@pytest.mark.django_db()
+def test_backtest_wave_rider():
+    market: Market = MarketFactory()
+    candles: Candles = create_candles(
+        [(10.5, 10.0), (10.6, 9.8), (10.7, 10.2), (10.3, 9.7), (10.3, 9.9)],
+        step=MINUTE,
+    )
+
+    result: BacktestResult = backtest_wave_rider(
+        market=market,
+        candles=candles,
+        timeframe=Timeframes.HOUR_1,
+        amount=Decimal(1),
+        fee_rate=Decimal("0.1"),
+    )
+
+    assert [trade.side for trade in result.trades] == [
+        Order.Side.SIDE_BUY,
+        Order.Side.SIDE_SELL,
+        Order.Side.SIDE_BUY,
+    ]
+    assert [trade.timestamp for trade in result.trades] == [
+        MINUTE,
+        2 * MINUTE,
+        3 * MINUTE,
+    ]
+    # buy at the first low, sell at the high & buy at the low of the current hour
+    assert [trade.price for trade in result.trades] == [
+        Decimal(10),
+        Decimal("10.6"),
+        Decimal("9.8"),
+    ]
+    assert result.trades[1].amount == Decimal("0.9")
+
+    assert [saving.amount for saving in result.savings] == [
+        Decimal(1),
+        Decimal("0.98"),
+    ]
+    assert result.savings[0].currency == market.quote.short
+
+    assert result.equity.size == candles.size
+    assert result.equity[0] == 10
+    assert result.roi > 0
+
+
+@pytest.mark.django_db()
+def test_align_candles():
+    market: Market = MarketFactory()
+    market2: Market = EthBnbMarketFactory()
+
+    candles: Candles = create_candles([(1.0, 1.0), (2.0, 2.0)], step=2 * HOUR)
+    candles2: Candles = create_candles([(3.0, 3.0)] * 2, step=HOUR)
+    candles2 = candles2._replace(timestamp=candles2.timestamp + HOUR)
+
+    close: AlignedCloses = align_candles(
+        markets=[market, market2], candles={market.pk: candles, market2.pk: candles2}
+    )
+
+    assert close.shape == (2, 3)
+    assert close.timestamp.tolist() == [0, HOUR, 2 * HOUR]
+    # missing prices are taken from the previous candle
+    np.testing.assert_array_equal(
+        close.window(0, 3), [[1.0, 1.0, 2.0], [np.nan, 3.0, 3.0]]
+    )
+    np.testing.assert_array_equal(close[0, 1:3], [1.0, 2.0])
+    assert close[1, 2] == 3.0
+
+
+@pytest.mark.django_db()
+def test_get_best_rise():
+    market: Market = MarketFactory()
+    market2: Market = EthBnbMarketFactory()
+
+    hours: int = 60
+    candles: Dict[int, Candles] = {
+        market.pk: create_candles(
+            [(1.0 + hour / 100, 0.0) for hour in range(hours)], step=HOUR
+        ),
+        market2.pk: create_candles(
+            [(1.0 + (hour % 7) / 10, 0.0) for hour in range(hours)], step=HOUR
+        ),
+    }
+    close: AlignedCloses = align_candles(markets=[market, market2], candles=candles)
+
+    best_market, best_percentage = get_best_rise(close)
+    # no price 24h ago
+    assert np.isneginf(best_percentage[:24]).all()
+    assert np.isfinite(best_percentage[24:]).all()
+
+    # the result doesn't depend on the window size
+    windowed_market, windowed_percentage = get_best_rise(close, window=7)
+    np.testing.assert_array_equal(windowed_market[24:], best_market[24:])
+    np.testing.assert_array_equal(windowed_percentage, best_percentage)
+
+
+@pytest.mark.django_db()
+def test_backtest_rising_chart():
+    market: Market = MarketFactory()
+    market2: Market = EthBnbMarketFactory()
+
+    hours: int = 72
+    eth: List[float] = [1.0] * 30 + [1.1, 1.2] + [1.15] * (hours - 32)
+
+    result: BacktestResult = backtest_rising_chart(
+        markets=[market, market2],
+        candles={
+            market.pk: create_candles([(1.0, 1.0)] * hours, step=HOUR),
+            market2.pk: create_candles([(price, price) for price in eth], step=HOUR),
+        },
+        quote_amount=Decimal(10),
+        min_rise=Decimal(5),
+        stop_loss=Decimal(-2),
+        lock_time=12,
+        fee_rate=Decimal("0.1"),
+    )
+
+    # buy the rise, sell at the stop loss & buy again after the lock time
+    assert [(trade.timestamp // HOUR, trade.side) for trade in result.trades] == [
+        (30, Order.Side.SIDE_BUY),
+        (32, Order.Side.SIDE_SELL),
+        (45, Order.Side.SIDE_BUY),
+    ]
+    assert {trade.symbol for trade in result.trades} == {market2.symbol}
+    assert result.trades[0].amount == Decimal("9.091")
+    assert result.drawdown > 0
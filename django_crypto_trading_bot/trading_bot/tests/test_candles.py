@@ -0,0 +1,75 @@
+from typing import List
+
+import pytest
+
+from django_crypto_trading_bot.trading_bot.candles import (
+    Candles,
+    load_candles,
+    save_candles,
+)
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    CompactOHLCV,
+    Market,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+
+CANDLES: List[List[float]] = [
+    [1504541580000, 4235.4, 4240.6, 4230.0, 4230.7, 37.72941911],
+    [1504541640000, 4230.7, 4238.1, 4229.3, 4237.9, 12.5],
+    [1504541700000, 4237.9, 4241.0, 4236.2, 4240.1, 3.25],
+]
+
+
+@pytest.mark.django_db()
+def test_save_candles(settings):
+    market: Market = MarketFactory()
+
+    settings.OHLCV_COMPACT_STORAGE = False
+    assert save_candles(CANDLES, timeframe=Timeframes.MINUTE_1, market=market) == 3
+    assert OHLCV.objects.count() == 3
+    assert CompactOHLCV.objects.count() == 0
+
+    settings.OHLCV_COMPACT_STORAGE = True
+    save_candles(CANDLES, timeframe=Timeframes.MINUTE_1, market=market)
+    assert OHLCV.objects.count() == 3
+    assert CompactOHLCV.objects.count() == 3
+
+    compact: CompactOHLCV = CompactOHLCV.objects.get(timestamp=CANDLES[0][0])
+    assert compact.open_price == 423540000000
+    assert compact.volume == CANDLES[0][5]
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("compact", [True, False])
+def test_load_candles(settings, compact: bool):
+    settings.OHLCV_COMPACT_STORAGE = True
+    market: Market = MarketFactory()
+    save_candles(CANDLES, timeframe=Timeframes.MINUTE_1, market=market)
+
+    candles: Candles = load_candles(
+        market=market, timeframe=Timeframes.MINUTE_1, compact=compact
+    )
+
+    assert candles.size == 3
+    assert candles.timestamp.tolist() == [candle[0] for candle in CANDLES]
+    assert candles.open.tolist() == pytest.approx([candle[1] for candle in CANDLES])
+    assert candles.high.tolist() == pytest.approx([candle[2] for candle in CANDLES])
+    assert candles.low.tolist() == pytest.approx([candle[3] for candle in CANDLES])
+    assert candles.close.tolist() == pytest.approx([candle[4] for candle in CANDLES])
+    assert candles.volume.tolist() == pytest.approx([candle[5] for candle in CANDLES])
+
+    # load a range
+    candles = load_candles(
+        market=market,
+        timeframe=Timeframes.MINUTE_1,
+        since=CANDLES[1][0],
+        until=CANDLES[2][0],
+        compact=compact,
+    )
+    assert candles.timestamp.tolist() == [CANDLES[1][0]]
+
+    # other timeframe has no candles
+    candles = load_candles(market=market, timeframe=Timeframes.HOUR_1, compact=compact)
+    assert candles.size == 0
@@ -0,0 +1,151 @@
+import json
+from decimal import Decimal
+from typing import List
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    Bot,
+    Market,
+    Order,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    BotFactory,
+    MarketFactory,
+)
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+from django_crypto_trading_bot.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def bot() -> Bot:
+    return BotFactory()
+
+
+@pytest.fixture
+def client(bot: Bot) -> APIClient:
+    client: APIClient = APIClient()
+    client.force_authenticate(user=bot.account.user)
+    return client
+
+
+@pytest.fixture
+def market(settings) -> Market:
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    save_candles(create_candles(25), timeframe=Timeframes.MINUTE_1, market=market)
+    return market
+
+
+def test_ohlcv_cursor_pages(client, market):
+    url: str = reverse("api:ohlcv-list")
+    response = client.get(
+        url,
+        {
+            "market": market.pk,
+            "timeframe": Timeframes.MINUTE_1,
+            "since": START + 5 * MINUTE,
+            "page_size": 10,
+            "fields": "timestamp,closing_price",
+        },
+    )
+    assert response.status_code == 200
+    assert set(response.data["results"][0]) == {"timestamp", "closing_price"}
+
+    timestamps: List[str] = []
+    while True:
+        timestamps += [candle["timestamp"] for candle in response.data["results"]]
+        if not response.data["next"]:
+            break
+        response = client.get(response.data["next"])
+
+    assert len(timestamps) == 20
+    assert timestamps == sorted(timestamps, reverse=True)
+
+    response = client.get(url, {"timeframe": Timeframes.MINUTE_1})
+    assert response.status_code == 400
+
+
+def test_ohlcv_not_modified(client, market):
+    url: str = reverse("api:ohlcv-list")
+    params: dict = {"market": market.pk, "timeframe": Timeframes.MINUTE_1}
+    response = client.get(url, params)
+    assert response["Last-Modified"]
+
+    response = client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
+
+    # an update of the unfinished latest candle changes the ETag
+    candle: List[float] = create_candles(25)[-1]
+    candle[4] += 1
+    save_candles([candle], timeframe=Timeframes.MINUTE_1, market=market)
+    assert (
+        client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 200
+    )
+
+
+def test_ohlcv_stream(client, market):
+    url: str = reverse("api:ohlcv-stream")
+    params: dict = {"market": market.pk, "timeframe": Timeframes.MINUTE_1}
+
+    response = client.get(url, params)
+    assert response.streaming
+    candles: list = json.loads(b"".join(response.streaming_content))
+    assert len(candles) == 25
+    assert candles[0][0] == START
+    assert candles[0][4] == pytest.approx(create_candles(25)[0][4])
+
+    response = client.get(url, dict(params, output="csv"))
+    lines: List[str] = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0] == "timestamp,open,high,low,close,volume"
+    assert len(lines) == 26
+
+    # the ETag depends on the output
+    etag: str = response["ETag"]
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    response = client.get(url, dict(params, output="csv"), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_orders_and_bots_of_the_user(client, bot):
+    Order.objects.create(
+        bot=bot,
+        order_id="1",
+        timestamp=timezone.now(),
+        order_type=Order.OrderType.LIMIT,
+        side=Order.Side.SIDE_BUY,
+        price=Decimal(1),
+        amount=Decimal(10),
+    )
+    other: Bot = BotFactory(account__user=UserFactory(), account__api_key="other")
+    Order.objects.create(
+        bot=other,
+        order_id="2",
+        timestamp=timezone.now(),
+        order_type=Order.OrderType.LIMIT,
+        side=Order.Side.SIDE_BUY,
+        price=Decimal(1),
+        amount=Decimal(10),
+    )
+
+    response = client.get(reverse("api:order-list"))
+    assert [order["order_id"] for order in response.data["results"]] == ["1"]
+
+    response = client.get(reverse("api:bot-detail", kwargs={"pk": bot.pk}))
+    assert response.data["orders_count"] == 1
+    assert response.data["start_amount"] == "10.00000000"
+    assert (
+        client.get(reverse("api:bot-detail", kwargs={"pk": other.pk})).status_code
+        == 404
+    )
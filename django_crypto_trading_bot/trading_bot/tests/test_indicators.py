@@ -0,0 +1,187 @@
+import json
+from typing import List
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.indicators import (
+    Bands,
+    Indicator,
+    IndicatorValue,
+    create_indicator,
+    get_indicator,
+    get_indicators,
+    update_indicators,
+)
+from django_crypto_trading_bot.trading_bot.models import (
+    IndicatorState,
+    Market,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+
+MINUTE: int = 60 * 1000
+# 2020-01-01 23:00 UTC, the VWAP session starts again after 60 candles
+START: int = 1577919600000
+
+
+def create_candles(size: int, start: int = START, seed: int = 0) -> List[List[float]]:
+    generator: np.random.Generator = np.random.default_rng(seed)
+    close: np.ndarray = 100 + np.cumsum(generator.normal(size=size))
+    spread: np.ndarray = generator.uniform(0.1, 1, size)
+    return [
+        [
+            float(start + index * MINUTE),
+            float(close[index - 1] if index else close[0]),
+            float(close[index] + spread[index]),
+            float(close[index] - spread[index]),
+            float(close[index]),
+            float(generator.uniform(1, 10)),
+        ]
+        for index in range(size)
+    ]
+
+
+def add_all(indicator: Indicator, candles: List[List[float]]) -> Indicator:
+    for candle in candles:
+        indicator.add(candle)
+    return indicator
+
+
+def wilder(values: np.ndarray, period: int) -> float:
+    average: float = values[:period].mean()
+    for value in values[period:]:
+        average = (average * (period - 1) + value) / period
+    return average
+
+
+def test_indicators():
+    candles: List[List[float]] = create_candles(100)
+    timestamp, _, high, low, close, volume = np.array(candles).T
+
+    assert add_all(create_indicator("sma_20"), candles).value == pytest.approx(
+        close[-20:].mean()
+    )
+
+    ema: float = close[:20].mean()
+    for price in close[20:]:
+        ema = price * 2 / 21 + ema * 19 / 21
+    assert add_all(create_indicator("ema_20"), candles).value == pytest.approx(ema)
+
+    change: np.ndarray = np.diff(close)
+    gain: float = wilder(np.maximum(change, 0), 14)
+    loss: float = wilder(np.maximum(-change, 0), 14)
+    assert add_all(create_indicator("rsi_14"), candles).value == pytest.approx(
+        100 - 100 / (1 + gain / loss)
+    )
+
+    true_range: np.ndarray = np.concatenate(
+        (
+            [high[0] - low[0]],
+            np.maximum.reduce(
+                [
+                    high[1:] - low[1:],
+                    abs(high[1:] - close[:-1]),
+                    abs(low[1:] - close[:-1]),
+                ]
+            ),
+        )
+    )
+    assert add_all(create_indicator("atr_14"), candles).value == pytest.approx(
+        wilder(true_range, 14)
+    )
+
+    bands: Bands = add_all(create_indicator("bollinger_20"), candles).value
+    assert bands.middle == pytest.approx(close[-20:].mean())
+    assert bands.upper == pytest.approx(close[-20:].mean() + 2 * close[-20:].std())
+    assert bands.lower == pytest.approx(close[-20:].mean() - 2 * close[-20:].std())
+
+    # only the candles of the last UTC day
+    typical: np.ndarray = ((high + low + close) / 3)[60:]
+    assert add_all(create_indicator("vwap"), candles).value == pytest.approx(
+        (typical * volume[60:]).sum() / volume[60:].sum()
+    )
+
+    assert create_indicator("sma_20").value is None
+    assert add_all(create_indicator("rsi_14"), candles[:14]).value is None
+    with pytest.raises(ValueError):
+        create_indicator("macd_12")
+
+
+@pytest.mark.parametrize(
+    "name", ["sma_20", "ema_20", "rsi_14", "atr_14", "bollinger_20", "vwap"]
+)
+def test_indicator_state(name: str):
+    candles: List[List[float]] = create_candles(100)
+
+    saved: Indicator = add_all(create_indicator(name), candles[:70])
+    loaded: Indicator = create_indicator(
+        name, json.loads(json.dumps(saved.get_state()))
+    )
+
+    assert add_all(loaded, candles[70:]).value == pytest.approx(
+        add_all(create_indicator(name), candles).value
+    )
+
+
+@pytest.mark.django_db()
+def test_update_indicators(settings, django_assert_num_queries):
+    settings.OHLCV_INDICATORS = ["sma_20", "vwap"]
+    cache.clear()
+    market: Market = MarketFactory()
+    candles: List[List[float]] = create_candles(100)
+
+    # the last candle is still open
+    assert (
+        update_indicators(
+            market=market,
+            timeframe=Timeframes.MINUTE_1,
+            candles=candles,
+            now=int(candles[-1][0]) + MINUTE - 1,
+        )
+        == 2
+    )
+    state: IndicatorState = IndicatorState.objects.get(name="sma_20")
+    assert state.timestamp == candles[-2][0]
+
+    sma: float = add_all(create_indicator("sma_20"), candles[:-1]).value
+    with django_assert_num_queries(0):
+        values = get_indicators(market=market, timeframe=Timeframes.MINUTE_1)
+    assert values["sma_20"] == IndicatorValue(
+        timestamp=candles[-2][0], value=pytest.approx(sma)
+    )
+
+    # loaded from the saved state without the cache
+    cache.clear()
+    assert get_indicator(
+        market=market.pk, timeframe=Timeframes.MINUTE_1, name="sma_20"
+    ).value == pytest.approx(sma)
+    assert get_indicators(market=market, timeframe=Timeframes.HOUR_1) == {}
+
+    # candles which were added already are skipped
+    assert (
+        update_indicators(
+            market=market, timeframe=Timeframes.MINUTE_1, candles=candles[:-1]
+        )
+        == 0
+    )
+
+
+@pytest.mark.django_db()
+def test_save_candles_indicators(settings):
+    market: Market = MarketFactory()
+    candles: List[List[float]] = create_candles(100)
+
+    settings.OHLCV_INDICATORS = []
+    save_candles(candles[:50], timeframe=Timeframes.MINUTE_1, market=market)
+    assert not IndicatorState.objects.exists()
+
+    # a new indicator loads the stored candles once
+    settings.OHLCV_INDICATORS = ["ema_20"]
+    save_candles(candles[50:], timeframe=Timeframes.MINUTE_1, market=market)
+
+    assert get_indicator(
+        market=market, timeframe=Timeframes.MINUTE_1, name="ema_20"
+    ).value == pytest.approx(add_all(create_indicator("ema_20"), candles).value)
@@ -1,5 +1,4 @@
 import unittest
-from collections import OrderedDict
 from datetime import datetime, timedelta
 from decimal import Decimal, getcontext
 from typing import List, Optional
@@ -9,6 +8,7 @@ import pytz
 from ccxt.base.exchange import Exchange
 
 from django_crypto_trading_bot.trading_bot.api.client import get_client
+from django_crypto_trading_bot.trading_bot.api.ticker import Ticker, TickerSnapshot
 from django_crypto_trading_bot.trading_bot.exceptions import PriceToHigh, PriceToLow
 from django_crypto_trading_bot.trading_bot.models import (
     OHLCV,
@@ -228,16 +228,18 @@ class TestBot(unittest.TestCase):
 
     def test_fetch_tickers(self):
         bot: Bot = BotFactory()
-        tickers: dict = bot.fetch_tickers()
+        tickers: TickerSnapshot = bot.fetch_tickers()
 
-        assert isinstance(tickers, OrderedDict)
+        assert isinstance(tickers, TickerSnapshot)
 
-        last_percentage: float = tickers[list(tickers)[0]]["percentage"]
+        last_percentage: float = tickers.tickers[0].percentage
 
-        ticker: dict
-        for key, ticker in tickers.items():
-            assert last_percentage >= ticker["percentage"]
-            last_percentage = ticker["percentage"]
+        ticker: Ticker
+        for ticker in tickers:
+            if ticker.percentage is None:
+                continue
+            assert last_percentage >= ticker.percentage
+            last_percentage = ticker.percentage
 
 
 @pytest.mark.django_db()
@@ -385,6 +387,53 @@ class TestOHLCV(unittest.TestCase):
             year=2017, month=9, day=4, hour=16, minute=13, tzinfo=pytz.UTC
         )
 
+    def test_upsert(self):
+        market: Market = MarketFactory()
+        timeframe: Timeframes = Timeframes.MINUTE_1
+
+        candles: List[List[float]] = [
+            [1504541580000, 1, 2, 0.5, 1.5, 10],
+            [1504541640000, 1.5, 2, 1, 1, 10],
+        ]
+
+        assert (
+            OHLCV.upsert(
+                [
+                    OHLCV.get_OHLCV(candle=candle, timeframe=timeframe, market=market)
+                    for candle in candles
+                ]
+            )
+            == 2
+        )
+
+        # skip existing candles
+        candles[1][4] = 3
+        assert (
+            OHLCV.upsert(
+                [
+                    OHLCV.get_OHLCV(candle=candle, timeframe=timeframe, market=market)
+                    for candle in candles
+                ],
+                update=False,
+            )
+            == 0
+        )
+        last_candle: Optional[OHLCV] = OHLCV.last_candle(
+            timeframe=timeframe, market=market
+        )
+        assert last_candle is not None
+        assert last_candle.closing_price == Decimal(1)
+
+        # update existing candles
+        OHLCV.upsert(
+            [OHLCV.get_OHLCV(candle=candles[1], timeframe=timeframe, market=market)]
+        )
+        last_candle = OHLCV.last_candle(timeframe=timeframe, market=market)
+        assert last_candle is not None
+        assert last_candle.closing_price == Decimal(3)
+
+        assert OHLCV.objects.filter(market=market, timeframe=timeframe).count() == 2
+
     def test_update_new_candles(self):
         market: Market = MarketFactory()
 
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from django_crypto_trading_bot.trading_bot.candles import save_candles
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Market,
+    OHLCVCoverage,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.ohlcv_coverage import (
+    estimate_candles,
+    refresh_coverage,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+
+
+@pytest.mark.django_db()
+def test_refresh_coverage(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    save_candles(create_candles(30), timeframe=Timeframes.MINUTE_1, market=market)
+    save_candles(create_candles(2), timeframe=Timeframes.HOUR_1, market=market)
+
+    OHLCVCoverage.objects.all().delete()
+    assert estimate_candles(market_id=market.pk) is None
+    assert refresh_coverage() == 2
+
+    coverage: OHLCVCoverage = OHLCVCoverage.objects.get(timeframe=Timeframes.MINUTE_1)
+    assert coverage.candles == 30
+    assert coverage.first_timestamp == datetime.fromtimestamp(START / 1000, tz=pytz.UTC)
+    assert coverage.last_timestamp == datetime.fromtimestamp(
+        (START + 29 * MINUTE) / 1000, tz=pytz.UTC
+    )
+    assert estimate_candles(market_id=market.pk) == 32
+    assert estimate_candles(timeframe=Timeframes.HOUR_1) == 2
+
+    # rows without candles are removed, other timeframes are kept
+    OHLCV.objects.filter(timeframe=Timeframes.MINUTE_1).delete()
+    assert refresh_coverage(timeframe=Timeframes.MINUTE_1) == 0
+    assert list(OHLCVCoverage.objects.values_list("timeframe", flat=True)) == [
+        Timeframes.HOUR_1
+    ]
+
+
+@pytest.mark.django_db()
+def test_save_candles_updates_coverage(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    candles = create_candles(30)
+
+    save_candles(candles[10:20], timeframe=Timeframes.MINUTE_1, market=market)
+    assert estimate_candles(market_id=market.pk) == 10
+
+    # updated candles aren't counted again
+    save_candles(candles[:15], timeframe=Timeframes.MINUTE_1, market=market)
+    save_candles(candles[25:], timeframe=Timeframes.MINUTE_1, market=market)
+    coverage: OHLCVCoverage = OHLCVCoverage.objects.get()
+    assert coverage.candles == 25
+    assert coverage.first_timestamp == datetime.fromtimestamp(START / 1000, tz=pytz.UTC)
+    assert coverage.last_timestamp == datetime.fromtimestamp(
+        (START + 29 * MINUTE) / 1000, tz=pytz.UTC
+    )
@@ -0,0 +1,129 @@
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+from django.core.management import call_command
+
+from django_crypto_trading_bot.trading_bot.candles import (
+    Candles,
+    load_candles,
+    save_candles,
+)
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    CompactOHLCV,
+    Market,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.ohlcv_io import (
+    ARROW,
+    PARQUET,
+    SCHEMA,
+    export_ohlcv,
+    get_format,
+    import_ohlcv,
+    read_file_batches,
+    unique_candles,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    BnbEurMarketFactory,
+    MarketFactory,
+)
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+
+
+def test_unique_candles():
+    timestamp: np.ndarray = np.array([3, 1, 2, 1], dtype=np.int64)
+    prices: np.ndarray = np.array([[3.0], [1.0], [2.0], [1.5]])
+
+    timestamp, prices = unique_candles(timestamp, prices)
+
+    # ordered by time & the last row of a timestamp wins
+    assert timestamp.tolist() == [1, 2, 3]
+    assert prices[:, 0].tolist() == [1.5, 2.0, 3.0]
+
+
+def test_get_format():
+    assert get_format(Path("candles.parquet")) == PARQUET
+    assert get_format(Path("candles.ARROW")) == ARROW
+    assert get_format(Path("candles.bin"), file_format=ARROW) == ARROW
+    with pytest.raises(ValueError):
+        get_format(Path("candles.csv"))
+
+
+@pytest.mark.django_db()
+@pytest.mark.parametrize("extension", [".parquet", ".arrow"])
+def test_export_import_ohlcv(settings, tmp_path, extension):
+    settings.OHLCV_INDICATORS = []
+    settings.OHLCV_COMPACT_STORAGE = True
+    market: Market = MarketFactory()
+    other_market: Market = BnbEurMarketFactory()
+    candles: List[List[float]] = create_candles(150)
+    save_candles(candles, timeframe=Timeframes.MINUTE_1, market=market)
+    save_candles(candles[:10], timeframe=Timeframes.HOUR_1, market=market)
+    save_candles(candles[:20], timeframe=Timeframes.MINUTE_1, market=other_market)
+
+    path: Path = tmp_path / "candles{}".format(extension)
+    assert (
+        export_ohlcv(
+            path,
+            markets=[market, other_market],
+            timeframe=Timeframes.MINUTE_1,
+            since=START + 10 * MINUTE,
+            chunk_size=50,
+        )
+        == 140 + 10
+    )
+    # the file is read in batches of the chunk size
+    sizes: List[int] = [
+        batch.num_rows for batch in read_file_batches(path, chunk_size=50)
+    ]
+    assert sum(sizes) == 150
+    assert max(sizes) == 50
+
+    OHLCV.objects.all().delete()
+    CompactOHLCV.objects.all().delete()
+
+    # only the candles of the first market & the first hour
+    assert (
+        import_ohlcv(path, markets=[market], until=START + 60 * MINUTE, chunk_size=30)
+        == 50
+    )
+    assert not OHLCV.objects.filter(market=other_market).exists()
+
+    assert import_ohlcv(path) == 150
+    for compact in (False, True):
+        stored: Candles = load_candles(
+            market=market, timeframe=Timeframes.MINUTE_1, compact=compact
+        )
+        assert stored.timestamp.tolist() == [candle[0] for candle in candles[10:]]
+        assert stored.close.tolist() == pytest.approx(
+            [candle[4] for candle in candles[10:]]
+        )
+        assert stored.volume.tolist() == pytest.approx(
+            [candle[5] for candle in candles[10:]]
+        )
+
+
+@pytest.mark.django_db()
+def test_export_ohlcv_command(settings, tmp_path):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    save_candles(create_candles(30), timeframe=Timeframes.MINUTE_1, market=market)
+    path: Path = tmp_path / "candles.parquet"
+
+    call_command("export_ohlcv", str(path), "--symbol", "trx/bnb")
+
+    table = pq.read_table(str(path))
+    assert table.schema.equals(SCHEMA)
+    assert table.num_rows == 30
+    assert set(table.column("symbol").to_pylist()) == {"TRX/BNB"}
+
+    call_command("import_ohlcv", str(path), "--timeframe", "1m")
+    assert OHLCV.objects.count() == 30
@@ -0,0 +1,143 @@
+from decimal import Decimal
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from django_crypto_trading_bot.trading_bot import optimize
+from django_crypto_trading_bot.trading_bot.backtest import (
+    BacktestResult,
+    backtest_rising_chart,
+)
+from django_crypto_trading_bot.trading_bot.candles import Candles
+from django_crypto_trading_bot.trading_bot.models import Bot, Market
+from django_crypto_trading_bot.trading_bot.optimize import (
+    Parameters,
+    SweepResult,
+    apply_parameters,
+    grid_parameters,
+    pareto_front,
+    random_parameters,
+    sweep_rising_chart,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import (
+    EthBnbMarketFactory,
+    MarketFactory,
+    RisingChartBotFactory,
+)
+from django_crypto_trading_bot.trading_bot.tests.test_backtest import (
+    HOUR,
+    create_candles,
+)
+
+
+def test_pareto_front():
+    roi: np.ndarray = np.array([10.0, 5.0, 20.0, 15.0, 20.0])
+    drawdown: np.ndarray = np.array([5.0, 1.0, 10.0, 10.0, 20.0])
+
+    assert pareto_front(roi=roi, drawdown=drawdown).tolist() == [1, 0, 2]
+
+
+def test_random_parameters():
+    parameters: Parameters = random_parameters(
+        ranges={"min_rise": (1, 5), "stop_loss": (-5, 0), "lock_time": (0, 24)},
+        samples=100,
+        seed=1,
+    )
+
+    assert parameters.size == 100
+    assert parameters.min_rise.min() >= 1 and parameters.min_rise.max() <= 5
+    assert np.all(parameters.lock_time == np.round(parameters.lock_time))
+    assert np.all(np.isinf(parameters.max_amount))
+
+    # a missing lock time keeps the value of the bot instead of becoming unlimited
+    parameters = random_parameters(
+        ranges={"min_rise": (1, 5), "stop_loss": (-5, 0)},
+        samples=10,
+        defaults={"lock_time": 12},
+    )
+    assert np.all(parameters.lock_time == 12)
+
+    with pytest.raises(ValueError):
+        random_parameters(ranges={"min_rise": (1, 5), "stop_loss": (-5, 0)}, samples=10)
+
+
+@pytest.mark.django_db()
+def test_sweep_rising_chart(monkeypatch):
+    markets: List[Market] = [MarketFactory(), EthBnbMarketFactory()]
+
+    hours: int = 72
+    eth: List[float] = [1.0] * 30 + [1.1, 1.2] + [1.15] * 10 + [1.3] * (hours - 42)
+    candles: Dict[int, Candles] = {
+        markets[0].pk: create_candles([(1.0, 1.0)] * hours, step=HOUR),
+        markets[1].pk: create_candles([(price, price) for price in eth], step=HOUR),
+    }
+
+    parameters: Parameters = grid_parameters(
+        min_rise=[5, 50], stop_loss=[-2, -10], lock_time=[12]
+    )
+    result: SweepResult = sweep_rising_chart(
+        markets=markets,
+        candles=candles,
+        parameters=parameters,
+        quote_amount=Decimal(10),
+        fee_rate=Decimal("0.1"),
+    )
+
+    assert result.roi.size == 4
+
+    # the prices are aligned in time windows
+    monkeypatch.setattr(
+        "django_crypto_trading_bot.trading_bot.backtest.ALIGN_WINDOW", 5
+    )
+    monkeypatch.setattr(optimize, "ALIGN_WINDOW", 5)
+    windowed: SweepResult = sweep_rising_chart(
+        markets=markets,
+        candles=candles,
+        parameters=parameters,
+        quote_amount=Decimal(10),
+        fee_rate=Decimal("0.1"),
+    )
+    np.testing.assert_array_equal(windowed.roi, result.roi)
+    np.testing.assert_array_equal(windowed.drawdown, result.drawdown)
+
+    # about the same result like the backtest, without the rounding of amounts
+    backtest: BacktestResult = backtest_rising_chart(
+        markets=markets,
+        candles=candles,
+        quote_amount=Decimal(10),
+        min_rise=Decimal(5),
+        stop_loss=Decimal(-2),
+        lock_time=12,
+        fee_rate=Decimal("0.1"),
+    )
+    assert result.roi[0] == pytest.approx(backtest.roi, abs=0.5)
+    assert result.drawdown[0] == pytest.approx(backtest.drawdown, abs=0.5)
+
+    # without a rise of 50% the bot never trades
+    assert result.roi[2] == 0
+    assert result.roi[3] == 0
+
+    # holding through the dip is the best
+    front: np.ndarray = result.front()
+    best: int = int(front[result.roi[front].argmax()])
+    assert parameters.stop_loss[best] == -10
+
+
+@pytest.mark.django_db()
+def test_apply_parameters():
+    bot: Bot = RisingChartBotFactory()
+    parameters: Parameters = grid_parameters(
+        min_rise=[2.5], stop_loss=[-3.25], lock_time=[6], max_amount=[np.inf, 0.5]
+    )
+
+    apply_parameters(bot=bot, parameters=parameters, index=0)
+    bot.refresh_from_db()
+    assert bot.min_rise == Decimal("2.5")
+    assert bot.stop_loss == Decimal("-3.25")
+    assert bot.lock_time == 6
+    assert bot.max_amount is None
+
+    apply_parameters(bot=bot, parameters=parameters, index=1)
+    bot.refresh_from_db()
+    assert bot.max_amount == Decimal("0.5")
@@ -0,0 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from django_crypto_trading_bot.trading_bot.api.order import save_order_updates
+from django_crypto_trading_bot.trading_bot.models import (
+    Bot,
+    BotPerformance,
+    Order,
+    Saving,
+)
+from django_crypto_trading_bot.trading_bot.performance import (
+    rebuild_performance,
+    record_savings,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import BotFactory
+
+LEDGER_FIELDS = [
+    "orders_count",
+    "closed_orders_count",
+    "first_order_at",
+    "start_amount",
+    "last_order_at",
+    "estimate_current_amount",
+    "last_closed_at",
+    "current_amount",
+    "realized_pnl",
+    "savings_count",
+    "quote_savings",
+]
+
+
+def create_order(bot: Bot, order_id: str, side: str, minutes: int) -> Order:
+    return Order.objects.create(
+        bot=bot,
+        order_id=order_id,
+        timestamp=timezone.now() + timedelta(minutes=minutes),
+        order_type=Order.OrderType.LIMIT,
+        side=side,
+        price=Decimal(2) if side == Order.Side.SIDE_BUY else Decimal(3),
+        amount=Decimal(10),
+    )
+
+
+def get_ledger(bot: Bot) -> dict:
+    performance: BotPerformance = BotPerformance.objects.get(bot=bot)
+    return {name: getattr(performance, name) for name in LEDGER_FIELDS}
+
+
+@pytest.mark.django_db()
+def test_record_order(django_assert_num_queries):
+    bot: Bot = BotFactory()
+    buy: Order = create_order(bot, "1", Order.Side.SIDE_BUY, 0)
+    sell: Order = create_order(bot, "2", Order.Side.SIDE_SELL, 1)
+    assert bot.orders_count == 2
+    assert bot.start_amount == Decimal(10)
+    assert bot.current_amount is None
+
+    # the order & the ledger are updated, no order is loaded
+    buy.status = Order.Status.CLOSED
+    buy.filled = buy.amount
+    with django_assert_num_queries(2):
+        buy.save()
+
+    sell.status = Order.Status.CLOSED
+    sell.filled = Decimal(5)
+    sell.save()
+
+    incremental: dict = get_ledger(bot)
+    assert incremental["closed_orders_count"] == 2
+    assert incremental["current_amount"] == Decimal(10)
+    assert incremental["realized_pnl"] == Decimal(5 * 3 - 10 * 2)
+
+    rebuild_performance([bot.pk])
+    assert get_ledger(bot) == incremental
+
+    # an order which is opened again rebuilds the ledger
+    sell.status = Order.Status.OPEN
+    sell.save()
+    assert get_ledger(bot)["realized_pnl"] == Decimal(-20)
+    assert bot.roi == Decimal(0)
+
+    sell.delete()
+    assert bot.orders_count == 1
+    assert bot.estimate_current_amount == Decimal(10)
+
+
+@pytest.mark.django_db()
+def test_bulk_updates():
+    bot: Bot = BotFactory()
+    buy: Order = Order.objects.get(pk=create_order(bot, "1", "buy", 0).pk)
+
+    buy.status = Order.Status.CLOSED
+    buy.filled = buy.amount
+    save_order_updates(orders=[buy], trades=[])
+    assert get_ledger(bot)["closed_orders_count"] == 1
+
+    savings = [
+        Saving(order=buy, bot=bot, amount=Decimal(1), currency=bot.market.quote),
+        Saving(order=buy, bot=bot, amount=Decimal(2), currency=bot.market.base),
+    ]
+    Saving.objects.bulk_create(savings)
+    record_savings(savings)
+    assert get_ledger(bot)["savings_count"] == 2
+    assert get_ledger(bot)["quote_savings"] == Decimal(1)
+
+    incremental: dict = get_ledger(bot)
+    BotPerformance.objects.filter(bot=bot).delete()
+    assert rebuild_performance([bot.pk]) == 1
+    assert get_ledger(bot) == incremental
@@ -0,0 +1,110 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from django_crypto_trading_bot.trading_bot.candles import (
+    Candles,
+    load_candles,
+    save_candles,
+)
+from django_crypto_trading_bot.trading_bot.models import Market, Timeframes
+from django_crypto_trading_bot.trading_bot.resample import (
+    get_period_start,
+    get_source_timeframe,
+    materialize_timeframe,
+    resample_candles,
+    resample_market,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+
+
+def to_candles(candles: List[List[float]]) -> Candles:
+    columns: np.ndarray = np.array(candles).T
+    return Candles(columns[0].astype(np.int64), *columns[1:])
+
+
+def test_get_period_start():
+    # 2020-01-08 12:34 UTC, a wednesday
+    timestamp: np.ndarray = np.array([1578486840000])
+
+    assert get_period_start(timestamp, Timeframes.HOUR_4).tolist() == [1578484800000]
+    assert get_period_start(timestamp, Timeframes.DAY_1).tolist() == [1578441600000]
+    # monday 2020-01-06
+    assert get_period_start(timestamp, Timeframes.WEEK_1).tolist() == [1578268800000]
+    # 2020-01-01
+    assert get_period_start(timestamp, Timeframes.MONTH_1).tolist() == [1577836800000]
+
+
+def test_get_source_timeframe():
+    assert get_source_timeframe(Timeframes.HOUR_1, ["1m", "5m", "15m", "4h"]) == "15m"
+    assert get_source_timeframe(Timeframes.MINUTE_3, ["1m", "5m"]) == "1m"
+    assert get_source_timeframe(Timeframes.MONTH_1, ["1m", "1h", "1d", "1w"]) == "1d"
+    assert get_source_timeframe(Timeframes.WEEK_1, ["1m", "4h"]) == "4h"
+
+
+def test_resample_candles():
+    candles: List[List[float]] = create_candles(150)
+    hours: Candles = resample_candles(to_candles(candles), Timeframes.HOUR_1)
+
+    # 23:00, 00:00 & the unfinished 01:00 candle
+    assert hours.timestamp.tolist() == [
+        START,
+        START + 60 * MINUTE,
+        START + 120 * MINUTE,
+    ]
+    assert hours.open[1] == candles[60][1]
+    assert hours.high[1] == max(candle[2] for candle in candles[60:120])
+    assert hours.low[1] == min(candle[3] for candle in candles[60:120])
+    assert hours.close[1] == candles[119][4]
+    assert hours.volume[1] == pytest.approx(
+        sum(candle[5] for candle in candles[60:120])
+    )
+
+    empty: Candles = Candles(*(column[:0] for column in to_candles(candles)))
+    assert resample_candles(empty, Timeframes.HOUR_1).size == 0
+
+
+@pytest.mark.django_db()
+def test_resample_market(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    candles: List[List[float]] = create_candles(150)
+    timeframes: List[str] = ["5m", "15m", "1h"]
+
+    # the 1m candles arrive in two parts, the last candle is fetched again
+    for part in (candles[:70], candles[69:]):
+        save_candles(part, timeframe=Timeframes.MINUTE_1, market=market)
+        resample_market(
+            market=market,
+            since=int(part[0][0]),
+            until=int(part[-1][0]) + MINUTE,
+            timeframes=timeframes,
+        )
+
+    for timeframe in timeframes:
+        stored: Candles = load_candles(market=market, timeframe=timeframe)
+        expected: Candles = resample_candles(to_candles(candles), timeframe)
+        for column, values in zip(stored, expected):
+            assert column.tolist() == pytest.approx(values.tolist())
+
+
+@pytest.mark.django_db()
+def test_materialize_timeframe(settings):
+    settings.OHLCV_INDICATORS = []
+    market: Market = MarketFactory()
+    candles: List[List[float]] = create_candles(150)
+    save_candles(candles, timeframe=Timeframes.MINUTE_1, market=market)
+
+    assert materialize_timeframe(market=market, timeframe=Timeframes.DAY_1) == 2
+    days: Candles = load_candles(market=market, timeframe=Timeframes.DAY_1)
+    assert days.open.tolist() == pytest.approx([candles[0][1], candles[60][1]])
+    assert days.close.tolist() == pytest.approx([candles[59][4], candles[-1][4]])
+
+    # only the last candle is built again
+    assert materialize_timeframe(market=market, timeframe=Timeframes.DAY_1) == 1
@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from typing import List
+
+import pytest
+import pytz
+
+from django_crypto_trading_bot.trading_bot.candles import (
+    Candles,
+    load_candles,
+    save_candles,
+)
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    CompactOHLCV,
+    Market,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.partitions import (
+    add_months,
+    ensure_partitions,
+    month_table,
+)
+from django_crypto_trading_bot.trading_bot.retention import (
+    RetentionPolicy,
+    RetentionResult,
+    apply_retention,
+    get_cutoff,
+    get_retention_policies,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+
+
+def test_partition_names():
+    # 1m & 1M get different tables
+    assert month_table(Timeframes.MINUTE_1, date(2020, 1, 1)) == (
+        "trading_bot_ohlcv_minute_1_2020_01"
+    )
+    assert month_table(Timeframes.MONTH_1, date(2020, 12, 1)) == (
+        "trading_bot_ohlcv_month_1_2020_12"
+    )
+    assert add_months(date(2020, 12, 1), 1) == date(2021, 1, 1)
+    assert add_months(date(2020, 1, 1), -1) == date(2019, 12, 1)
+
+
+@pytest.mark.django_db()
+def test_ensure_partitions_without_postgresql():
+    assert (
+        ensure_partitions(
+            timeframe=Timeframes.MINUTE_1, timestamps=[datetime.now(tz=pytz.UTC)]
+        )
+        == 0
+    )
+
+
+def test_get_retention_policies(settings):
+    settings.OHLCV_RETENTION = {
+        "1m": {"days": 30, "rollup": "1h"},
+        "5m": {"days": 0},
+        "1h": {"days": 365},
+    }
+    assert get_retention_policies() == [
+        RetentionPolicy(timeframe="1m", days=30, rollup="1h"),
+        RetentionPolicy(timeframe="1h", days=365, rollup=None),
+    ]
+
+
+def test_get_cutoff():
+    now: datetime = datetime(2020, 1, 31, 12, 34, tzinfo=pytz.UTC)
+
+    assert get_cutoff(RetentionPolicy("1m", 30, "1h"), now) == datetime(
+        2020, 1, 1, 12, tzinfo=pytz.UTC
+    )
+    assert get_cutoff(RetentionPolicy("1m", 30, None), now) == datetime(
+        2020, 1, 1, 12, 34, tzinfo=pytz.UTC
+    )
+
+
+@pytest.mark.django_db()
+def test_apply_retention(settings):
+    settings.OHLCV_INDICATORS = []
+    settings.OHLCV_COMPACT_STORAGE = True
+    market: Market = MarketFactory()
+    candles: List[List[float]] = create_candles(150)
+    save_candles(candles, timeframe=Timeframes.MINUTE_1, market=market)
+
+    # the cutoff is moved back to 00:00, the start of the second hour
+    result: RetentionResult = apply_retention(
+        RetentionPolicy(timeframe="1m", days=1, rollup="1h"),
+        now=datetime.fromtimestamp(
+            (START + 90 * MINUTE) / 1000 + 24 * 60 * 60, tz=pytz.UTC
+        ),
+    )
+
+    assert result.cutoff == datetime(2020, 1, 2, tzinfo=pytz.UTC)
+    assert result.rolled_up == 1
+    assert result.deleted == 60
+    assert result.dropped == []
+
+    minutes: Candles = load_candles(market=market, timeframe=Timeframes.MINUTE_1)
+    assert minutes.timestamp[0] == START + 60 * MINUTE
+    assert CompactOHLCV.objects.filter(timeframe=Timeframes.MINUTE_1).count() == 90
+
+    hour: OHLCV = OHLCV.objects.get(timeframe=Timeframes.HOUR_1)
+    assert float(hour.open_price) == pytest.approx(candles[0][1])
+    assert float(hour.closing_price) == pytest.approx(candles[59][4])
@@ -0,0 +1,168 @@
+from typing import Dict, List, Tuple
+
+import pytest
+from django.core.cache import cache
+
+from django_crypto_trading_bot.trading_bot.api.ticker import (
+    TickerSnapshot,
+    get_ticker_snapshot,
+    ticker_snapshot_key,
+)
+from django_crypto_trading_bot.trading_bot.candles import (
+    Candles,
+    load_candles,
+    save_candles,
+)
+from django_crypto_trading_bot.trading_bot.models import (
+    OHLCV,
+    Market,
+    Timeframes,
+)
+from django_crypto_trading_bot.trading_bot.stream import (
+    MarketDataTable,
+    get_stream_candles,
+    run_stream,
+    split_streams,
+)
+from django_crypto_trading_bot.trading_bot.stream_replay import (
+    ReplayServer,
+    build_replay_messages,
+)
+from django_crypto_trading_bot.trading_bot.tests.factories import MarketFactory
+from django_crypto_trading_bot.trading_bot.tests.test_indicators import (
+    MINUTE,
+    START,
+    create_candles,
+)
+
+
+def get_kline(timestamp: int, close: float, closed: bool) -> dict:
+    return {
+        "stream": "trxbnb@kline_1m",
+        "data": {
+            "e": "kline",
+            "s": "TRXBNB",
+            "k": {
+                "t": timestamp,
+                "s": "TRXBNB",
+                "i": "1m",
+                "o": "1.0",
+                "h": "2.0",
+                "l": "0.5",
+                "c": str(close),
+                "v": "10",
+                "x": closed,
+            },
+        },
+    }
+
+
+@pytest.mark.django_db()
+def test_market_data_table(settings):
+    settings.OHLCV_INDICATORS = []
+    cache.clear()
+    market: Market = MarketFactory()
+    table: MarketDataTable = MarketDataTable(exchange_id="binance", markets=[market])
+
+    table.add_message(get_kline(START, 1.1, closed=False))
+    table.add_message(get_kline(START, 1.2, closed=True))
+    # the close of the second candle is missed
+    table.add_message(get_kline(START + MINUTE, 1.3, closed=False))
+    table.add_message(get_kline(START + 2 * MINUTE, 1.4, closed=False))
+    table.add_message(
+        {
+            "stream": "!ticker@arr",
+            "data": [
+                {
+                    "E": START + 2 * MINUTE + 10,
+                    "s": "TRXBNB",
+                    "P": "5.0",
+                    "c": "1.4",
+                    "b": "1.39",
+                    "a": "1.41",
+                },
+                {"s": "UNKNOWN", "P": "1.0", "c": "1", "b": "1", "a": "1"},
+            ],
+        }
+    )
+
+    assert table.flush() == 2
+    candles: Candles = load_candles(market=market, timeframe=Timeframes.MINUTE_1)
+    assert list(candles.timestamp) == [START, START + MINUTE]
+    assert list(candles.close) == [pytest.approx(1.2), pytest.approx(1.3)]
+    assert table.flush() == 0
+
+    # the bots read the unfinished candle & the tickers from the cache
+    streamed: Dict[Tuple[int, str], OHLCV] = get_stream_candles(
+        [(market, Timeframes.MINUTE_1), (market, Timeframes.HOUR_1)]
+    )
+    assert list(streamed) == [(market.pk, Timeframes.MINUTE_1)]
+    assert float(streamed[(market.pk, Timeframes.MINUTE_1)].closing_price) == 1.4
+
+    tickers: TickerSnapshot = get_ticker_snapshot("binance")
+    assert len(tickers) == 1
+    assert tickers[market.symbol].ask == 1.41
+    assert tickers.timestamp == START + 2 * MINUTE + 10
+
+    # without new messages the published data isn't renewed & expires
+    cache.clear()
+    assert table.flush() == 0
+    assert get_stream_candles([(market, Timeframes.MINUTE_1)]) == {}
+    assert cache.get(ticker_snapshot_key("binance")) is None
+
+    table.add_message(get_kline(START + 2 * MINUTE, 1.5, closed=False))
+    table.flush()
+    streamed = get_stream_candles([(market, Timeframes.MINUTE_1)])
+    assert float(streamed[(market.pk, Timeframes.MINUTE_1)].closing_price) == 1.5
+    assert cache.get(ticker_snapshot_key("binance")) is None
+
+
+def test_split_streams():
+    streams: List[str] = ["stream-{}".format(index) for index in range(5)]
+
+    assert split_streams(streams, size=2) == [streams[:2], streams[2:4], streams[4:]]
+    assert split_streams(streams) == [streams]
+
+
+@pytest.mark.django_db()
+def test_replay_stream(settings, monkeypatch):
+    # the ticker & the kline stream get their own connection
+    monkeypatch.setattr(
+        "django_crypto_trading_bot.trading_bot.stream.CONNECTION_STREAMS", 1
+    )
+    settings.OHLCV_INDICATORS = []
+    cache.clear()
+    market: Market = MarketFactory()
+    stored: List[List[float]] = create_candles(30)
+    save_candles(stored, timeframe=Timeframes.MINUTE_1, market=market)
+
+    messages: List[dict] = build_replay_messages(
+        markets=[market], timeframes=[Timeframes.MINUTE_1], since=START + MINUTE
+    )
+    # 29 klines, each followed by a ticker array
+    assert len(messages) == 58
+    assert messages[1]["stream"] == "!ticker@arr"
+    OHLCV.objects.all().delete()
+
+    server: ReplayServer = ReplayServer(messages)
+    server.start()
+    try:
+        rows: int = run_stream(
+            exchange_id="binance",
+            markets=[market],
+            timeframes=[Timeframes.MINUTE_1],
+            url=server.url,
+            flush_interval=0.1,
+            # the streams end when the replay server closes them
+            reconnect=False,
+        )
+    finally:
+        server.stop()
+
+    assert rows == 29
+    candles: Candles = load_candles(market=market, timeframe=Timeframes.MINUTE_1)
+    assert candles.timestamp[0] == START + MINUTE
+    assert list(candles.close) == [pytest.approx(candle[4]) for candle in stored[1:]]
+    assert get_ticker_snapshot("binance")[market.symbol].last == pytest.approx(
+        stored[-1][4]
+    )
@@ -0,0 +1,141 @@
+from datetime import date
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from django_crypto_trading_bot.trading_bot.api import ticker
+from django_crypto_trading_bot.trading_bot.api.ticker import (
+    Ticker,
+    TickerSnapshot,
+    fetch_ticker_snapshot,
+)
+from django_crypto_trading_bot.trading_bot.ticker_history import (
+    TickerArrays,
+    get_day_path,
+    get_history_dir,
+    list_day_files,
+    load_ticker_arrays,
+    record_snapshot,
+    remove_old_history,
+    replay_snapshots,
+)
+
+DAY: int = 24 * 60 * 60 * 1000
+# 2020-01-01 00:00 UTC
+START: int = 1577836800000
+
+
+@pytest.fixture
+def history(settings, tmp_path: Path) -> Path:
+    settings.TICKER_HISTORY_DIR = str(tmp_path)
+    settings.TICKER_HISTORY_DAYS = 2
+    return tmp_path
+
+
+def create_snapshot(timestamp: int, rise: float) -> TickerSnapshot:
+    return TickerSnapshot(
+        tickers=[
+            Ticker("TRX/BNB", rise, 1.0, 0.9, 1.1),
+            Ticker("ETH/BNB", 5.0, 2.0, None, None),
+            Ticker("BNB/EUR", None, 3.0, 2.9, 3.1),
+        ],
+        timestamp=timestamp,
+    )
+
+
+def test_replay_snapshots(history: Path):
+    for tick in range(3):
+        record_snapshot("binance", create_snapshot(START + tick * 1000, tick * 5.0))
+    record_snapshot("binance", create_snapshot(START + DAY, 1.0))
+
+    snapshots: List[TickerSnapshot] = list(replay_snapshots("binance"))
+    assert [snapshot.timestamp for snapshot in snapshots] == [
+        START,
+        START + 1000,
+        START + 2000,
+        START + DAY,
+    ]
+    # replayed like the fetched snapshot
+    assert snapshots[0].tickers == create_snapshot(START, 0.0).tickers
+    assert snapshots[2].tickers[0] == Ticker("TRX/BNB", 10.0, 1.0, 0.9, 1.1)
+    assert snapshots[2]["ETH/BNB"].bid is None
+
+    assert [
+        snapshot.timestamp
+        for snapshot in replay_snapshots(
+            "binance", since=START + 1000, until=START + DAY
+        )
+    ] == [START + 1000, START + 2000]
+    assert list(replay_snapshots("kraken")) == []
+
+
+def test_record_fetched_snapshot(history: Path, settings, monkeypatch):
+    class TickerExchange:
+        def fetch_tickers(self) -> dict:
+            return {"TRX/BNB": {"symbol": "TRX/BNB", "percentage": 2.0, "last": 1.0}}
+
+        def milliseconds(self) -> int:
+            return START
+
+    monkeypatch.setattr(ticker, "get_client", lambda exchange_id: TickerExchange())
+
+    fetch_ticker_snapshot("binance")
+    assert list(replay_snapshots("binance")) == []
+
+    settings.TICKER_HISTORY_ENABLED = True
+    snapshot: TickerSnapshot = fetch_ticker_snapshot("binance")
+    assert [frame.tickers for frame in replay_snapshots("binance")] == [
+        snapshot.tickers
+    ]
+
+
+def test_incomplete_frame(history: Path):
+    record_snapshot("binance", create_snapshot(START, 1.0))
+    record_snapshot("binance", create_snapshot(START + 1000, 2.0))
+
+    path: Path = get_day_path("binance", date(2020, 1, 1))
+    path.write_bytes(path.read_bytes()[:-3])
+
+    assert [snapshot.timestamp for snapshot in replay_snapshots("binance")] == [START]
+
+
+def test_remove_old_history(history: Path):
+    for day in range(3):
+        record_snapshot("binance", create_snapshot(START + day * DAY, 1.0))
+
+    # the first day was removed when the third day started
+    assert [day for day, _ in list_day_files(get_history_dir("binance"))] == [
+        date(2020, 1, 2),
+        date(2020, 1, 3),
+    ]
+
+    assert remove_old_history(days=1, today=date(2020, 1, 3)) == 1
+    assert remove_old_history(days=0, today=date(2020, 1, 10)) == 0
+    assert len(list_day_files(get_history_dir("binance"))) == 1
+
+
+def test_load_ticker_arrays(history: Path):
+    record_snapshot("binance", create_snapshot(START, 1.0))
+    record_snapshot(
+        "binance",
+        TickerSnapshot(
+            tickers=[Ticker("TRX/BNB", 2.0, 1.5, 1.4, 1.6)], timestamp=START + 1000
+        ),
+    )
+
+    arrays: TickerArrays = load_ticker_arrays(
+        "binance", symbols=["TRX/BNB", "ETH/BNB", "XRP/BNB"]
+    )
+    assert arrays.timestamp.tolist() == [START, START + 1000]
+    assert arrays.percentage[0].tolist() == [1.0, 2.0]
+    assert arrays.last[1, 0] == 2.0
+    # missing tickers & values are NaN
+    assert np.isnan(arrays.last[1, 1])
+    assert np.isnan(arrays.bid[1, 0])
+    assert np.isnan(arrays.last[2]).all()
+
+    empty: TickerArrays = load_ticker_arrays("kraken", symbols=["TRX/BNB"])
+    assert empty.timestamp.size == 0
+    assert empty.last.shape == (1, 0)
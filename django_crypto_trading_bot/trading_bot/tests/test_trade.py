@@ -2,9 +2,14 @@ import unittest
 from decimal import Decimal
 
 import pytest
-from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
+from django_crypto_trading_bot.trading_bot.api.ticker import (
+    TickerSnapshot,
+    set_ticker_snapshot,
+)
 from django_crypto_trading_bot.trading_bot.models import (
     Bot,
     OHLCV,
@@ -71,6 +76,43 @@ class TestWaveRider(unittest.TestCase):
 
         assert Saving.objects.all().count() == 2
 
+    def count_lookup_queries(self, bots: int) -> int:
+        for index in range(bots):
+            BuyOrderFactory(order_id="wave-{}".format(index))
+
+        candle: OHLCV = OHLCV(
+            market=MarketFactory(),
+            timeframe=Timeframes.MONTH_1,
+            timestamp=timezone.now(),
+            open_price=Decimal(8.3),
+            highest_price=Decimal(9.4),
+            lowest_price=Decimal(7.5),
+            closing_price=Decimal(8),
+            volume=Decimal(100),
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            run_wave_rider(candle=candle, test=True)
+
+        # lookups of bots, accounts, markets & currencies
+        return len(
+            [
+                query
+                for query in context.captured_queries
+                if query["sql"].startswith("SELECT")
+                and 'FROM "trading_bot_order"' not in query["sql"]
+            ]
+        )
+
+    def test_constant_lookup_queries(self):
+        queries: int = self.count_lookup_queries(bots=1)
+
+        Order.objects.all().delete()
+        Saving.objects.all().delete()
+
+        assert self.count_lookup_queries(bots=5) == queries
+        assert Saving.objects.count() == 5
+
 
 @pytest.mark.django_db()
 class TestRisingChart(unittest.TestCase):
@@ -111,7 +153,9 @@ class TestRisingChart(unittest.TestCase):
             },
         }
 
-        cache.set("tickers-{}".format(exchange), tickers, 60)
+        set_ticker_snapshot(
+            exchange, TickerSnapshot.from_ccxt(tickers=tickers, timestamp=0)
+        )
 
     def test_order_stop_loss(self):
         order: Order = RisingChartOrderFactory()
@@ -154,3 +198,35 @@ class TestRisingChart(unittest.TestCase):
         assert order_buy.next_order is None
         assert order_buy.market is not None
         assert order_buy.market.symbol.upper() == "ETH/BNB"
+
+    def count_rising_chart_queries(self, exchange: str, tickers: int) -> int:
+        # tickers with a rise but without a known market
+        set_ticker_snapshot(
+            exchange,
+            TickerSnapshot.from_ccxt(
+                tickers={
+                    "C{}/BNB".format(index): {
+                        "symbol": "C{}/BNB".format(index),
+                        "percentage": 10.0,
+                        "last": 1.0,
+                        "bid": 1.0,
+                        "ask": 1.0,
+                    }
+                    for index in range(tickers)
+                },
+                timestamp=0,
+            ),
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            run_rising_chart(test=True)
+        return len(context.captured_queries)
+
+    def test_constant_queries(self):
+        bot: Bot = RisingChartBotFactory()
+        MarketFactory()
+
+        queries: int = self.count_rising_chart_queries(bot.account.exchange, 5)
+
+        assert self.count_rising_chart_queries(bot.account.exchange, 500) == queries
+        assert not Order.objects.filter(bot=bot).exists()
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import zlib
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pytz
+from django.conf import settings
+
+from .api.ticker import Ticker, TickerSnapshot
+
+logger = logging.getLogger(__name__)
+
+# frame header: timestamp in milliseconds & size of the compressed payload
+FRAME_HEADER: struct.Struct = struct.Struct("<qI")
+# payload header: size of the symbol list
+SYMBOLS_HEADER: struct.Struct = struct.Struct("<I")
+# value columns of each frame
+COLUMNS: Tuple[str, ...] = ("percentage", "last", "bid", "ask")
+# file extension of the day files
+SUFFIX: str = ".ticks"
+
+
+class TickerFrame(NamedTuple):
+    """
+    All tickers of an exchange at one tick, stored column by column
+    """
+
+    timestamp: int
+    symbols: Tuple[str, ...]
+    values: np.ndarray  # shape (COLUMNS, symbols), NaN for missing values
+
+    @property
+    def percentage(self) -> np.ndarray:
+        return self.values[0]
+
+    @property
+    def last(self) -> np.ndarray:
+        return self.values[1]
+
+    @property
+    def bid(self) -> np.ndarray:
+        return self.values[2]
+
+    @property
+    def ask(self) -> np.ndarray:
+        return self.values[3]
+
+    @staticmethod
+    def from_snapshot(snapshot: TickerSnapshot) -> TickerFrame:
+        tickers: List[Ticker] = sorted(snapshot, key=lambda ticker: ticker.symbol)
+        values: np.ndarray = np.array(
+            [
+                [np.nan if value is None else value for value in ticker[1:]]
+                for ticker in tickers
+            ],
+            dtype=np.float64,
+        ).reshape(len(tickers), len(COLUMNS))
+        return TickerFrame(
+            timestamp=snapshot.timestamp,
+            symbols=tuple(ticker.symbol for ticker in tickers),
+            values=values.T.copy(),
+        )
+
+    def snapshot(self) -> TickerSnapshot:
+        """Create the ordered ticker snapshot seen by the bots
+
+        Returns:
+            TickerSnapshot -- ordered snapshot
+        """
+        rows: List[list] = self.values.T.tolist()
+        return TickerSnapshot(
+            tickers=(
+                Ticker(symbol, *(None if value != value else value for value in row))
+                for symbol, row in zip(self.symbols, rows)
+            ),
+            timestamp=self.timestamp,
+        )
+
+
+class TickerArrays(NamedTuple):
+    """
+    Ticker history of some symbols aligned to the recorded ticks
+    """
+
+    timestamp: np.ndarray  # UTC timestamps in milliseconds
+    percentage: np.ndarray  # shape (symbols, timestamps)
+    last: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+
+
+def get_history_dir(exchange_id: str) -> Path:
+    return Path(settings.TICKER_HISTORY_DIR) / exchange_id
+
+
+def get_day(timestamp: int) -> date:
+    return datetime.fromtimestamp(timestamp / 1000, tz=pytz.UTC).date()
+
+
+def get_day_path(exchange_id: str, day: date) -> Path:
+    return get_history_dir(exchange_id) / "{}{}".format(day.isoformat(), SUFFIX)
+
+
+def encode_frame(frame: TickerFrame) -> bytes:
+    """Compress a frame, the symbols are sorted so the symbol list is the same
+    for most ticks & compresses well
+
+    Arguments:
+        frame {TickerFrame} -- tickers of one tick
+
+    Returns:
+        bytes -- frame header & compressed payload
+    """
+    symbols: bytes = "\n".join(frame.symbols).encode()
+    payload: bytes = zlib.compress(
+        SYMBOLS_HEADER.pack(len(symbols))
+        + symbols
+        + np.ascontiguousarray(frame.values, dtype="<f8").tobytes()
+    )
+    return FRAME_HEADER.pack(frame.timestamp, len(payload)) + payload
+
+
+def decode_payload(timestamp: int, payload: bytes, symbols_cache: dict) -> TickerFrame:
+    data: bytes = zlib.decompress(payload)
+    (size,) = SYMBOLS_HEADER.unpack_from(data)
+    start: int = SYMBOLS_HEADER.size
+    raw: bytes = data[start : start + size]
+
+    # the symbol list changes only if a market is listed or delisted
+    if symbols_cache.get("raw") != raw:
+        symbols_cache["raw"] = raw
+        symbols_cache["symbols"] = tuple(raw.decode().split("\n")) if raw else ()
+    symbols: Tuple[str, ...] = symbols_cache["symbols"]
+
+    values: np.ndarray = np.frombuffer(data, dtype="<f8", offset=start + size).reshape(
+        len(COLUMNS), len(symbols)
+    )
+    return TickerFrame(timestamp=timestamp, symbols=symbols, values=values)
+
+
+def record_snapshot(exchange_id: str, snapshot: TickerSnapshot):
+    """Append a ticker snapshot to the day file of the exchange,
+    old day files are removed when a new day starts
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+        snapshot {TickerSnapshot} -- fetched tickers
+    """
+    path: Path = get_day_path(exchange_id, get_day(snapshot.timestamp))
+    new_day: bool = not path.exists()
+    if new_day:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    # one write per frame, so concurrent recorders never interleave frames
+    with open(path, "ab") as history:
+        history.write(encode_frame(TickerFrame.from_snapshot(snapshot)))
+
+    if new_day:
+        remove_old_history(exchange_id=exchange_id, today=get_day(snapshot.timestamp))
+
+
+def remove_old_history(
+    exchange_id: Optional[str] = None,
+    days: Optional[int] = None,
+    today: Optional[date] = None,
+) -> int:
+    """Remove day files older than the retention
+
+    Keyword Arguments:
+        exchange_id {Optional[str]} -- exchange name, all exchanges for None (default: {None})
+        days {Optional[int]} -- days to keep (default: {settings.TICKER_HISTORY_DAYS})
+        today {Optional[date]} -- current day (default: {None})
+
+    Returns:
+        int -- amount of removed files
+    """
+    days = settings.TICKER_HISTORY_DAYS if days is None else days
+    if not days:
+        return 0
+    oldest: date = (today or datetime.now(tz=pytz.UTC).date()) - timedelta(
+        days=days - 1
+    )
+
+    directories: List[Path]
+    if exchange_id:
+        directories = [get_history_dir(exchange_id)]
+    else:
+        root: Path = Path(settings.TICKER_HISTORY_DIR)
+        directories = [path for path in root.iterdir()] if root.is_dir() else []
+
+    removed: int = 0
+    for directory in directories:
+        for day, path in list_day_files(directory):
+            if day < oldest:
+                path.unlink()
+                removed += 1
+    if removed:
+        logger.info("Removed {} old ticker history files".format(removed))
+    return removed
+
+
+def list_day_files(directory: Path) -> List[Tuple[date, Path]]:
+    """Get the day files of an exchange ordered by day
+
+    Arguments:
+        directory {Path} -- history directory of an exchange
+
+    Returns:
+        List[Tuple[date, Path]] -- day & path
+    """
+    if not directory.is_dir():
+        return list()
+    files: List[Tuple[date, Path]] = list()
+    for path in directory.glob("*{}".format(SUFFIX)):
+        try:
+            files.append((date.fromisoformat(path.stem), path))
+        except ValueError:
+            continue
+    return sorted(files)
+
+
+def read_frames(
+    path: Path, since: Optional[int] = None, until: Optional[int] = None
+) -> Iterator[TickerFrame]:
+    """Stream the frames of a day file, frames outside the range are skipped
+    without decompressing them
+
+    Arguments:
+        path {Path} -- day file
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Yields:
+        Iterator[TickerFrame] -- frames in recording order
+    """
+    symbols_cache: dict = dict()
+    with open(path, "rb") as history:
+        while True:
+            header: bytes = history.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            timestamp, size = FRAME_HEADER.unpack(header)
+
+            if until is not None and timestamp >= until:
+                break
+            if since is not None and timestamp < since:
+                history.seek(size, os.SEEK_CUR)
+                continue
+
+            payload: bytes = history.read(size)
+            if len(payload) < size:
+                # the recorder was stopped while writing the last frame
+                logger.warning("Skip incomplete frame in {}".format(path))
+                break
+            yield decode_payload(timestamp, payload, symbols_cache)
+
+
+def replay_frames(
+    exchange_id: str, since: Optional[int] = None, until: Optional[int] = None
+) -> Iterator[TickerFrame]:
+    """Stream the recorded frames of an exchange
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Yields:
+        Iterator[TickerFrame] -- frames ordered by time
+    """
+    first_day: Optional[date] = get_day(since) if since is not None else None
+    last_day: Optional[date] = get_day(until) if until is not None else None
+
+    for day, path in list_day_files(get_history_dir(exchange_id)):
+        if first_day and day < first_day:
+            continue
+        if last_day and day > last_day:
+            break
+        yield from read_frames(path, since=since, until=until)
+
+
+def replay_snapshots(
+    exchange_id: str, since: Optional[int] = None, until: Optional[int] = None
+) -> Iterator[TickerSnapshot]:
+    """Stream the recorded ticker snapshots of an exchange, like they were
+    returned by get_ticker_snapshot
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Yields:
+        Iterator[TickerSnapshot] -- snapshots ordered by time
+    """
+    for frame in replay_frames(exchange_id=exchange_id, since=since, until=until):
+        yield frame.snapshot()
+
+
+def load_ticker_arrays(
+    exchange_id: str,
+    symbols: List[str],
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+) -> TickerArrays:
+    """Load the recorded tickers of some symbols into arrays for a fast replay
+
+    Arguments:
+        exchange_id {str} -- exchange name like "binance"
+        symbols {List[str]} -- symbols like ["TRX/BNB"]
+
+    Keyword Arguments:
+        since {Optional[int]} -- first timestamp in milliseconds (default: {None})
+        until {Optional[int]} -- end timestamp in milliseconds, excluded (default: {None})
+
+    Returns:
+        TickerArrays -- values of each symbol & tick, NaN if a ticker is missing
+    """
+    rows: Dict[str, int] = {symbol: row for row, symbol in enumerate(symbols)}
+    timestamps: List[int] = list()
+    columns: List[np.ndarray] = list()
+
+    frame_symbols: Optional[Tuple[str, ...]] = None
+    source: np.ndarray = np.empty(0, dtype=np.int64)
+    target: np.ndarray = np.empty(0, dtype=np.int64)
+
+    for frame in replay_frames(exchange_id=exchange_id, since=since, until=until):
+        if frame.symbols is not frame_symbols:
+            frame_symbols = frame.symbols
+            pairs: List[Tuple[int, int]] = [
+                (index, rows[symbol])
+                for index, symbol in enumerate(frame.symbols)
+                if symbol in rows
+            ]
+            source = np.array([pair[0] for pair in pairs], dtype=np.int64)
+            target = np.array([pair[1] for pair in pairs], dtype=np.int64)
+
+        values: np.ndarray = np.full((len(COLUMNS), len(symbols)), np.nan)
+        values[:, target] = frame.values[:, source]
+        timestamps.append(frame.timestamp)
+        columns.append(values)
+
+    stacked: np.ndarray = (
+        np.stack(columns, axis=2)
+        if columns
+        else np.empty((len(COLUMNS), len(symbols), 0))
+    )
+    return TickerArrays(
+        np.array(timestamps, dtype=np.int64), *(column for column in stacked)
+    )
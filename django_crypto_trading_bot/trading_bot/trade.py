@@ -1,10 +1,10 @@
 import logging
-from collections import OrderedDict
 from decimal import ROUND_DOWN, Decimal, getcontext
 from time import sleep
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from datetime import datetime, timedelta
+from django.conf import settings
 from django.utils import timezone
 
 from ccxt.base.errors import (
@@ -23,87 +23,163 @@ from .exceptions import (
     BotHasNoMinRise,
 )
 
-from ccxt.base.exchange import Exchange
-
+from django_crypto_trading_bot.trading_bot.api.ohlcv import get_latest_candles
 from django_crypto_trading_bot.trading_bot.api.order import create_order
+from django_crypto_trading_bot.trading_bot.api.ticker import Ticker, TickerSnapshot
 from django_crypto_trading_bot.trading_bot.models import (
     OHLCV,
     Bot,
-    Currency,
     Market,
     Order,
     OrderErrorLog,
     Saving,
 )
+from django_crypto_trading_bot.trading_bot.performance import record_savings
+from django_crypto_trading_bot.trading_bot.stream import STREAM, get_stream_candles
 
 logger = logging.getLogger(__name__)
 
 
+def stop_loss_reached(
+    last: Decimal, last_price_tick: Decimal, stop_loss: Decimal
+) -> bool:
+    """Check if the price change since the highest price of an order reached the stop loss
+
+    Arguments:
+        last {Decimal} -- last price of the market
+        last_price_tick {Decimal} -- highest price since the order was filled
+        stop_loss {Decimal} -- stop loss in percent
+
+    Returns:
+        bool -- sell the order
+    """
+    change: Decimal = last - last_price_tick
+    percentage: Decimal = change / last_price_tick * 100
+    return percentage <= stop_loss
+
+
+def get_buy_amount(
+    market: Market, quote_amount: Decimal, bid: Decimal, max_amount: Optional[Decimal]
+) -> Decimal:
+    """Get the amount of a rising chart buy order
+
+    Arguments:
+        market {Market} -- market of the order
+        quote_amount {Decimal} -- free balance of the quote currency
+        bid {Decimal} -- buy price
+        max_amount {Optional[Decimal]} -- max quote amount of the bot
+
+    Returns:
+        Decimal -- amount of base currency, below limits_amount_min if it's to low
+    """
+    if max_amount and quote_amount > max_amount:
+        quote_amount = max_amount
+
+    return market.get_min_max_order_amount(amount=quote_amount / bid)
+
+
 def run_wave_rider(candle: Optional[OHLCV] = None, test: bool = False):
+    # savings & deactivated bots are written at the end of the pass
+    savings: List[Saving] = list()
+    inactive_bots: List[int] = list()
+
+    try:
+        _run_wave_rider(
+            candle=candle, test=test, savings=savings, inactive_bots=inactive_bots
+        )
+    finally:
+        Saving.objects.bulk_create(savings)
+        # bulk_create sends no post_save signals
+        record_savings(savings)
+        if inactive_bots:
+            Bot.objects.filter(pk__in=inactive_bots).update(active=False)
+
+
+def _run_wave_rider(
+    candle: Optional[OHLCV],
+    test: bool,
+    savings: List[Saving],
+    inactive_bots: List[int],
+):
+    orders: List[Order] = list(
+        Order.objects.filter(
+            next_order=None,
+            status=Order.Status.CLOSED,
+            bot__trade_mode=Bot.TradeMode.WAVE_RIDER,
+        ).select_related(
+            "market", "bot__account", "bot__market__base", "bot__market__quote"
+        )
+    )
+
     order: Order
-    for order in Order.objects.filter(
-        next_order=None,
-        status=Order.Status.CLOSED,
-        bot__trade_mode=Bot.TradeMode.WAVE_RIDER,
-    ):
+    for order in orders:
         # todo test add exeception
         if not order.bot.market:
             raise NoMarket("Bot has no market!")
         if not order.bot.timeframe:
             raise NoTimeFrame("Bot has no time frame!")
 
-        if not candle:
-            exchange: Exchange = order.bot.account.get_account_client()
-
-            candles: List[List[float]]
-            while True:
-                try:
-                    candles = exchange.fetch_ohlcv(
-                        symbol=order.bot.market.symbol,
-                        timeframe=order.bot.timeframe,
-                        limit=1,
-                    )
-                    break
-                except (RequestTimeout, ExchangeNotAvailable):
-                    sleep(30)
-
-            candle = OHLCV.get_OHLCV(
-                candle=candles[0],
-                timeframe=order.bot.timeframe,
-                market=order.bot.market,
+    # fetch the current candle of each market & timeframe only once
+    candles: Dict[Tuple[int, str], OHLCV] = dict()
+    if not candle:
+        pairs: List[Tuple[Market, str]] = [
+            (order.bot.market, order.bot.timeframe) for order in orders
+        ]
+        # the streamed candles are read from the cache, missing ones with REST
+        if settings.MARKET_DATA_SOURCE == STREAM:
+            candles = get_stream_candles(pairs)
+        candles.update(
+            get_latest_candles(
+                (market, timeframe)
+                for market, timeframe in pairs
+                if (market.pk, timeframe) not in candles
             )
+        )
+
+    for order in orders:
+        order_candle: Optional[OHLCV] = candle or candles.get(
+            (order.bot.market.pk, order.bot.timeframe)
+        )
 
-        if candle:
+        if order_candle:
             getcontext().prec = 8
             getcontext().rounding = ROUND_DOWN
             saving_amount: Decimal = Decimal(0)
 
             retrade_amount: Decimal
             if order.side == Order.Side.SIDE_BUY:
-                retrade_amount = order.get_retrade_amount(price=candle.highest_price)
+                retrade_amount = order.get_retrade_amount(
+                    price=order_candle.highest_price
+                )
             else:
-                retrade_amount = order.get_retrade_amount(price=candle.lowest_price)
+                retrade_amount = order.get_retrade_amount(
+                    price=order_candle.lowest_price
+                )
 
             limits_amount_min: Decimal = order.bot.market.limits_amount_min
             if retrade_amount < limits_amount_min:
                 if order.side == Order.Side.SIDE_BUY:
-                    Saving.objects.create(
-                        order=order,
-                        bot=order.bot,
-                        amount=order.amount * order.price,
-                        currency=order.bot.market.quote,
+                    savings.append(
+                        Saving(
+                            order=order,
+                            bot=order.bot,
+                            amount=order.amount * order.price,
+                            currency=order.bot.market.quote,
+                        )
                     )
                 else:
-                    Saving.objects.create(
-                        order=order,
-                        bot=order.bot,
-                        amount=order.amount,
-                        currency=order.bot.market.base,
+                    savings.append(
+                        Saving(
+                            order=order,
+                            bot=order.bot,
+                            amount=order.amount,
+                            currency=order.bot.market.base,
+                        )
                     )
 
                 order.bot.active = False
                 order.status = Order.Status.NOT_MIN_NOTIONAL
-                order.bot.save()
+                inactive_bots.append(order.bot.pk)
                 order.save()
 
             else:
@@ -115,7 +191,7 @@ def run_wave_rider(candle: Optional[OHLCV] = None, test: bool = False):
                             try:
                                 order.next_order = create_order(
                                     amount=retrade_amount,
-                                    price=candle.highest_price,
+                                    price=order_candle.highest_price,
                                     side=Order.Side.SIDE_SELL,
                                     bot=order.bot,
                                     market=order.bot.market,
@@ -128,18 +204,20 @@ def run_wave_rider(candle: Optional[OHLCV] = None, test: bool = False):
                         saving_amount = (order.amount - retrade_amount) * order.price
 
                         if saving_amount:
-                            Saving.objects.create(
-                                order=order,
-                                bot=order.bot,
-                                amount=saving_amount,
-                                currency=order.bot.market.quote,
+                            savings.append(
+                                Saving(
+                                    order=order,
+                                    bot=order.bot,
+                                    amount=saving_amount,
+                                    currency=order.bot.market.quote,
+                                )
                             )
                     else:
                         while True:
                             try:
                                 order.next_order = create_order(
                                     amount=retrade_amount,
-                                    price=candle.lowest_price,
+                                    price=order_candle.lowest_price,
                                     side=Order.Side.SIDE_BUY,
                                     bot=order.bot,
                                     market=order.bot.market,
@@ -152,11 +230,13 @@ def run_wave_rider(candle: Optional[OHLCV] = None, test: bool = False):
                         saving_amount = order.amount - retrade_amount
 
                         if saving_amount:
-                            Saving.objects.create(
-                                order=order,
-                                bot=order.bot,
-                                amount=saving_amount,
-                                currency=order.bot.market.base,
+                            savings.append(
+                                Saving(
+                                    order=order,
+                                    bot=order.bot,
+                                    amount=saving_amount,
+                                    currency=order.bot.market.base,
+                                )
                             )
 
                 except InsufficientFunds as e:
@@ -185,9 +265,19 @@ def run_wave_rider(candle: Optional[OHLCV] = None, test: bool = False):
 
 
 def run_rising_chart(test: bool = False):
+    # all bots of an exchange share the same ticker snapshot
+    snapshots: Dict[str, TickerSnapshot] = dict()
+    # markets by base currency for each exchange & quote currency
+    markets: Dict[Tuple[str, int], Dict[str, Market]] = dict()
+
     bot: Bot
-    for bot in Bot.objects.filter(trade_mode=Bot.TradeMode.RISING_CHART, active=True):
-        tickers: OrderedDict = bot.fetch_tickers()
+    for bot in Bot.objects.filter(
+        trade_mode=Bot.TradeMode.RISING_CHART, active=True
+    ).select_related("account", "quote"):
+        tickers: Optional[TickerSnapshot] = snapshots.get(bot.account.exchange)
+        if tickers is None:
+            tickers = bot.fetch_tickers()
+            snapshots[bot.account.exchange] = tickers
 
         # todo test add exeception
         if not bot.stop_loss:
@@ -200,30 +290,34 @@ def run_rising_chart(test: bool = False):
             side=Order.Side.SIDE_BUY,
             next_order=None,
             status=Order.Status.CLOSED,
-        ):
+        ).select_related("market"):
+            order.bot = bot
+
             # todo test add exeception
             if not order.market:
                 raise NoMarket("Order has no market!")
             if not order.last_price_tick:
                 raise OrderHasNoLastPrice("Order has no last price tick!")
 
-            last: Decimal = Decimal(tickers[order.market.symbol]["last"])
-            change: Decimal = last - order.last_price_tick
-            percentage: Decimal = change / order.last_price_tick * 100
+            last: Decimal = Decimal(tickers[order.market.symbol].last)
 
-            if percentage <= bot.stop_loss:
+            if stop_loss_reached(
+                last=last,
+                last_price_tick=order.last_price_tick,
+                stop_loss=bot.stop_loss,
+            ):
                 # sell coins for stop loss
                 while True:
                     # todo add exception for low balance
                     try:
                         order.next_order = create_order(
                             amount=order.get_retrade_amount(
-                                Decimal(tickers[order.market.symbol]["ask"])
+                                Decimal(tickers[order.market.symbol].ask)
                             ),
                             side=Order.Side.SIDE_SELL,
                             bot=bot,
                             market=order.market,
-                            price=tickers[order.market.symbol]["ask"],
+                            price=tickers[order.market.symbol].ask,
                             isTestOrder=test,
                         )
                         order.next_order.market = order.market
@@ -238,55 +332,66 @@ def run_rising_chart(test: bool = False):
                     order.last_price_tick = last
                     order.save()
 
-        ticker: dict
-        for key, ticker in tickers.items():
-            # jump to next ticker, if quote in market is not bot quote
-            quote_str: str = ticker["symbol"].split("/")[1]
-
-            # todo test add exeception
-            quote: Currency
-            if not bot.quote:
-                BotHasNoQuoteCurrency("Bot has no quote currency!")
-            else:
-                if not bot.quote.short.upper() == quote_str.upper():
-                    continue
+        # jump to next bot, if bot is already active in a market
+        if Order.objects.filter(
+            bot=bot, side=Order.Side.SIDE_BUY, next_order=None
+        ).exists():
+            continue
 
-            open_order_in_market: int = Order.objects.filter(
-                bot=bot, side=Order.Side.SIDE_BUY, next_order=None
-            ).count()
+        # jump to next bot, if bot is in lock
+        lock_time: datetime = timezone.now() - timedelta(hours=bot.lock_time)
+        if Order.objects.filter(
+            bot=bot, side=Order.Side.SIDE_SELL, timestamp__gte=lock_time
+        ).exists():
+            continue
 
-            # jump to next ticker, if bot is already active in market
-            if open_order_in_market > 0:
-                continue
+        # todo test add exeception
+        if not bot.quote:
+            raise BotHasNoQuoteCurrency("Bot has no quote currency!")
+        if not bot.min_rise:
+            raise BotHasNoMinRise("Bot has no min rise!")
+
+        quote_markets: Optional[Dict[str, Market]] = markets.get(
+            (bot.account.exchange, bot.quote.pk)
+        )
+        if quote_markets is None:
+            quote_markets = {
+                market.base.short.upper(): market
+                for market in Market.objects.filter(
+                    exchange=bot.account.exchange, quote=bot.quote
+                ).select_related("base", "quote")
+            }
+            markets[(bot.account.exchange, bot.quote.pk)] = quote_markets
+
+        quote_amount: Optional[Decimal] = None
+
+        ticker: Ticker
+        for ticker in tickers:
+            # break if ticker percentage fall below bot min_rise,
+            # the tickers are ordered by percentage
+            if ticker.percentage is None or Decimal(ticker.percentage) < bot.min_rise:
+                break
 
-            lock_time: datetime = timezone.now() - timedelta(hours=bot.lock_time)
-            last_order_in_market: int = Order.objects.filter(
-                bot=bot, side=Order.Side.SIDE_SELL, timestamp__gte=lock_time
-            ).count()
+            base_str, quote_str = ticker.symbol.split("/")
 
-            # jump to next ticker, if bot is in lock for market
-            if last_order_in_market > 0:
+            # jump to next ticker, if quote in market is not bot quote
+            if not bot.quote.short.upper() == quote_str.upper():
                 continue
 
-            # todo test add exeception
-            if bot.min_rise:
-                # break if ticker percentage fall below bot min_rise
-                if Decimal(ticker["percentage"]) < bot.min_rise:
-                    break
-            else:
-                raise BotHasNoMinRise("Bot has no min rise!")
-
-            base_str: str = ticker["symbol"].split("/")[0]
-            base: Currency = Currency.objects.get(short=base_str.upper())
-            market: Market = Market.objects.get(base=base, quote=bot.quote)
-
-            quote_amount: Decimal = bot.fetch_balance(test=test)
-            if bot.max_amount and quote_amount > bot.max_amount:
-                quote_amount = bot.max_amount
+            market: Optional[Market] = quote_markets.get(base_str.upper())
+            if not market:
+                continue
 
-            amount: Decimal = quote_amount / Decimal(ticker["bid"])
+            # fetch the balance only once per bot
+            if quote_amount is None:
+                quote_amount = bot.fetch_balance(test=test)
 
-            amount = market.get_min_max_order_amount(amount=amount)
+            amount: Decimal = get_buy_amount(
+                market=market,
+                quote_amount=quote_amount,
+                bid=Decimal(ticker.bid),
+                max_amount=bot.max_amount,
+            )
             if amount < market.limits_amount_min:
                 break
 
@@ -301,11 +406,11 @@ def run_rising_chart(test: bool = False):
                     side=Order.Side.SIDE_BUY,
                     bot=bot,
                     market=market,
-                    price=ticker["bid"],
+                    price=ticker.bid,
                     isTestOrder=test,
                 )
                 order.market = market
-                order.last_price_tick = Decimal(ticker["bid"])
+                order.last_price_tick = Decimal(ticker.bid)
                 order.save()
                 break
             except (RequestTimeout, ExchangeNotAvailable):